@@ -0,0 +1,115 @@
+""" Benchmark the lamp codec on a replayed Bluetooth log, check encoding round trips and compare the telemetry protocols, without hardware. """
+
+# import modules
+import Lamp_Codec as codec
+import numpy as np
+from timeit import timeit
+
+# number of bytes in the synthetic log
+log_length = 1000000
+
+"""-------------------------------------------------------------------"""
+
+def legacy_decode(data, color):
+    """
+        the original decoder of Lamp_Controller
+    """
+    for character in list(data):
+        character = ord(character)
+        if character & 0xC0 == codec.pre_red << 6:
+            color[0] = round((character & 0x3F) / 0x3F * 100)
+        elif character & 0xC0 == codec.pre_green << 6:
+            color[1] = round((character & 0x3F) / 0x3F * 100)
+        elif character & 0xC0 == codec.pre_blue << 6:
+            color[2] = round((character & 0x3F) / 0x3F * 100)
+    return color
+
+"""-------------------------------------------------------------------"""
+
+def legacy_encode(data, prefix, lim_max, lim_min=0):
+    """
+        the original encoder of Lamp_Controller
+    """
+    try:
+        data = max(min(data, lim_max), lim_min)
+        data = (data - lim_min) / (lim_max - lim_min) * 0x3F
+        data = (int(data) & 0x3F) | (prefix << 6)
+        return data
+    except:
+        return 0
+
+"""-------------------------------------------------------------------"""
+
+# generate a random log
+random = np.random.default_rng(0)
+log = bytes(random.integers(0, 256, log_length, dtype=np.uint8))
+text = log.decode("latin-1")
+
+# check that the decoders agree
+assert codec.decode_colors(text) == legacy_decode(text, [0, 0, 0])
+channels, percents = codec.decode_stream(log)
+for index in range(3):
+    assert percents[channels == index][-1] == codec.decode_colors(text)[index]
+
+# time the decoders
+legacy = timeit(lambda: legacy_decode(text, [0, 0, 0]), number=1)
+table = timeit(lambda: codec.decode_colors(text), number=1)
+stream = timeit(lambda: codec.decode_stream(log), number=1)
+print("decode " + str(log_length) + " bytes: legacy " + str(round(legacy * 1e03, 1)) + "ms, table " + str(round(table * 1e03, 1)) + "ms, stream " + str(round(stream * 1e03, 1)) + "ms")
+
+# round trip property: encoding and decoding a value changes it by less than one step
+for lim_min, lim_max in [(0, 100), (0, 5), (-1, 1)]:
+    values = random.uniform(lim_min - 1, lim_max + 1, 10000)
+    encoded = codec.encode_many(values, codec.pre_bat, lim_max, lim_min)
+    for value, byte in zip(values, encoded):
+        assert byte == legacy_encode(value, codec.pre_bat, lim_max, lim_min)
+        prefix, decoded = codec.decode_value(byte, lim_max, lim_min)
+        assert prefix == codec.pre_bat
+        assert abs(decoded - min(max(value, lim_min), lim_max)) < (lim_max - lim_min) / 0x3F + 1e-09
+assert codec.encode(float("nan"), codec.pre_bat, 5) == 0
+assert codec.encode(1, codec.pre_bat, 5, 5) == 0
+print("round trip checks passed")
+
+# time the encoders
+values = random.uniform(0, 5, 3000).tolist()
+legacy = timeit(lambda: [legacy_encode(value, codec.pre_bat, 5) for value in values], number=1)
+batch = timeit(lambda: codec.encode_many(values, codec.pre_bat, 5), number=1)
+print("encode " + str(len(values)) + " values: legacy " + str(round(legacy * 1e03, 2)) + "ms, batch " + str(round(batch * 1e03, 2)) + "ms")
+
+# extended telemetry: a day of samples every 10s, light, battery and charger
+prefixes = [codec.pre_light, codec.pre_bat, codec.pre_charge]
+limits = [100, 5, 5]
+times = np.arange(0, 86400, 10)
+# the light at the 8-bit resolution of the ALS, the battery with 2mV noise
+light = np.round((50 + 40 * np.sin(2 * np.pi * times / 86400)) * 2.55) / 2.55
+battery = 4.2 - 0.8 * times / 86400 + random.normal(0, 0.002, times.size)
+charger = np.where(times > 80000, 5.0, 0.0)
+samples = np.column_stack([light, battery, charger])
+samples[100, 1] = np.nan    # a failed measurement is not sent
+
+# the decoder follows the encoder within one 12-bit step, also with the 6-bit bytes mirrored and without keyframes
+for mirror, keyframe in [(False, 30), (True, 30), (False, 0)]:
+    encoder = codec.TelemetryEncoder(prefixes, limits, keyframe=keyframe, legacy=mirror)
+    decoder = codec.TelemetryDecoder(prefixes, limits)
+    decoded = {}
+    for row in samples:
+        data = encoder.encode(row)
+        # split the bytes, records can span two reads
+        decoded.update(decoder.decode(data[:2]))
+        decoded.update(decoder.decode(data[2:]))
+        for prefix, value, limit in zip(prefixes, row, limits):
+            if np.isfinite(value):
+                assert abs(decoded[prefix] - value) <= limit / 0xFFF / 2 + 1e-09, (prefix, value, decoded[prefix])
+    # the 6-bit decoders ignore the extended bytes
+    if not mirror:
+        assert codec.decode_colors(encoder.encode([0, 0, 0])) == [0, 0, 0]
+        assert np.all(codec.decode_stream(encoder.encode([100, 5, 5]))[0] == -1)
+print("extended round trip checks passed")
+
+# bytes per cycle
+encoder = codec.TelemetryEncoder(prefixes, limits, keyframe=30)
+extended = sum(len(encoder.encode(row)) for row in samples)
+legacy = sum(len(codec.encode_many(row, prefixes, limits)) for row in samples)
+print("telemetry bytes per cycle: legacy " + str(round(legacy / times.size, 2)) + " (6-bit), extended " + str(round(extended / times.size, 2)) + " (12-bit), " + str(encoder.skipped) + " unchanged values skipped")
+cycle = timeit(lambda: encoder.encode(samples[0]), number=1000) / 1000
+print("extended encode: " + str(round(cycle * 1e06, 1)) + "us per cycle")
@@ -0,0 +1,124 @@
+""" Check the instrument executor and time the telemetry cycle on the simulated instruments, without hardware. """
+
+# import modules
+import os
+os.environ["WF_BACKEND"] = "sim"    # run on the simulated instruments
+import threading
+import Pmod_BLE as ble
+import Pmod_ALS as als
+import Lamp_Scope as scope
+import Lamp_Unit as unit
+import WF_Executor as executor
+import WF_SIM as sim
+from WF_Backend import wf
+from time import perf_counter, sleep
+
+# number of timed telemetry cycles
+repeat = 20
+
+"""-------------------------------------------------------------------"""
+
+class lanes:
+    running = {}    # calls running on every instrument
+    overlaps = 0    # calls which started while another call used the same instrument
+    order = []
+
+def call(instrument, index):
+    """
+        a call which keeps an instrument busy for a millisecond
+    """
+    lanes.running[instrument] = lanes.running.get(instrument, 0) + 1
+    lanes.overlaps += lanes.running[instrument] > 1
+    sleep(1e-03)
+    lanes.order.append((instrument, index))
+    lanes.running[instrument] -= 1
+    return index
+
+"""-------------------------------------------------------------------"""
+
+# calls of one instrument run in order and one at a time, the instruments run together
+start = perf_counter()
+futures = [executor.submit(None, instrument, call, instrument, index) for index in range(20) for instrument in ["static", "scope", "pattern"]]
+assert executor.wait(futures) == [index for index in range(20) for _ in range(3)]
+duration = perf_counter() - start
+assert lanes.overlaps == 0
+for instrument in ["static", "scope", "pattern"]:
+    assert [index for name, index in lanes.order if name == instrument] == list(range(20))
+print("60 calls of 1ms on 3 instruments: " + str(round(duration * 1e03, 1)) + "ms")
+
+# exceptions are passed to the caller
+failed = executor.submit(None, "scope", lambda: 1 / 0)
+try:
+    failed.result()
+    raise AssertionError("the exception was lost")
+except ZeroDivisionError:
+    pass
+
+# the protocols, the pattern generator and the logic analyzer share the digital engines
+assert executor.lane(None, "spi") == executor.lane(None, "pattern") == executor.lane(None, "stream")
+assert executor.lane(None, "static") != executor.lane(None, "pattern")
+lanes.order = []
+futures = [executor.submit(None, instrument, call, instrument, index) for index in range(5) for instrument in ["spi", "pattern"]]
+executor.wait(futures)
+assert lanes.overlaps == 0 and [index for _, index in lanes.order] == [index for index in range(5) for _ in range(2)]
+
+# a call can use its own instrument again
+assert executor.call(None, "static", lambda: executor.call(None, "static", lambda: 1) + 1) == 2
+
+# serial fallback
+executor.settings.parallel = False
+future = executor.submit(None, "scope", threading.get_ident)
+assert future.done() and future.result() == threading.get_ident()
+executor.settings.parallel = True
+
+"""-------------------------------------------------------------------"""
+
+# a lamp on the simulated device, the instruments take their simulated time
+ble.pins.rx, ble.pins.tx, ble.pins.rst, ble.pins.status = sim.model.ble.rx, sim.model.ble.tx, sim.model.ble.rst, sim.model.ble.status
+als.pins.cs, als.pins.sdo, als.pins.sck = sim.model.als.cs, sim.model.als.sdo, sim.model.als.sck
+device_data = wf.device.open()
+sim.core.settings.realtime = True
+scope.settings.buffer_size = 200    # 20ms acquisitions
+
+lamp = unit.Lamp("lamp", device_data, battery=True)
+lamp.flags.connected = True
+lamp.telemetry_task()
+
+# the parts of a telemetry cycle
+light = perf_counter()
+als.read_percent_many(unit.settings.light_average, rx_mode=unit.settings.light_mode, method=unit.settings.light_method)
+light = perf_counter() - light
+voltages = perf_counter()
+scope.measure(device_data)
+voltages = perf_counter() - voltages
+print("light reading " + str(round(light * 1e03, 1)) + "ms, voltage acquisition " + str(round(voltages * 1e03, 1)) + "ms")
+
+# telemetry cycles, serial and parallel
+for parallel in [False, True]:
+    executor.settings.parallel = parallel
+    start = perf_counter()
+    for _ in range(repeat):
+        lamp.telemetry_task()
+    duration = (perf_counter() - start) / repeat
+    print(("parallel" if parallel else "serial") + " telemetry cycle: " + str(round(duration * 1e03, 1)) + "ms")
+
+sim.core.settings.realtime = False
+
+# without parallel calls the recording is read by the caller, the SDK is called from one thread
+executor.settings.parallel = False
+sim.model.ble.tx, sim.model.ble.rx = ble.pins.tx, ble.pins.rx
+threads = set()
+record = sim.logic.read_record
+sim.logic.read_record = lambda *args: threads.add(threading.get_ident()) or record(*args)
+ble.start_stream()
+assert ble._recorder_._thread_ is None
+sim.model.send(b"serial")
+received = bytes(ble.stream_bytes(timeout=0.5))
+ble.stop_stream()
+sim.logic.read_record = record
+executor.settings.parallel = True
+assert received == b"serial" and threads == {threading.get_ident()}, (received, threads)
+
+executor.shutdown()
+lamp.close(True)
+wf.device.close(device_data)
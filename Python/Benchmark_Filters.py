@@ -0,0 +1,83 @@
+""" Check and benchmark the sensor filters, on synthetic data and on the simulated Pmod ALS, without hardware. """
+
+# import modules
+import os
+os.environ["WF_BACKEND"] = "sim"    # run on the simulated instruments
+import Lamp_Filters as filters
+import Pmod_ALS as als
+import WF_SIM as sim
+import numpy as np
+from timeit import timeit
+
+# samples of the synthetic streams
+length = 10000
+# fraction of failed readings
+glitches = 0.03
+
+"""-------------------------------------------------------------------"""
+
+def recomputed_median(data, window):
+    """
+        windowed median recomputed with numpy for every sample
+    """
+    return [float(np.median(data[max(index - window + 1, 0):index + 1])) for index in range(len(data))]
+
+"""-------------------------------------------------------------------"""
+
+random = np.random.default_rng(0)
+stream = random.normal(50, 1, length)
+stream[random.random(length) < glitches] = 0
+
+# the sorted window gives the same medians
+window = 7
+median = filters.MovingMedian(window)
+assert [median.update(sample) for sample in stream] == recomputed_median(stream, window)
+
+# the median absolute deviation selected from the sorted window is the one of the sorted deviations
+for count in range(1, 40):
+    values = sorted(random.integers(0, 8, count).astype(float).tolist())
+    middle = filters._middle_(values)
+    assert filters._middle_deviation_(values, middle) == filters._middle_(sorted(abs(value - middle) for value in values))
+
+# the Hampel filter removes the glitches, a lasting step passes after half a window
+hampel = filters.Hampel(window)
+output = np.array([hampel.update(sample) for sample in stream])
+assert np.all(output[window:] > 40)
+hampel = filters.Hampel(window)
+step = [hampel.update(sample) for sample in [50] * 10 + [80] * 10]
+assert step[-1] == 80 and step.index(80) <= 10 + window // 2 + 1
+print("hampel: " + str(hampel.rejected) + " samples replaced in a step, " + str(np.sum(stream[window:] == 0)) + " glitches removed from the stream")
+
+# cost per sample
+data = stream.tolist()
+for name, create in [("ema", lambda: filters.EMA(0.5)), ("moving median", lambda: filters.MovingMedian(window)), ("hampel", lambda: filters.Hampel(window)), ("hampel, window 101", lambda: filters.Hampel(101))]:
+    duration = timeit(lambda: [filter.update(sample) for filter in [create()] for sample in data], number=1)
+    print(name + ": " + str(round(duration / length * 1e06, 2)) + "us per sample")
+duration = timeit(lambda: recomputed_median(data, window), number=1)
+print("recomputed median: " + str(round(duration / length * 1e06, 2)) + "us per sample")
+
+# block filters: mean of a scope buffer with a spike
+buffer = random.normal(3.8, 0.005, (1000, 10))
+buffer[:, 3] += random.choice([0, 1], 1000, p=[0.9, 0.1])
+print("scope buffers with spikes: mean error " + str(round(np.max(np.abs(buffer.mean(axis=1) - 3.8)) * 1e03, 1)) + "mV, hampel mean error " + str(round(np.max(np.abs(filters.robust_mean(buffer) - 3.8)) * 1e03, 1)) + "mV")
+
+"""-------------------------------------------------------------------"""
+
+# the simulated Pmod ALS, with noise and failed readings of 0
+device_data = als.wf.device.open()
+als.pins.cs, als.pins.sdo, als.pins.sck = sim.model.als.cs, sim.model.als.sdo, sim.model.als.sck
+sim.model.als.level, sim.model.als.noise = 128, 2
+word = sim.model.als_word
+sim.model.als_word = lambda device=sim.model.als: 0 if random.random() < glitches else word(device)
+
+# the spread of the light readings and the instrument time of the averaging
+reference = 128 * 100 / 255
+for count, method in [(10, "mean"), (5, "mean"), (5, "hampel"), (5, "median")]:
+    sim.core.reset()
+    readings = np.array([als.read_percent_many(count, rx_mode="spi", method=method) for _ in range(300)])
+    error = readings - reference
+    print(str(count) + " readings, " + method + ": standard deviation " + str(round(np.std(error), 3)) + "%, worst " + str(round(np.max(np.abs(error)), 2)) + "%, " + str(round(sim.core.now() / 300 * 1e03, 2)) + "ms instrument time")
+
+sim.model.als_word = word
+als.close()
+als.wf.device.close(device_data)
@@ -0,0 +1,64 @@
+""" Benchmark the telemetry history store on synthetic battery curves. """
+
+# import modules
+import os
+import csv
+import shutil
+import tempfile
+import numpy as np
+import Lamp_History as history
+from timeit import timeit
+
+# a week of telemetry at 10s intervals
+period = 10
+start = 1.7e09
+times = start + np.arange(0, 7 * 86400, period)
+random = np.random.default_rng(0)
+light = np.clip(50 + 40 * np.sin(2 * np.pi * (times - start) / 86400) + random.normal(0, 2, times.size), 0, 100)
+battery = 4.2 - 0.8 * ((times - start) % 86400) / 86400 + random.normal(0, 0.01, times.size)
+charger = np.where(((times - start) % 86400) > 80000, 5.0, 0.0)
+values = np.column_stack([light, battery, charger])
+
+"""-------------------------------------------------------------------"""
+
+directory = tempfile.mkdtemp()
+
+# append every sample, as the telemetry task does
+store = history.History(["light", "battery", "charger"], os.path.join(directory, "lamp"))
+duration = timeit(lambda: [store.append(row, timestamp) for timestamp, row in zip(times, values)], number=1)
+store.close()
+print("append " + str(times.size) + " samples: " + str(round(duration / times.size * 1e06, 1)) + "us per sample, " + str(round(store.memory() / 1e06, 2)) + "MB in memory")
+
+# the rollups match the raw data
+hour = store.query("battery", resolution="hour")
+minute = store.query("battery", resolution="minute")
+raw = store.query("battery", resolution="raw")
+assert np.allclose(raw["mean"], battery)
+assert np.isclose(hour["mean"][5], battery[(times >= hour["time"][5]) & (times < hour["time"][5] + 3600)].mean())
+assert np.isclose(minute["min"][7], battery[(times >= minute["time"][7]) & (times < minute["time"][7] + 60)].min())
+print("rollups: " + str(raw["time"].size) + " raw, " + str(minute["time"].size) + " minute, " + str(hour["time"].size) + " hour rows")
+
+# range queries
+for resolution in ["raw", "minute", "hour"]:
+    query = timeit(lambda: store.query("battery", start + 86400, start + 2 * 86400, resolution), number=100) / 100
+    print("query one day of " + resolution + " data: " + str(round(query * 1e06, 1)) + "us")
+
+# files, compared with a CSV log of the same samples
+written = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+name = os.path.join(directory, "lamp.csv")
+with open(name, "w", newline="") as file:
+    writer = csv.writer(file)
+    for timestamp, row in zip(times, values):
+        writer.writerow([timestamp] + list(row))
+print("files: " + str(round(written / 1e06, 2)) + "MB binary (all levels), " + str(round(os.path.getsize(name) / 1e06, 2)) + "MB CSV (raw only)")
+
+# restore after a restart, and query beyond the rings from the files
+history.settings.raw_size = 1000
+restored = history.History(["light", "battery", "charger"], os.path.join(directory, "lamp"))
+old = restored.query("battery", start, start + 3600, "raw")
+assert np.allclose(old["mean"], battery[times <= start + 3600])
+print("restored: " + str(round(restored.memory() / 1e06, 2)) + "MB in memory, first hour read from the file: " + str(old["time"].size) + " samples")
+
+# remove the files
+del old, restored
+shutil.rmtree(directory, ignore_errors=True)
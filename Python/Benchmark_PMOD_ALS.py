@@ -0,0 +1,114 @@
+""" Check and benchmark the Pmod ALS on the simulated instruments, without hardware. """
+
+# import modules
+import os
+os.environ["WF_BACKEND"] = "sim"    # run on the simulated instruments
+import Pmod_ALS as als
+import WF_Session as session
+import WF_SIM as sim
+from timeit import timeit
+
+# number of timed transfers
+repeat = 200
+
+"""-------------------------------------------------------------------"""
+
+def legacy_read_static(bytes_count):
+    """
+        the original static SPI engine of Pmod_ALS._read_static_
+    """
+    wf = als.wf
+    wf.static.set_state(wf.device.data, als.pins.cs, False)
+    bits = []
+    for _ in range(8 * bytes_count):
+        if als.settings._spi_mode_ < 2:
+            wf.static.set_state(wf.device.data, als.pins.sck, True)
+        else:
+            wf.static.set_state(wf.device.data, als.pins.sck, False)
+        if als.settings._spi_mode_ / 2 == 0:
+            bits.append(wf.static.get_state(wf.device.data, als.pins.sdo))
+        if als.settings._spi_mode_ < 2:
+            wf.static.set_state(wf.device.data, als.pins.sck, False)
+        else:
+            wf.static.set_state(wf.device.data, als.pins.sck, True)
+        if als.settings._spi_mode_ / 2 == 1:
+            bits.append(wf.static.get_state(wf.device.data, als.pins.sdo))
+    wf.static.set_state(wf.device.data, als.pins.cs, True)
+    data = []
+    for index_high in range(bytes_count):
+        current_byte = []
+        for index_low in range(8):
+            if bits[round(index_high * 8 + index_low)]:
+                bits[round(index_high * 8 + index_low)] = 1
+            else:
+                bits[round(index_high * 8 + index_low)] = 0
+            current_byte.append(bits[round(index_high * 8 + index_low)])
+        if als.settings._msb_first_:
+            current_byte = current_byte[::-1]
+        multiplier = 1
+        data.append(0)
+        for bit in current_byte:
+            data[index_high] += (multiplier * bit)
+            multiplier *= 2
+    return data
+
+"""-------------------------------------------------------------------"""
+
+# wire the virtual sensor, raise the spi frequency, so the engines are not delayed
+sim.model.als.cs, sim.model.als.sdo, sim.model.als.sck = als.pins.cs, als.pins.sdo, als.pins.sck
+als.settings._spi_frequency_ = 1e09
+sim.model.als.level = 0xA5
+word = sim.model.als_bytes(3)
+for mode in range(4):
+    als.settings._spi_mode_ = mode
+    sim.model.als.mode = mode
+    for msb_first in [True, False]:
+        als.settings._msb_first_ = msb_first
+        for length in [1, 2, 3]:
+            als._default_._open_static_()
+            data = als._default_._read_static_(length)
+            expected = word[:length]
+            if not msb_first:
+                expected = [int(format(value, "08b")[::-1], 2) for value in expected]
+            assert data == expected, (mode, msb_first, length, data, expected)
+    # compare with the original engine
+    als.settings._msb_first_ = True
+    try:
+        legacy = "correct" if legacy_read_static(2) == word[:2] else "wrong data"
+    except IndexError:
+        legacy = "no data"
+    print("mode " + str(mode) + ": current engine correct, legacy engine " + legacy)
+
+# timing: both engines make the same 50 instrument calls, which take most of the transfer
+als.settings._spi_mode_ = 0
+sim.model.als.mode = 0
+als._default_._open_static_()
+current = timeit(lambda: als._default_._read_static_(2), number=repeat) / repeat
+legacy = timeit(lambda: legacy_read_static(2), number=repeat) / repeat
+print("2 byte transfer on the simulator: legacy " + str(round(legacy * 1e06, 1)) + "us, current " + str(round(current * 1e06, 1)) + "us")
+# the time spent by the engines themselves, with instrument calls which do nothing
+set_state, get_state = als.wf.static.set_state, als.wf.static.get_state
+als.wf.static.set_state = lambda device_data, channel, value: None
+als.wf.static.get_state = lambda device_data, channel: True
+current = timeit(lambda: als._default_._read_static_(2), number=repeat) / repeat
+legacy = timeit(lambda: legacy_read_static(2), number=repeat) / repeat
+als.wf.static.set_state, als.wf.static.get_state = set_state, get_state
+print("2 byte transfer without instrument latency: legacy " + str(round(legacy * 1e06, 1)) + "us, current " + str(round(current * 1e06, 1)) + "us")
+
+# instrument calls of 10 readings
+als.settings._spi_frequency_ = 1e06
+for rx_mode in ["static", "spi"]:
+    sim.core.reset()
+    assert als.read_percent_many(10, rx_mode=rx_mode) == round(0xA5 * 100 / 255, 2)
+    print("10 readings in " + rx_mode + " mode: " + str(sim.core.total_calls()) + " instrument calls, " + str(round(sim.core.now() * 1e03, 2)) + "ms simulated instrument time")
+
+# instrument churn of alternating static and spi readings, like Test_PMOD_ALS
+for reopen in [True, False]:
+    sim.core.reset()
+    session.reset_statistics()
+    for _ in range(10):
+        als.read(rx_mode="static", reopen=reopen)
+        als.read(rx_mode="static", reopen=reopen)
+        als.read(rx_mode="spi", reopen=reopen)
+    statistics = session.statistics()
+    print("30 mixed readings, reopen=" + str(reopen) + ": " + str(sum(statistics["reconfigurations"].values())) + " reconfigurations, " + str(sum(statistics["reuses"].values())) + " reuses, " + str(sim.core.total_calls()) + " instrument calls")
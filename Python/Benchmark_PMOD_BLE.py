@@ -0,0 +1,286 @@
+""" Benchmark the Pmod BLE decoding and encoding paths on synthetic data, without hardware. """
+
+# import modules
+import os
+os.environ["WF_BACKEND"] = "sim"    # run on the simulated instruments
+import Pmod_BLE as ble
+import WF_SIM as sim
+import numpy as np
+from timeit import timeit
+
+# number of timed runs for each case
+repeat = 20
+
+"""-------------------------------------------------------------------"""
+
+def synthetic_buffer(length, max_gap=0, seed=0):
+    """
+        generate a logic analyzer buffer of "length" samples,
+        containing UART frames of random bytes
+
+        frames are separated by random idle gaps of 0 to max_gap samples
+    """
+    random = np.random.default_rng(seed)
+    multiplier = ble.settings._record_multiplier_
+    frame_count = -(-length // (10 * multiplier))
+    data = random.integers(0, 256, frame_count)
+    # start bit, 8 data bits (LSB first), stop bit
+    bits = np.zeros((frame_count, 10), dtype=int)
+    bits[:, 1:9] = (data[:, None] >> np.arange(8)) & 1
+    bits[:, 9] = 1
+    frames = np.repeat(bits, multiplier, axis=1)
+    samples = []
+    complete = 0
+    for frame in frames:
+        samples.extend(frame)
+        # count the frames which fit in the buffer
+        if len(samples) <= length:
+            complete += 1
+        samples.extend([1] * random.integers(0, max_gap + 1))
+    samples = samples[:length]
+    return [int(sample) for sample in samples], data.tolist()[:complete]
+
+"""-------------------------------------------------------------------"""
+
+def legacy_decode(buffer):
+    """
+        the original pure Python decoder of Pmod_BLE._read_logic_
+    """
+    multiplier = ble.settings._record_multiplier_
+    bits = []
+    normalizer = max(buffer)
+    for index_high in range(round(len(buffer) / multiplier)):
+        bits.append(0)
+        for index_low in range(multiplier):
+            try:
+                bits[index_high] += (buffer[round(index_high * multiplier + index_low)] / normalizer)
+            except:
+                pass
+        if bits[index_high] > multiplier * ble.settings._treshold_:
+            bits[index_high] = 1
+        else:
+            bits[index_high] = 0
+    words = []
+    for index_high in range(round(len(bits) / 10)):
+        words.append([])
+        for index_low in range(10):
+            try:
+                words[index_high].append(bits[round(index_high * 10 + index_low)])
+            except:
+                pass
+    data = []
+    for element in words:
+        if len(element) == 10 and element[0] == 0 and element[9] == 1:
+            value = 0
+            multiplier = 1
+            for bit in element[1:9]:
+                value += multiplier * bit
+                multiplier *= 2
+            data.append(value)
+    return data, ""
+
+"""-------------------------------------------------------------------"""
+
+def legacy_pattern(data):
+    """
+        the original pattern builder of Pmod_BLE._write_pattern_
+    """
+    if type(data) == str:
+        data = list(data)
+        data = [ord(character) for character in data]
+    elif type(data) == int:
+        data = [data]
+    out_data = []
+    for element in data:
+        element = [1 if element & (1 << (7 - n)) else 0 for n in range(8)]
+        element = element[::-1]
+        element.insert(0, 0)
+        element.append(1)
+        for bit in element:
+            out_data.append(bit)
+    return out_data
+
+"""-------------------------------------------------------------------"""
+
+def legacy_parse(data, state):
+    """
+        the original system message parser of Pmod_BLE.read (uart mode)
+    """
+    temp = ""
+    for index in range(len(data)):
+        temp += chr(data[index])
+    data = temp
+    sys_msg = ""
+    special = data.count("%")
+    if special == 0:
+        if state["currently_sys"]:
+            state["previous_msg"] = state["previous_msg"] + data
+            data = ""
+    elif special == 2:
+        sys_msg = data
+        data = ""
+        state["currently_sys"] = False
+        state["previous_msg"] = ""
+    else:
+        data_list = data.split("%")
+        if state["currently_sys"]:
+            sys_msg = state["previous_msg"] + data_list[0] + "%"
+            state["currently_sys"] = False
+            state["previous_msg"] = ""
+            data = data_list[1]
+        else:
+            state["currently_sys"] = True
+            state["previous_msg"] = "%" + data_list[1]
+            data = data_list[0]
+    return data, sys_msg
+
+"""-------------------------------------------------------------------"""
+
+def synthetic_stream(length, seed=0):
+    """
+        generate a stream of data bytes and system messages
+
+        returns:    stream, data, list of system messages
+    """
+    random = np.random.default_rng(seed)
+    stream = bytearray()
+    data = bytearray()
+    messages = []
+    while len(stream) < length:
+        if random.random() < 0.2:
+            message = b"%" + bytes(random.integers(0x41, 0x5B, random.integers(0, 20), dtype=np.uint8)) + b"%"
+            messages.append(message)
+            stream += message
+        else:
+            chunk = bytes(random.integers(0x26, 0x100, random.integers(1, 30), dtype=np.uint8))
+            data += chunk
+            stream += chunk
+    return bytes(stream), bytes(data), messages
+
+"""-------------------------------------------------------------------"""
+
+def split(stream, seed=0):
+    """
+        split a stream into random chunks, like consecutive reads
+    """
+    random = np.random.default_rng(seed)
+    chunks = []
+    position = 0
+    while position < len(stream):
+        length = int(random.integers(1, 64))
+        chunks.append(stream[position:position + length])
+        position += length
+    return chunks
+
+"""-------------------------------------------------------------------"""
+
+def report(name, legacy, current):
+    """
+        display the average run time of both implementations
+    """
+    legacy = legacy / repeat * 1e06
+    current = current / repeat * 1e06
+    print(name + ": legacy " + str(round(legacy, 1)) + "us, current " + str(round(current, 1)) + "us, speedup " + str(round(legacy / current, 1)) + "x")
+    return
+
+"""-------------------------------------------------------------------"""
+
+# decoder benchmark
+for length in [600, 32000]:
+    buffer, expected = synthetic_buffer(length)
+    assert ble._default_._decode_logic_(buffer) == legacy_decode(buffer) == (expected, "")
+    legacy = timeit(lambda: legacy_decode(buffer), number=repeat)
+    current = timeit(lambda: ble._default_._decode_logic_(buffer), number=repeat)
+    report("decode " + str(length) + " samples", legacy, current)
+
+# framing robustness with idle gaps between bytes
+for length in [600, 32000]:
+    buffer, expected = synthetic_buffer(length, max_gap=3 * ble.settings._record_multiplier_, seed=1)
+    legacy, _ = legacy_decode(buffer)
+    current, error = ble._default_._decode_logic_(buffer)
+    assert current == expected
+    print("gapped " + str(length) + " samples: " + str(len(expected)) + " bytes sent, legacy decoded " + str(len(legacy)) + ", current decoded " + str(len(current)))
+
+# pattern builder benchmark
+for length in [1, 64, 4096]:
+    message = "".join(chr(character) for character in np.random.default_rng(2).integers(0, 128, length))
+    assert list(ble._build_pattern_(message)) == legacy_pattern(message)
+    legacy = timeit(lambda: legacy_pattern(message), number=repeat)
+    current = timeit(lambda: ble._build_pattern_(message), number=repeat)
+    report("pattern " + str(length) + " bytes", legacy, current)
+
+# end to end, through the simulated instruments
+sim.model.ble.tx, sim.model.ble.rx = ble.pins.tx, ble.pins.rx
+sim.model.send("hello")
+data, sys_msg, error = ble.read(rx_mode="logic")
+assert data == "hello", (data, sys_msg, error)
+# a non-blocking read leaves the logic analyzer armed for the next message
+assert ble.read(rx_mode="logic")[0] == ""
+sim.model.send("armed")
+assert ble.read(rx_mode="logic")[0] == "armed"
+ble.write_data("ok", tx_mode="pattern")
+assert sim.model.receive() == b"ok"
+print("simulated link: " + str(sim.core.total_calls()) + " instrument calls, " + str(round(sim.core.now() * 1e03, 2)) + "ms simulated instrument time")
+
+# streaming receiver, with bytes split between reads of the continuous recording
+sim.model.send(bytes(range(256)))
+ble.start_stream()
+received = bytes(ble.stream_bytes(timeout=1))
+ble.stop_stream()
+assert received == bytes(range(256)), received
+statistics = ble.stream_statistics()
+print("streaming: 256 bytes received in " + str(statistics["reads"]) + " reads, " + str(statistics["lost"]) + " samples lost, " + str(statistics["overruns"]) + " samples dropped")
+
+# two Pmods streaming at different baud rates, recorded in one acquisition
+second = sim.model.add_ble(11, 12, 13, 14)
+second.baud_rate = 9600
+pmod = ble.PmodBLE(pins={"rx": 11, "tx": 12, "rst": 13, "status": 14}, settings={"_baud_rate_": 9600})
+ble.start_stream()
+pmod.start_stream()
+# a Pmod joining restarts the acquisition, send when both are recorded
+while ble._recorder_._changed_:
+    pass
+sim.model.send(b"first lamp")
+sim.model.send(b"second lamp", device=second)
+first_received = bytes(ble.stream_bytes(timeout=1))
+second_received = bytes(pmod.stream_bytes(timeout=1))
+pmod.stop_stream()
+ble.stop_stream()
+assert first_received == b"first lamp" and second_received == b"second lamp", (first_received, second_received)
+print("streaming two Pmods: " + str(len(first_received)) + " and " + str(len(second_received)) + " bytes received")
+
+# adaptive oversampling, with triggered captures of 4 byte messages
+sim.core.settings.realtime = True
+ble.settings._buffer_size_ = 600
+ble.settings._auto_tune_ = True
+ble.settings._tune_window_ = 20
+ble._tune_._statistics_ = {}
+lost = 0
+for index in range(60):
+    sim.model.send(bytes([0x40 | (index & 0x3F), 0x80, 0xC0, 0x55]))
+    data, sys_msg, error = ble.read(rx_mode="logic")
+    lost += 4 - len(data)
+sim.core.settings.realtime = False
+print("auto tuning: oversampling " + str(ble.settings._record_multiplier_) + "x, buffer " + str(ble.settings._buffer_size_) + " samples, " + str(lost) + " bytes lost")
+for multiplier, statistics in ble.tune_statistics().items():
+    print("    " + str(multiplier) + "x: " + str(statistics["captures"]) + " captures, error rate " + str(round(statistics["error_rate"] * 100, 1)) + "%, capture time " + str(round(statistics["capture_time"] * 1e03, 3)) + "ms")
+
+# system message tokenizer: fuzzing with random chunking
+for seed in range(20):
+    stream, expected_data, expected_messages = synthetic_stream(5000, seed)
+    data = bytearray()
+    messages = []
+    for chunk in split(stream, seed):
+        chunk_data, chunk_messages = ble._default_._tokenize_(chunk)
+        data += chunk_data
+        messages += chunk_messages
+    assert bytes(data) == expected_data and messages == expected_messages, seed
+print("tokenizer fuzzing passed")
+
+# system message tokenizer: throughput on a large stream
+stream, _, _ = synthetic_stream(1000000, 1)
+chunks = split(stream, 1)
+state = {"currently_sys": False, "previous_msg": ""}
+legacy = timeit(lambda: [legacy_parse(chunk, state) for chunk in chunks], number=1)
+current = timeit(lambda: [ble._default_._tokenize_(chunk) for chunk in chunks], number=1)
+print("tokenize " + str(len(stream)) + " bytes in " + str(len(chunks)) + " reads: legacy " + str(round(legacy * 1e03, 1)) + "ms, current " + str(round(current * 1e03, 1)) + "ms")
@@ -0,0 +1,86 @@
+""" Compare the timer and the change triggered telemetry on the simulated instruments, without hardware. """
+
+# import modules
+import os
+os.environ["WF_BACKEND"] = "sim"    # run on the simulated instruments
+import Pmod_BLE as ble
+import Pmod_ALS as als
+import Lamp_Unit as unit
+import WF_SIM as sim
+from WF_Backend import wf
+
+# one hour of telemetry cycles
+cycle = 10
+duration = 3600
+
+"""-------------------------------------------------------------------"""
+
+class clock:
+    """
+        virtual time of the telemetry task
+    """
+    now = 0
+
+    def monotonic():
+        return clock.now
+
+"""-------------------------------------------------------------------"""
+
+def scenario(time):
+    """
+        the ambient light and the voltages at a time: stable for half an
+        hour, then the room gets darker and the charger is plugged in
+    """
+    if time < duration / 2:
+        sim.model.als.level, sim.model.scope.voltages[4] = 128, 0
+    else:
+        sim.model.als.level = max(128 - (time - duration / 2) / 4, 40)
+        sim.model.scope.voltages[4] = 5 if time >= duration * 0.75 else 0
+    return
+
+"""-------------------------------------------------------------------"""
+
+def run(trigger):
+    """
+        run the telemetry task of a lamp for an hour
+
+        returns:    the lamp, instrument calls, bytes sent
+    """
+    sim.core.reset()
+    sim.model.receive()
+    lamp = unit.Lamp("lamp", device_data, battery=True, settings={"telemetry_trigger": trigger})
+    lamp.flags.connected = True
+    clock.now = 0
+    while clock.now < duration:
+        scenario(clock.now)
+        lamp.telemetry_task()
+        clock.now += cycle
+    return lamp, sim.core.total_calls(), len(sim.model.receive())
+
+"""-------------------------------------------------------------------"""
+
+# connect the Pmods to the simulated ones
+ble.pins.rx, ble.pins.tx, ble.pins.rst, ble.pins.status = sim.model.ble.rx, sim.model.ble.tx, sim.model.ble.rst, sim.model.ble.status
+als.pins.cs, als.pins.sdo, als.pins.sck = sim.model.als.cs, sim.model.als.sdo, sim.model.als.sck
+sim.model.als.noise = 0.5
+device_data = wf.device.open()
+unit.monotonic = clock.monotonic
+
+results = {}
+for trigger in ["timer", "change"]:
+    lamp, calls, sent = run(trigger)
+    results[trigger] = lamp
+    counters = lamp.counters
+    print(trigger + ": " + str(counters.probes) + " probes, " + str(counters.measurements) + " measurements, " + str(counters.transmissions) + " transmissions, " + str(calls) + " instrument calls, " + str(sent) + " bytes sent")
+
+# every change is reported, and the maximum interval is kept
+timer, change = results["timer"], results["change"]
+assert change.counters.probes == timer.counters.measurements
+assert change.counters.saved_measurements == change.counters.probes - change.counters.measurements
+assert change.counters.saved_transmissions == change.counters.probes - change.counters.transmissions
+assert change.counters.transmissions >= duration / unit.settings.telemetry_interval[1]
+assert abs(change.flags.reported[0] - timer.flags.reported[0]) <= unit.settings.telemetry_deadband["light"]
+assert change.flags.reported[2] > 4
+print("saved: " + str(change.counters.saved_measurements) + " measurement and " + str(change.counters.saved_transmissions) + " transmit cycles of " + str(change.counters.probes))
+
+wf.device.close(device_data)
@@ -0,0 +1,90 @@
+""" Benchmark the color transition schedules on the simulated instruments, without hardware. """
+
+# import modules
+import os
+os.environ["WF_BACKEND"] = "sim"    # run on the simulated instruments
+import Lamp_Transition as transition
+import Lamp_LED as led
+import WF_SIM as sim
+import numpy as np
+from timeit import timeit
+
+# number of timed runs
+repeat = 100
+
+"""-------------------------------------------------------------------"""
+
+def stepped_fade(start, end, duration):
+    """
+        fade by stepping every channel in Python at the frame rate
+
+        returns:    list of colors, one for every frame
+    """
+    frames = max(int(np.ceil(duration / transition.settings.frame_period)), 1)
+    colors = []
+    for frame in range(frames + 1):
+        progress = frame / frames
+        colors.append(tuple(start[index] + (end[index] - start[index]) * progress for index in range(3)))
+    return colors
+
+"""-------------------------------------------------------------------"""
+
+scenes = [((0, 0, 0), (100, 100, 100), 1), ((0, 0, 0), (10, 5, 0), 2), ((80, 20, 40), (20, 60, 40), 0.5)]
+
+# schedules are monotonic, end on the target color and keep only changing frames
+for start, end, duration in scenes:
+    for curve in ["linear", "gamma", "eased"]:
+        times, colors = transition.render(start, end, duration, curve)
+        assert times[0] == 0 and abs(times[-1] - duration) < 1e-09, (times[0], times[-1])
+        assert tuple(colors[0]) == start and tuple(colors[-1]) == end
+        assert np.all(np.any(colors[1:] != colors[:-1], axis=1))
+        if curve == "linear":
+            assert np.all(np.diff(colors, axis=0) * np.sign(np.subtract(end, start)) >= 0)
+
+# pattern generator calls of a fade, frame by frame or with the schedule
+for start, end, duration in scenes:
+    stepped = led.RGBLED(settings={"pwm_steps": 1e09})  # no rounding, like the Python stepping
+    for color in stepped_fade(start, end, duration):
+        stepped.set_color(*color)
+    scheduled = led.RGBLED()
+    times, colors = transition.render(start, end, duration, "linear")
+    for color in colors:
+        scheduled.set_color(*color)
+    print("fade " + str(start) + " -> " + str(end) + " in " + str(duration) + "s: stepped " + str(stepped.counters.calls) + " calls, schedule " + str(len(times)) + " frames, " + str(scheduled.counters.calls) + " calls")
+
+# rendering and cache
+start, end, duration = scenes[0]
+transition.clear_cache()
+rendering = timeit(lambda: (transition.clear_cache(), transition.render(start, end, duration, "gamma")), number=repeat) / repeat
+cached = timeit(lambda: transition.render(start, end, duration, "gamma"), number=repeat) / repeat
+stepping = timeit(lambda: stepped_fade(start, end, duration), number=repeat) / repeat
+print("render 1s fade: Python stepping " + str(round(stepping * 1e06, 1)) + "us, vectorized " + str(round(rendering * 1e06, 1)) + "us, cached " + str(round(cached * 1e06, 1)) + "us")
+print("cache: " + str(transition.cache_info()))
+
+# the cache follows its size setting
+transition.settings.cache_size = 2
+for red in range(3):
+    transition.render((0, 0, 0), (red, 0, 0), 1)
+assert transition.cache_info().maxsize == 2 and transition.cache_info().currsize == 2
+transition.settings.cache_size = 128
+
+# playback through the simulated pattern generator
+sim.core.reset()
+schedule = transition.render((0, 0, 0), (100, 50, 0), 1, "eased")
+elapsed = 0
+finished = False
+while not finished:
+    color, finished = transition.color_at(schedule, elapsed)
+    led.set_color(*color, device_data=sim.device.data)
+    elapsed += 0.01
+assert np.allclose(led._flags_._duty_, [100, 50, 0], atol=100 / led.settings.pwm_steps)
+print("playback: " + str(sim.core.total_calls()) + " instrument calls")
+
+# the requested duty cycles are written, changes below one PWM step are not
+led.set_color(0, 50, 0, device_data=sim.device.data)
+assert led._flags_._duty_ == [0, 50, 0]
+calls = sim.core.total_calls()
+led.set_color(0, 50.1, 0, device_data=sim.device.data)
+assert led._flags_._duty_ == [0, 50, 0] and sim.core.total_calls() == calls
+led.set_color(0, 51, 0, device_data=sim.device.data)
+assert led._flags_._duty_ == [0, 51, 0]
@@ -0,0 +1,279 @@
+""" This module encodes and decodes the data exchanged with the Android application """
+
+"""
+    Every byte sent over Bluetooth carries a 2-bit prefix, which selects
+    the channel, and a 6-bit value. Incoming bytes set the red, green and
+    blue LED intensities in percentage, outgoing bytes report the light
+    intensity, the battery and the charger voltages, scaled between their
+    limits. Decoding uses precomputed tables for all 256 byte values,
+    encoding works on single values or on whole batches of readings.
+
+    The extended telemetry protocol uses the unused 00 prefix, so the
+    6-bit decoders skip its bytes and both schemes can share the link.
+    A record starts with a header byte, 00 1 kk mm b, where kk is the
+    prefix of the metric (pre_light, pre_bat, pre_charge) and mm the
+    record type, followed by continuation bytes, 00 0 ccccc:
+        mm = 00 - the 12-bit sample changed by +1 (b = 0) or -1 (b = 1)
+        mm = 01 - 6-bit signed change, b and one continuation byte
+        mm = 1x - 12-bit absolute sample, x, b and two continuation bytes
+    Unchanged samples are not sent, except in every keyframe cycle, when
+    every sample is sent as an absolute value.
+"""
+
+import numpy as np
+
+"""-------------------------------------------------------------------"""
+
+# encoding prefixes
+pre_red = 0b11
+pre_green = 0b10
+pre_blue = 0b01
+pre_bat = 0b11
+pre_charge = 0b10
+pre_light = 0b01
+
+# color index (0 - red, 1 - green, 2 - blue, -1 - none) of every byte
+_color_table_ = [{pre_red: 0, pre_green: 1, pre_blue: 2}.get(value >> 6, -1) for value in range(256)]
+# percentage of every byte
+_percent_table_ = [round((value & 0x3F) / 0x3F * 100) for value in range(256)]
+_color_array_ = np.array(_color_table_, dtype=np.int8)
+_percent_array_ = np.array(_percent_table_, dtype=np.uint8)
+
+# extended telemetry
+_ext_start_ = 0x20  # marks the header byte of a record
+_ext_max_ = 0xFFF   # 12-bit samples
+_ext_length_ = [0, 1, 2, 2]     # continuation bytes of every record type
+
+"""-------------------------------------------------------------------"""
+""" FUNCTIONS FOR INTERNAL USE """
+"""-------------------------------------------------------------------"""
+
+def _to_bytes_(data):
+    """
+        cast a string, an integer or a list of integers to bytes
+    """
+    if type(data) == str:
+        return data.encode("latin-1", "replace")
+    if type(data) == int:
+        return bytes([data & 0xFF])
+    if type(data) in [bytes, bytearray]:
+        return data
+    return bytes([element & 0xFF for element in data])
+
+"""-------------------------------------------------------------------"""
+""" USER FUNCTIONS """
+"""-------------------------------------------------------------------"""
+
+def decode_colors(data, color=(0, 0, 0)):
+    """
+        decode incoming Bluetooth data
+
+        color - the current (red, green, blue) percentages, the channels
+                which are not present in data are left unchanged
+
+        returns:    [red, green, blue]
+    """
+    color = list(color)
+    for value in _to_bytes_(data):
+        index = _color_table_[value]
+        if index >= 0:
+            color[index] = _percent_table_[value]
+    return color
+
+"""-------------------------------------------------------------------"""
+
+def decode_stream(data):
+    """
+        decode a long stream of bytes, e.g. a captured Bluetooth log
+
+        returns:    color index array (-1 for bytes without a color prefix), percentage array
+    """
+    data = np.frombuffer(_to_bytes_(data), dtype=np.uint8)
+    return _color_array_[data], _percent_array_[data]
+
+"""-------------------------------------------------------------------"""
+
+def encode(data, prefix, lim_max, lim_min=0):
+    """
+        encode a real number between lim_min and lim_max
+
+        returns 0 (no prefix) for invalid values
+    """
+    return encode_many([data], [prefix], [lim_max], [lim_min])[0]
+
+"""-------------------------------------------------------------------"""
+
+def encode_many(data, prefix, lim_max, lim_min=0):
+    """
+        encode a batch of real numbers between lim_min and lim_max
+
+        prefix, lim_max and lim_min can be single values, or lists
+        with one element for every number
+
+        returns:    bytes
+    """
+    data = np.asarray(data, dtype=float)
+    lim_max = np.asarray(lim_max, dtype=float)
+    lim_min = np.asarray(lim_min, dtype=float)
+    valid = np.isfinite(data) & (lim_max > lim_min)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # clamp between min and max limits
+        scaled = np.clip(data, lim_min, lim_max)
+        # map between 0b000000 and 0b111111
+        scaled = (scaled - lim_min) / (lim_max - lim_min) * 0x3F
+    scaled = np.where(valid, scaled, 0).astype(int)
+    # append prefix
+    encoded = (scaled & 0x3F) | (np.asarray(prefix, dtype=int) << 6)
+    return bytes(np.where(valid, encoded, 0).astype(np.uint8))
+
+"""-------------------------------------------------------------------"""
+
+def decode_value(data, lim_max, lim_min=0):
+    """
+        inverse of encode, restore the value of an encoded byte
+
+        the result differs from the encoded number by less than
+        (lim_max - lim_min) / 63
+
+        returns:    prefix, value
+    """
+    return data >> 6, lim_min + (data & 0x3F) / 0x3F * (lim_max - lim_min)
+
+"""-------------------------------------------------------------------"""
+""" EXTENDED TELEMETRY """
+"""-------------------------------------------------------------------"""
+
+class TelemetryEncoder:
+    """
+        encode telemetry in the extended protocol, keeping the last sent
+        sample of every metric
+    """
+    def __init__(self, prefix, lim_max, lim_min=0, keyframe=30, legacy=False):
+        """
+            prefix, lim_max, lim_min - lists with one element for every
+                                       metric, or single values
+            keyframe - every "keyframe"-th cycle sends absolute samples,
+                       0 sends them only after a reset
+            legacy (True/False) - send the 6-bit bytes as well, for older receivers
+        """
+        self.prefix = np.atleast_1d(np.asarray(prefix, dtype=int))
+        self.lim_max = np.broadcast_to(np.asarray(lim_max, dtype=float), self.prefix.shape)
+        self.lim_min = np.broadcast_to(np.asarray(lim_min, dtype=float), self.prefix.shape)
+        self.keyframe = keyframe
+        self.legacy = legacy
+        self.sent = 0   # bytes encoded
+        self.skipped = 0    # unchanged samples which were not sent
+        self._last_ = [None] * self.prefix.size
+        self._cycle_ = 0
+
+    def encode(self, data):
+        """
+            encode one sample of every metric
+
+            returns:    bytes
+        """
+        data = np.asarray(data, dtype=float)
+        valid = np.isfinite(data) & (self.lim_max > self.lim_min)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scaled = (np.clip(data, self.lim_min, self.lim_max) - self.lim_min) / (self.lim_max - self.lim_min) * _ext_max_
+        samples = np.where(valid, np.round(scaled), 0).astype(int).tolist()
+        keyframe = self._cycle_ == 0 or (self.keyframe > 0 and self._cycle_ % self.keyframe == 0)
+        self._cycle_ += 1
+        encoded = bytearray(encode_many(data, self.prefix, self.lim_max, self.lim_min)) if self.legacy else bytearray()
+        for index, sample in enumerate(samples):
+            if not valid[index]:
+                continue
+            header = _ext_start_ | (int(self.prefix[index]) << 3)
+            last = self._last_[index]
+            change = 0 if last is None else sample - last
+            if last is None or keyframe or not -32 <= change <= 31:
+                # absolute sample
+                encoded += bytes([header | 0x04 | (sample >> 10), (sample >> 5) & 0x1F, sample & 0x1F])
+            elif change == 0:
+                self.skipped += 1
+            elif change in [1, -1]:
+                encoded.append(header | (0 if change > 0 else 1))
+            else:
+                change &= 0x3F
+                encoded += bytes([header | 0x02 | (change >> 5), change & 0x1F])
+            self._last_[index] = sample
+        self.sent += len(encoded)
+        return bytes(encoded)
+
+    def reset(self):
+        """
+            send absolute samples in the next cycle, e.g. after a reconnection
+        """
+        self._cycle_ = 0
+        return
+
+"""-------------------------------------------------------------------"""
+
+class TelemetryDecoder:
+    """
+        decode the extended and the 6-bit telemetry, e.g. on the receiver side
+    """
+    def __init__(self, prefix, lim_max, lim_min=0):
+        """
+            prefix, lim_max, lim_min - lists with one element for every
+                                       metric, or single values
+        """
+        prefix = np.atleast_1d(np.asarray(prefix, dtype=int))
+        lim_max = np.broadcast_to(np.asarray(lim_max, dtype=float), prefix.shape)
+        lim_min = np.broadcast_to(np.asarray(lim_min, dtype=float), prefix.shape)
+        self._limits_ = {int(key): (float(low), float(high)) for key, low, high in zip(prefix, lim_min, lim_max)}
+        self._last_ = {key: None for key in self._limits_}     # last 12-bit sample of every metric
+        self._header_ = None    # header of the record being received
+        self._continuation_ = []
+
+    def _apply_(self, header, continuation, result):
+        """
+            update a metric with a complete record
+        """
+        key = (header >> 3) & 0x03
+        if key not in self._limits_:
+            return
+        kind = (header >> 1) & 0x03
+        last = self._last_[key]
+        if kind >= 2:
+            sample = ((header & 0x03) << 10) | (continuation[0] << 5) | continuation[1]
+        elif last is None:
+            # a change without a known sample, wait for the next absolute one
+            return
+        elif kind == 1:
+            change = ((header & 0x01) << 5) | continuation[0]
+            sample = last + (change - 64 if change >= 32 else change)
+        else:
+            sample = last + (-1 if header & 0x01 else 1)
+        self._last_[key] = sample
+        low, high = self._limits_[key]
+        result[key] = low + sample / _ext_max_ * (high - low)
+        return
+
+    def decode(self, data):
+        """
+            decode received bytes, records may be split between calls
+
+            the 6-bit bytes of a metric are used until its first extended record
+
+            returns:    dictionary of the updated values, by prefix
+        """
+        result = {}
+        for value in _to_bytes_(data):
+            if value >> 6 != 0:
+                # 6-bit sample, ignored once the metric is received in the extended protocol
+                key = value >> 6
+                if key in self._limits_ and self._last_[key] is None:
+                    low, high = self._limits_[key]
+                    result[key] = low + (value & 0x3F) / 0x3F * (high - low)
+            elif value & _ext_start_:
+                self._header_ = value
+                self._continuation_ = []
+            elif self._header_ is not None:
+                self._continuation_.append(value & 0x1F)
+            else:
+                continue
+            if self._header_ is not None and len(self._continuation_) == _ext_length_[(self._header_ >> 1) & 0x03]:
+                self._apply_(self._header_, self._continuation_, result)
+                self._header_ = None
+        return result
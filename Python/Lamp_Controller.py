@@ -3,8 +3,15 @@
 # import modules
 import Pmod_BLE as ble
 import Pmod_ALS as als
-import WF_SDK as wf
-from time import time
+import Lamp_Scheduler as scheduler
+import Lamp_LED as led
+import Lamp_Unit as unit
+import Lamp_Scope as scope
+import Lamp_Trace as trace
+import Lamp_Log as log
+import WF_Session as session
+import WF_Executor as executor
+from WF_Backend import wf # import WaveForms instruments, or the simulator
 
 # define connections
 # PMOD BLE pins
@@ -17,213 +24,148 @@ als.pins.cs = 8
 als.pins.sdo = 9
 als.pins.sck = 10
 # scope channels
-SC_BAT_P = 1
-SC_BAT_N = 2
-SC_CHARGE = 4
+scope.channels.battery_p = 1
+scope.channels.battery_n = 2
+scope.channels.charger = 4
 # LED colors
-LED_R = 0
-LED_G = 1
-LED_B = 2
+led.pins.red = 0
+led.pins.green = 1
+led.pins.blue = 2
 
 # other parameters
-scope_average = 10  # how many measurements to average with the scope
-light_average = 10  # how many measurements to average with the light sensor
-led_pwm_frequency = 1e03    # in Hz
-out_data_update = 10    # output data update time [s]
-ble.settings.DEBUG = True   # turn on messages from Pmod BLE
-als.settings.DEBUG = True   # turn on messages from Pmod ALS
-DEBUG = True                # turn on messages
-
-# encoding prefixes
-pre_red = 0b11
-pre_green = 0b10
-pre_blue = 0b01
-pre_bat = 0b11
-pre_charge = 0b10
-pre_light = 0b01
-
-class flags:
-    red = 0
-    green = 0
-    blue = 0
-    last_red = -1
-    last_green = -1
-    last_blue = -1
-    start_time = 0
+scope.settings.buffer_size = 10    # how many measurements to average with the scope
+unit.settings.light_average = 5   # how many measurements to average with the light sensor
+unit.settings.light_method = "hampel"  # "mean", "median", "trimmed" or "hampel" (mean without the outliers)
+led.settings.pwm_frequency = 1e03  # in Hz
+led.settings.coalesce_window = 0.02    # merge color changes closer than this [s]
+unit.settings.out_data_update = 10    # output data update time [s]
+unit.settings.receive_period = (0.01, 0.2)    # period of the BLE receive task, when active and idle [s]
+unit.settings.led_period = (0.01, 0.1)    # period of the LED output task, when active and idle [s]
+unit.settings.status_period = (0.1, 1)    # period of the link status task, when active and idle [s]
+unit.settings.auto_brightness = False  # scale the color by the ambient light
+unit.settings.brightness_curve = ((0, 30, 70, 100), (1.0, 0.7, 0.3, 0.1))   # ambient light [%] and color scale points
+unit.settings.brightness_hysteresis = 3   # ambient light change which updates the scale [%]
+unit.settings.light_period = (0.1, 5)     # period of the light sampling, when changing and stable [s]
+unit.settings.fade_duration = 0  # length of the transition to a new color [s], 0 to turn off
+unit.settings.fade_curve = "gamma"  # "linear", "gamma" (perceived brightness) or "eased"
+unit.settings.history_path = None  # directory of the telemetry history files, None keeps it in memory
+unit.settings.telemetry_protocol = "legacy"   # "legacy" (6-bit bytes) or "extended" (12-bit, changes only)
+unit.settings.telemetry_mirror = False  # send the 6-bit bytes next to the extended ones, for older receivers
+unit.settings.telemetry_trigger = "timer"    # "timer" (every out_data_update) or "change" (only changed values)
+unit.settings.telemetry_interval = (10, 60)   # minimum and maximum time between two reports [s]
+unit.settings.telemetry_deadband = {"light": 2, "battery": 0.02, "charger": 0.2}  # changes which trigger a report [%, V, V]
+executor.settings.parallel = False  # True measures with several instruments at once, not verified on hardware yet
+statistics_period = 60  # time between scheduler statistics messages [s]
+log.set_level("ble", log.INFO)  # messages from Pmod BLE
+log.set_level("als", log.INFO)  # messages from Pmod ALS
+log.set_level("led", log.WARNING)   # DEBUG shows every color change
+log.set_level("controller", log.INFO)   # messages from the controller
+log.set_level("trace", log.INFO)    # latency summaries, if tracing
+TRACE = False               # measure the latency of the control path
+trace_file = None           # save the Chrome trace in this file, if tracing
+
+logger = log.get("controller")
+lamps = []
 
 """-------------------------------------------------------------------"""
 
-def rgb_led(red, green, blue, device_data):
+def create_lamps(device_data):
     """
-        define the LED color in precentage
-    """
-    wf.pattern.generate(device_data, LED_R, wf.pattern.function.pulse, led_pwm_frequency, duty_cycle=red)
-    wf.pattern.generate(device_data, LED_G, wf.pattern.function.pulse, led_pwm_frequency, duty_cycle=green)
-    wf.pattern.generate(device_data, LED_B, wf.pattern.function.pulse, led_pwm_frequency, duty_cycle=blue)
-    return
+        create the lamps driven by the device
 
-"""-------------------------------------------------------------------"""
+        more lamps can be added with their own Pmods and LED, e.g.
+        unit.Lamp("lamp2", device_data, ble.PmodBLE(device_data, pins={"rx": 11, "tx": 12, "rst": 13, "status": 14}),
+                  als.PmodALS(device_data, pins={"cs": 15, "sdo": 16, "sck": 17}),
+                  led.RGBLED(device_data, pins={"red": 18, "green": 19, "blue": 20}))
 
-def decode(data):
-    """
-        decode incoming Bluetooth data
+        returns:    list of lamps
     """
-    # convert to list
-    for character in list(data):
-        # convert character to integer
-        character = ord(character)
-        # check prefixes and extract content
-        if character & 0xC0 == pre_red << 6:
-            flags.red = round((character & 0x3F) / 0x3F * 100)
-        elif character & 0xC0 == pre_green << 6:
-            flags.green = round((character & 0x3F) / 0x3F * 100)
-        elif character & 0xC0 == pre_blue << 6:
-            flags.blue = round((character & 0x3F) / 0x3F * 100)
-        else:
-            pass
-    return
+    # the default Pmods and LED, configured above
+    return [unit.Lamp("lamp", device_data, battery=True)]
 
 """-------------------------------------------------------------------"""
 
-def encode(data, prefix, lim_max, lim_min=0):
+def statistics_task():
     """
-        encode real numbers between lim_min and lim_max
+        display the loop latency and the CPU use
     """
-    try:
-        # clamp between min and max limits
-        data = max(min(data, lim_max), lim_min)
-        # map between 0b000000 and 0b111111
-        data = (data - lim_min) / (lim_max - lim_min) * 0x3F
-        # append prefix
-        data = (int(data) & 0x3F) | (prefix << 6)
-        return data
-    except:
-        return 0
+    if logger.enabled(log.INFO):
+        statistics = scheduler.statistics()
+        logger.info("cpu use", percent=round(statistics["cpu_use"] * 100, 1))
+        for lamp in lamps:
+            logger.info("led calls " + lamp.name, made=lamp.led.counters.calls, saved=lamp.led.counters.saved)
+            counters = lamp.counters
+            logger.info("telemetry " + lamp.name, probes=counters.probes, measurements=counters.measurements, transmissions=counters.transmissions, saved_measurements=counters.saved_measurements, saved_transmissions=counters.saved_transmissions)
+        logger.info("instrument reconfigurations", **session.counters.reconfigurations)
+        logger.info("instrument calls", submitted=executor.counters.submitted, overlapped=executor.counters.overlapped)
+        for name, task in statistics["tasks"].items():
+            logger.info("task " + name, runs=task["runs"], latency_ms=round(task["mean_latency"] * 1e03, 2), max_latency_ms=round(task["max_latency"] * 1e03, 2), run_time_ms=round(task["mean_run_time"] * 1e03, 2))
+    if trace.enabled():
+        trace.report(force=True)
+    return True
 
 """-------------------------------------------------------------------"""
 
 try:
+    # start tracing before the first instrument call
+    if TRACE:
+        trace.settings.chrome_trace = trace_file is not None
+        trace.enable()
     # initialize the interface
     device_data = wf.device.open()
     # check for connection errors
     wf.device.check_error(device_data)
-    if DEBUG:
-        print(device_data.name + " connected")
+    logger.info("device connected", name=device_data.name)
     # start the power supplies
     supplies_data = wf.supplies.data()
     supplies_data.master_state = True
     supplies_data.state = True
     supplies_data.voltage = 3.3
-    wf.supplies.switch(device_data, supplies_data)
-    if DEBUG:
-        print("power supplies started")
-    # initialize the light sensor
-    als.open()
-    # initialize the Bluetooth module
-    ble.open()
-    ble.reboot()
-    
-    # turn off the lamp
-    rgb_led(0, 0, 0, device_data)
-    if DEBUG:
-        print("entering main loop")
+    executor.call(device_data, "supplies", wf.supplies.switch, device_data, supplies_data)
+    logger.info("power supplies started")
+    # initialize the lamps
+    lamps = create_lamps(device_data)
+    for lamp in lamps:
+        lamp.open()
+
+    # register the tasks
+    for lamp in lamps:
+        lamp.schedule()
+    scheduler.add("statistics", statistics_task, statistics_period)
+    logger.info("entering main loop")
 
     """----------------"""
 
     # main loop
-    while True:
-        if ble.get_status():
-            # check timing
-            duration = time() - flags.start_time
-            if duration >= out_data_update:
-                # save current time
-                flags.start_time = time()
-                # measure the light intensity
-                light = 0
-                for _ in range(light_average):
-                    light += als.read_percent(rx_mode="static", reopen=False)
-                light /= light_average
-
-                # encode and send the light intensity
-                light = encode(light, pre_light, 100)
-                ble.write_data(light, tx_mode="pattern", reopen=False)
-
-                # read battery voltage
-                batt_n = 0
-                batt_p = 0
-                for _ in range(scope_average):
-                    batt_n += wf.scope.measure(device_data, SC_BAT_N)
-                batt_n /= scope_average
-                for _ in range(scope_average):
-                    batt_p += wf.scope.measure(device_data, SC_BAT_P)
-                batt_p /= scope_average
-                battery_voltage = batt_p - batt_n
-
-                # encode and send voltage
-                battery_voltage = encode(battery_voltage, pre_bat, 5)
-                ble.write_data(battery_voltage, tx_mode="pattern", reopen=False)
-
-                # read charger state
-                charger_voltage = 0
-                for _ in range(scope_average):
-                    charger_voltage += wf.scope.measure(device_data, SC_CHARGE)
-                charger_voltage /= scope_average
-
-                # encode and send voltage
-                charger_voltage = encode(charger_voltage, pre_charge, 5)
-                ble.write_data(charger_voltage, tx_mode="pattern", reopen=False)
-
-            """----------------"""
-
-            # process the data and set lamp color
-            data, sys_msg, error = ble.read(blocking=True, rx_mode="logic", reopen=False)
-            if len(data) > 0:
-                # decode incoming data
-                decode(data)
-                # set the color
-                if flags.red != flags.last_red:
-                    flags.last_red = flags.red
-                    rgb_led(flags.red, flags.green, flags.blue, device_data)
-                    if DEBUG:
-                        print("red: " + str(flags.red) + "%")
-                elif flags.green != flags.last_green:
-                    flags.last_green = flags.green
-                    rgb_led(flags.red, flags.green, flags.blue, device_data)
-                    if DEBUG:
-                        print("green: " + str(flags.green) + "%")
-                elif flags.last_blue != flags.blue:
-                    flags.last_blue = flags.blue
-                    rgb_led(flags.red, flags.green, flags.blue, device_data)
-                    if DEBUG:
-                        print("blue: " + str(flags.blue) + "%")
-        else:
-            rgb_led(0, 0, 0, device_data)
-
-        """----------------"""     
+    scheduler.run()
 
 except KeyboardInterrupt:
     # exit on Ctrl+C
-    if DEBUG:
-        print("keyboard interrupt detected")
+    logger.info("keyboard interrupt detected")
 
 finally:
-    if DEBUG:
-        print("closing used instruments")
-    # turn off the lamp
-    rgb_led(0, 0, 0, device_data)
-    # close PMODs
-    ble.close(True)
-    als.close(True)
+    logger.info("closing used instruments")
+    # turn off the lamps and close the Pmods, the last one resets the instruments
+    for index, lamp in enumerate(lamps):
+        lamp.close(index == len(lamps) - 1)
+    scope.close(device_data)
     # stop and reset the power supplies
     supplies_data = wf.supplies.data()
     supplies_data.master_state = False
     supplies_data.state = False
     supplies_data.voltage = 0
-    wf.supplies.switch(device_data, supplies_data)
-    wf.supplies.close(device_data)
-    if DEBUG:
-        print("power supplies stopped")
+    executor.call(device_data, "supplies", wf.supplies.switch, device_data, supplies_data)
+    executor.call(device_data, "supplies", wf.supplies.close, device_data)
+    logger.info("power supplies stopped")
+    # wait for the running instrument calls
+    executor.shutdown()
     # close device
     wf.device.close(device_data)
-    if DEBUG:
-        print("script stopped")
+    if TRACE:
+        trace.report(force=True)
+        if trace_file is not None:
+            trace.export_chrome_trace(trace_file)
+        trace.disable()
+    logger.info("script stopped")
+    # write the remaining messages
+    log.stop()
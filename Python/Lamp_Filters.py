@@ -0,0 +1,230 @@
+""" This module filters the sensor readings of the lamp """
+
+"""
+    Streaming filters take one sample at a time, in constant time for the
+    exponential moving average and in logarithmic search time for the
+    windowed median, which keeps its window sorted with bisect. The Hampel
+    filter replaces samples farther from the median of the window than a
+    few median absolute deviations, e.g. a failed light reading of 0, so a
+    single glitch does not move the output. In large windows the median
+    absolute deviation is selected by bisection from the two sorted halves
+    of the window, without sorting the deviations; small windows, like the
+    default ones, sort them, which is faster there. Failed readings (NaN)
+    are ignored by every filter.
+
+    Block filters reduce a batch of readings (e.g. the buffer of one scope
+    acquisition) to a single value with array operations: the mean of the
+    samples left after removing the outliers is as stable as a plain mean
+    of more samples, and is not pulled away by glitches.
+"""
+
+import numpy as np
+from bisect import bisect_left, insort
+from collections import deque
+
+"""-------------------------------------------------------------------"""
+
+# median absolute deviation to standard deviation, for normally distributed samples
+_mad_scale_ = 1.4826
+# windows from this size select the median absolute deviation by bisection, smaller ones sort
+_bisect_window_ = 16
+
+"""-------------------------------------------------------------------"""
+""" FUNCTIONS FOR INTERNAL USE """
+"""-------------------------------------------------------------------"""
+
+def _middle_(values):
+    """
+        the median of a sorted list, None if it is empty
+    """
+    count = len(values)
+    if count == 0:
+        return None
+    middle = count // 2
+    if count % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+def _middle_deviation_(values, median):
+    """
+        the median absolute deviation of a sorted list from its median
+
+        the deviations below the median grow towards the start of the list,
+        the ones above it towards the end, the k-th smallest of the two
+        sorted sequences is found by bisection in logarithmic time,
+        small lists are faster to sort
+    """
+    count = len(values)
+    if count < _bisect_window_:
+        return _middle_(sorted([abs(value - median) for value in values]))
+    split = bisect_left(values, median)
+    def smallest(rank):
+        # take "taken" deviations from below the median and the rest from above
+        low, high = max(0, rank + 1 - count + split), min(rank + 1, split)
+        while low < high:
+            taken = (low + high) // 2
+            if median - values[split - 1 - taken] < values[split + rank - taken] - median:
+                low = taken + 1
+            else:
+                high = taken
+        if low == 0:
+            return values[split + rank] - median
+        if low == rank + 1:
+            return median - values[split - low]
+        return max(median - values[split - low], values[split + rank - low] - median)
+    if count % 2:
+        return smallest(count // 2)
+    return (smallest(count // 2 - 1) + smallest(count // 2)) / 2
+
+"""-------------------------------------------------------------------"""
+""" BLOCK FILTERS """
+"""-------------------------------------------------------------------"""
+
+def reject(data, threshold=3, floor=0, axis=-1):
+    """
+        replace the outliers of blocks of samples with NaN (Hampel identifier)
+
+        threshold - outliers are farther from the median than "threshold"
+                    scaled median absolute deviations
+        floor - smallest deviation which can be an outlier, e.g. one step
+                of a quantized reading
+        axis - the axis of the samples of a block
+
+        returns:    array of the samples
+    """
+    data = np.asarray(data, dtype=float)
+    if np.all(np.isnan(data)):
+        return data
+    median = np.nanmedian(data, axis=axis, keepdims=True)
+    deviation = np.abs(data - median)
+    limit = np.maximum(threshold * _mad_scale_ * np.nanmedian(deviation, axis=axis, keepdims=True), floor)
+    return np.where(deviation > limit, np.nan, data)
+
+"""-------------------------------------------------------------------"""
+
+def robust_mean(data, threshold=3, floor=0, axis=-1):
+    """
+        mean of blocks of samples without the outliers and the failed readings
+
+        returns:    mean (array for several blocks), NaN if there is no valid sample
+    """
+    data = reject(data, threshold, floor, axis)
+    valid = ~np.isnan(data)
+    count = np.sum(valid, axis=axis)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.sum(np.where(valid, data, 0), axis=axis) / count
+    return mean if np.ndim(mean) > 0 else float(mean)
+
+"""-------------------------------------------------------------------"""
+""" STREAMING FILTERS """
+"""-------------------------------------------------------------------"""
+
+class EMA:
+    """
+        exponential moving average
+    """
+    def __init__(self, alpha=0.5):
+        """
+            alpha - weight of a new sample, 1 turns off the filter
+        """
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, sample):
+        """
+            add a sample
+
+            returns:    the filtered value, None before the first valid sample
+        """
+        if not np.isnan(sample):
+            if self.value is None:
+                self.value = float(sample)
+            else:
+                self.value += self.alpha * (sample - self.value)
+        return self.value
+
+    def reset(self):
+        self.value = None
+        return
+
+"""-------------------------------------------------------------------"""
+
+class MovingMedian:
+    """
+        median of the last "window" samples
+    """
+    def __init__(self, window=5):
+        self.window = window
+        self._samples_ = deque()    # samples in arrival order
+        self._sorted_ = []  # the same samples, sorted
+
+    def update(self, sample):
+        """
+            add a sample, removing the oldest one if the window is full
+
+            returns:    the median, None before the first valid sample
+        """
+        if not np.isnan(sample):
+            sample = float(sample)
+            self._samples_.append(sample)
+            insort(self._sorted_, sample)
+            if len(self._samples_) > self.window:
+                del self._sorted_[bisect_left(self._sorted_, self._samples_.popleft())]
+        return self.value
+
+    @property
+    def value(self):
+        return _middle_(self._sorted_)
+
+    def full(self):
+        """
+            returns:    True if the window is full
+        """
+        return len(self._samples_) == self.window
+
+    def reset(self):
+        self._samples_.clear()
+        self._sorted_ = []
+        return
+
+"""-------------------------------------------------------------------"""
+
+class Hampel:
+    """
+        replace the outliers of a stream with the median of the last samples
+    """
+    def __init__(self, window=5, threshold=3, floor=0):
+        """
+            window - number of samples the median is computed from
+            threshold - outliers are farther from the median than "threshold"
+                        scaled median absolute deviations
+            floor - smallest deviation which can be an outlier
+        """
+        self.threshold = threshold
+        self.floor = floor
+        self.rejected = 0   # number of replaced samples
+        self._median_ = MovingMedian(window)
+
+    def update(self, sample):
+        """
+            add a sample
+
+            outliers enter the window as well, so a lasting change passes
+            after half a window
+
+            returns:    the sample, or the median if it is an outlier
+        """
+        median = self._median_.value
+        outlier = False
+        if not np.isnan(sample) and self._median_.full():
+            deviation = _middle_deviation_(self._median_._sorted_, median)
+            outlier = abs(sample - median) > max(self.threshold * _mad_scale_ * deviation, self.floor)
+        self._median_.update(sample)
+        if outlier:
+            self.rejected += 1
+            return median
+        return median if np.isnan(sample) else float(sample)
+
+    def reset(self):
+        self._median_.reset()
+        return
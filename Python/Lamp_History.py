@@ -0,0 +1,397 @@
+""" This module stores the telemetry history of a lamp """
+
+"""
+    Every measurement is kept at full precision, in fixed size ring buffers,
+    so the memory use is bounded however long the lamp runs. Besides the
+    raw samples, the minimum, mean and maximum of every metric are rolled
+    up over every minute and every hour, so weeks of battery curves fit
+    in a few megabytes. Range queries use binary search on the time column
+    of the rings and only copy the requested rows.
+
+    Optionally every level is also appended to a binary file of float64
+    records (time, then the values of the metrics for raw samples; time,
+    sample count, then the minimum, mean and maximum of the metrics for
+    rollups). Rows are written once, in batches, without rewriting the
+    file. The files are read back through memory mapping, both to restore
+    the rings after a restart and to answer queries older than the rings.
+    Only complete rollup intervals are written: the open ones are rebuilt
+    from the finer levels after a restart, so an interval spanning a restart
+    is stored once.
+"""
+
+import os
+import numpy as np
+from time import time
+
+"""-------------------------------------------------------------------"""
+
+class settings:
+    raw_size = 60480    # raw samples kept in memory, a week at 10s intervals
+    minute_size = 20160     # minute rollups kept in memory, two weeks
+    hour_size = 8760    # hour rollups kept in memory, a year
+    write_batch = 64    # rows buffered before they are appended to the file
+
+# resolution levels: name, bucket width [s]
+levels = [("raw", 0), ("minute", 60), ("hour", 3600)]
+
+"""-------------------------------------------------------------------"""
+""" FUNCTIONS FOR INTERNAL USE """
+"""-------------------------------------------------------------------"""
+
+class _ring_:
+    """
+        fixed size ring buffer of float64 rows, ordered by the first column (time)
+    """
+    def __init__(self, capacity, columns):
+        self.data = np.full((capacity, columns), np.nan)
+        self.head = 0   # index of the next row
+        self.count = 0
+
+    def append(self, rows):
+        """
+            add rows, overwriting the oldest ones when the ring is full
+        """
+        capacity = self.data.shape[0]
+        rows = rows[-capacity:]
+        end = self.head + rows.shape[0]
+        if end <= capacity:
+            self.data[self.head:end] = rows
+        else:
+            split = capacity - self.head
+            self.data[self.head:] = rows[:split]
+            self.data[:end - capacity] = rows[split:]
+        self.head = end % capacity
+        self.count = min(self.count + rows.shape[0], capacity)
+        return
+
+    def segments(self):
+        """
+            the stored rows as chronological views, without copying
+        """
+        if self.count < self.data.shape[0]:
+            return [self.data[:self.count]]
+        return [self.data[self.head:], self.data[:self.head]]
+
+    def oldest(self):
+        """
+            the time of the oldest row, inf if the ring is empty
+        """
+        if self.count == 0:
+            return np.inf
+        return self.segments()[0][0, 0]
+
+    def range(self, start, end):
+        """
+            copy of the rows with start <= time <= end
+        """
+        parts = []
+        for segment in self.segments():
+            first = np.searchsorted(segment[:, 0], start, side="left")
+            last = np.searchsorted(segment[:, 0], end, side="right")
+            parts.append(segment[first:last])
+        return np.concatenate(parts) if len(parts) > 1 else parts[0].copy()
+
+    def newest(self):
+        """
+            the time of the newest row, -inf if the ring is empty
+        """
+        if self.count == 0:
+            return -np.inf
+        return self.data[self.head - 1, 0]
+
+"""-------------------------------------------------------------------"""
+
+class _bucket_:
+    """
+        accumulator of the minimum, sum and maximum of a rollup interval
+    """
+    def __init__(self, width, metrics):
+        self.width = width
+        self.start = None
+        self.count = 0
+        self.valid = np.zeros(metrics)  # samples of every metric which are not NaN
+        self.minimum = np.full(metrics, np.nan)
+        self.total = np.zeros(metrics)
+        self.maximum = np.full(metrics, np.nan)
+
+    def add(self, start, count, valid, minimum, total, maximum):
+        """
+            add a sample or a finer rollup
+        """
+        self.start = start if self.start is None else self.start
+        self.count += count
+        self.valid += valid
+        self.minimum = np.fmin(self.minimum, minimum)
+        self.total += total
+        self.maximum = np.fmax(self.maximum, maximum)
+        return
+
+    def row(self):
+        """
+            the rollup row: time, count, minimums, means, maximums
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(self.valid > 0, self.total / self.valid, np.nan)
+        return np.concatenate([[self.start, self.count], self.minimum, mean, self.maximum])
+
+    def clear(self):
+        self.__init__(self.width, self.total.size)
+        return
+
+"""-------------------------------------------------------------------"""
+""" HISTORY OBJECTS """
+"""-------------------------------------------------------------------"""
+
+class History:
+    """
+        multi-resolution time series of a set of metrics
+    """
+    def __init__(self, metrics, path=None):
+        """
+            metrics - list of the metric names, e.g. ["light", "battery", "charger"]
+            path - prefix of the history files, the history is kept
+                   in memory only if it is None, its directory is created
+        """
+        self.metrics = list(metrics)
+        self.path = path
+        count = len(self.metrics)
+        sizes = {"raw": settings.raw_size, "minute": settings.minute_size, "hour": settings.hour_size}
+        self._rings_ = {}
+        self._buckets_ = {}
+        self._pending_ = {}     # rows waiting to be written
+        for name, width in levels:
+            columns = 1 + count if width == 0 else 2 + 3 * count
+            self._rings_[name] = _ring_(sizes[name], columns)
+            self._pending_[name] = []
+            if width > 0:
+                self._buckets_[name] = _bucket_(width, count)
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory != "":
+                os.makedirs(directory, exist_ok=True)
+            self._restore_()
+            self._resume_()
+
+    """-------------------------------------------------------------------"""
+    """ FUNCTIONS FOR INTERNAL USE """
+    """-------------------------------------------------------------------"""
+
+    def _file_(self, level):
+        """
+            the name of the file of a level
+        """
+        return self.path + "." + level + ".bin"
+
+    """-------------------------------------------------------------------"""
+
+    def _map_(self, level):
+        """
+            memory map the rows written to the file of a level
+
+            returns:    read only array of rows, None if there is no file
+        """
+        name = self._file_(level)
+        columns = self._rings_[level].data.shape[1]
+        if not os.path.exists(name) or os.path.getsize(name) < columns * 8:
+            return None
+        rows = os.path.getsize(name) // (columns * 8)
+        return np.memmap(name, dtype=np.float64, mode="r", shape=(rows, columns))
+
+    """-------------------------------------------------------------------"""
+
+    def _restore_(self):
+        """
+            load the newest rows of the files into the rings
+        """
+        for level, _ in levels:
+            rows = self._map_(level)
+            if rows is not None:
+                self._rings_[level].append(np.array(rows[-self._rings_[level].data.shape[0]:]))
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _resume_(self):
+        """
+            reopen the rollup intervals which were open when the history was
+            closed, from the restored rows of the finer levels
+        """
+        count = len(self.metrics)
+        # the coarse levels first, closing a finer interval adds it to them
+        for index in range(len(levels) - 1, 0, -1):
+            level, width = levels[index]
+            finer, finer_width = levels[index - 1]
+            rows = self._rings_[finer].range(self._rings_[level].newest() + width, np.inf)
+            for row in rows:
+                if finer_width == 0:
+                    values = row[1:]
+                    valid = ~np.isnan(values)
+                    self._roll_(index, row[0], 1, valid, values, np.where(valid, values, 0), values)
+                else:
+                    # the sums are restored from the means, weighted by the sample count
+                    mean = row[2 + count:2 + 2 * count]
+                    valid = np.where(np.isnan(mean), 0, row[1])
+                    self._roll_(index, row[0], row[1], valid, row[2:2 + count], np.where(valid > 0, mean * valid, 0), row[2 + 2 * count:])
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _store_(self, level, row):
+        """
+            add a row to a level, and to its file
+        """
+        self._rings_[level].append(row[None, :])
+        if self.path is not None:
+            self._pending_[level].append(row)
+            if len(self._pending_[level]) >= settings.write_batch:
+                self._write_(level)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _write_(self, level):
+        """
+            append the waiting rows of a level to its file
+        """
+        if len(self._pending_[level]) == 0:
+            return
+        with open(self._file_(level), "ab") as file:
+            file.write(np.array(self._pending_[level], dtype=np.float64).tobytes())
+        self._pending_[level] = []
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _roll_(self, index, start, count, valid, minimum, total, maximum):
+        """
+            add a sample or a rollup to the bucket of a level, closing the
+            bucket and passing it to the next level when its interval is over
+        """
+        if index >= len(levels):
+            return
+        level, width = levels[index]
+        bucket = self._buckets_[level]
+        bucket_start = np.floor(start / width) * width
+        if bucket.start is not None and bucket_start != bucket.start:
+            self._close_bucket_(index)
+        bucket.add(bucket_start, count, valid, minimum, total, maximum)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _close_bucket_(self, index):
+        """
+            store the bucket of a level and pass it to the next level
+        """
+        level, _ = levels[index]
+        bucket = self._buckets_[level]
+        if bucket.start is None:
+            return
+        row = bucket.row()
+        self._store_(level, row)
+        self._roll_(index + 1, bucket.start, bucket.count, bucket.valid, bucket.minimum, bucket.total, bucket.maximum)
+        bucket.clear()
+        return
+
+    """-------------------------------------------------------------------"""
+    """ USER FUNCTIONS """
+    """-------------------------------------------------------------------"""
+
+    def append(self, values, timestamp=None):
+        """
+            store a measurement of every metric
+
+            values - list in the order of the metrics, or dictionary
+                     (missing metrics are NaN)
+            timestamp - time of the measurement [s since the epoch], now by default
+        """
+        if type(values) == dict:
+            values = [values.get(metric, np.nan) for metric in self.metrics]
+        values = np.asarray(values, dtype=np.float64)
+        timestamp = time() if timestamp is None else timestamp
+        self._store_("raw", np.concatenate([[timestamp], values]))
+        valid = ~np.isnan(values)
+        self._roll_(1, timestamp, 1, valid, values, np.where(valid, values, 0), values)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def query(self, metric, start=None, end=None, resolution="auto"):
+        """
+            get the history of a metric between two times
+
+            start, end - times [s since the epoch], the whole history if None
+            resolution - "raw", "minute", "hour", or "auto" for the finest
+                         level which is kept in memory from "start"
+
+            returns:    dictionary of arrays: "time", "min", "mean", "max"
+                        (for raw samples all three are the values)
+        """
+        index = self.metrics.index(metric)
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        if resolution == "auto":
+            resolution = "hour"
+            for level, _ in levels:
+                if self._rings_[level].oldest() <= start or self._rings_[level].count < self._rings_[level].data.shape[0]:
+                    resolution = level
+                    break
+        ring = self._rings_[resolution]
+        rows = ring.range(start, end)
+        # older rows are read from the file
+        if self.path is not None and start < ring.oldest():
+            self._write_(resolution)
+            stored = self._map_(resolution)
+            if stored is not None:
+                first = np.searchsorted(stored[:, 0], start, side="left")
+                if end < ring.oldest():
+                    last = np.searchsorted(stored[:, 0], end, side="right")
+                else:
+                    last = np.searchsorted(stored[:, 0], ring.oldest(), side="left")
+                rows = np.concatenate([np.array(stored[first:last]), rows])
+        if resolution == "raw":
+            values = rows[:, 1 + index]
+            return {"time": rows[:, 0], "min": values, "mean": values, "max": values}
+        count = len(self.metrics)
+        return {"time": rows[:, 0], "min": rows[:, 2 + index], "mean": rows[:, 2 + count + index], "max": rows[:, 2 + 2 * count + index]}
+
+    """-------------------------------------------------------------------"""
+
+    def latest(self, metric):
+        """
+            returns:    time and value of the newest sample of a metric, None if there is none
+        """
+        ring = self._rings_["raw"]
+        if ring.count == 0:
+            return None
+        row = ring.data[ring.head - 1]
+        return row[0], row[1 + self.metrics.index(metric)]
+
+    """-------------------------------------------------------------------"""
+
+    def memory(self):
+        """
+            returns:    bytes allocated by the rings
+        """
+        return sum(ring.data.nbytes for ring in self._rings_.values())
+
+    """-------------------------------------------------------------------"""
+
+    def flush(self):
+        """
+            write the waiting rows to the files
+        """
+        if self.path is not None:
+            for level, _ in levels:
+                self._write_(level)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def close(self):
+        """
+            write everything to the files, the open rollup intervals are
+            rebuilt from them after a restart
+        """
+        self.flush()
+        return
@@ -0,0 +1,249 @@
+""" This module drives the RGB LED of the lamp """
+
+"""
+    Every color channel is a PWM signal generated by the pattern generator.
+    The last duty cycle of every channel is cached and only the channels
+    which changed are reprogrammed. Color updates arriving within the
+    coalescing window are merged, so only the last one reaches the
+    instrument. A channel is reprogrammed only if the requested duty cycle
+    is at least one PWM step away from the programmed one, or is 0% or
+    100%, and then with the requested value, so smaller changes do not
+    reach the instrument.
+    The number of pattern generator calls made and saved is counted.
+
+    Every RGBLED object drives one LED, so several lamps can share the
+    pattern generator. The module level functions drive the default LED,
+    which is configured by the module level classes.
+"""
+
+import copy
+from WF_Backend import wf # import WaveForms instruments, or the simulator
+import WF_Executor as executor
+import Lamp_Trace as trace
+import Lamp_Log as log
+from time import monotonic
+
+"""-------------------------------------------------------------------"""
+
+class pins:
+    red = 0 # pattern generator channel of the red LED
+    green = 1   # pattern generator channel of the green LED
+    blue = 2    # pattern generator channel of the blue LED
+
+class settings:
+    pwm_frequency = 1e03    # in Hz
+    coalesce_window = 0     # updates closer than this are merged [s]
+    pwm_steps = 255     # duty cycle steps between 0% and 100%, smaller changes are ignored
+
+class counters:
+    updates = 0     # requested color updates
+    calls = 0       # pattern generator calls made
+    saved = 0       # pattern generator calls skipped
+
+class _flags_:
+    _duty_ = [None, None, None]     # last programmed duty cycles
+    _pending_ = None    # color waiting for the end of the coalescing window
+    _pending_since_ = 0
+
+_log_ = log.get("led")
+
+"""-------------------------------------------------------------------"""
+""" FUNCTIONS FOR INTERNAL USE """
+"""-------------------------------------------------------------------"""
+
+def _copy_(template, values=None):
+    """
+        create an independent copy of a settings or state class
+
+        values - object or dictionary, overrides some of the attributes
+    """
+    content = {name: copy.deepcopy(value) for name, value in vars(template).items() if not name.startswith("__")}
+    if values is not None:
+        if type(values) != dict:
+            values = {name: value for name, value in vars(values).items() if not name.startswith("__")}
+        content.update(values)
+    return type(template.__name__, (), content)
+
+# configuration and state of a new LED
+_initial_ = {template.__name__: _copy_(template) for template in [pins, settings, counters, _flags_]}
+
+"""-------------------------------------------------------------------"""
+""" RGB LED OBJECTS """
+"""-------------------------------------------------------------------"""
+
+class RGBLED:
+    """
+        an RGB LED driven by three pattern generator channels
+    """
+    def __init__(self, device_data=None, pins=None, settings=None):
+        """
+            device_data - the device the LED is connected to,
+                          wf.device.data by default
+            pins - object or dictionary with the red, green and blue channels
+            settings - object or dictionary overriding the default settings
+        """
+        self.device_data = device_data
+        self.pins = _copy_(_initial_["pins"], pins)
+        self.settings = _copy_(_initial_["settings"], settings)
+        self.counters = _copy_(_initial_["counters"])
+        self._flags_ = _copy_(_initial_["_flags_"])
+
+    """-------------------------------------------------------------------"""
+    """ FUNCTIONS FOR INTERNAL USE """
+    """-------------------------------------------------------------------"""
+
+    def _device_(self, device_data=None):
+        """
+            the device the LED is connected to
+        """
+        if device_data is not None:
+            return device_data
+        return wf.device.data if self.device_data is None else self.device_data
+
+    """-------------------------------------------------------------------"""
+
+    def _changed_(self, index, duty):
+        """
+            returns True if a channel has to be reprogrammed: it was never
+            programmed, the duty cycle moved at least one PWM step, or it
+            moved to 0% or 100%, so the LED can always be turned off
+        """
+        programmed = self._flags_._duty_[index]
+        if programmed is None:
+            return True
+        if duty == programmed:
+            return False
+        return duty <= 0 or duty >= 100 or abs(duty - programmed) >= 100 / self.settings.pwm_steps - 1e-09
+
+    """-------------------------------------------------------------------"""
+
+    def _apply_(self, color, device_data, force=False):
+        """
+            reprogram the channels which changed
+
+            returns:    number of reprogrammed channels
+        """
+        changed = 0
+        for index, channel in enumerate([self.pins.red, self.pins.green, self.pins.blue]):
+            if force or self._changed_(index, color[index]):
+                device = self._device_(device_data)
+                executor.call(device, "pattern", wf.pattern.generate, device, channel, wf.pattern.function.pulse, self.settings.pwm_frequency, duty_cycle=color[index])
+                self._flags_._duty_[index] = color[index]
+                self.counters.calls += 1
+                changed += 1
+            else:
+                self.counters.saved += 1
+        if changed > 0:
+            trace.event("led.color", red=color[0], green=color[1], blue=color[2])
+            _log_.debug("color", red=color[0], green=color[1], blue=color[2])
+        return changed
+
+    """-------------------------------------------------------------------"""
+    """ USER FUNCTIONS """
+    """-------------------------------------------------------------------"""
+
+    def set_color(self, red, green, blue, device_data=None, force=False):
+        """
+            define the LED color in percentage
+
+            the color is applied at once if the coalescing window is over,
+            otherwise it is applied by a later update call
+            force (True/False) - reprogram every channel immediately
+
+            returns:    number of reprogrammed channels
+        """
+        flags = self._flags_
+        red, green, blue = float(red), float(green), float(blue)
+        unchanged = not any(self._changed_(index, duty) for index, duty in enumerate((red, green, blue)))
+        if not force and (flags._pending_ == (red, green, blue) or (flags._pending_ is None and unchanged)):
+            # nothing new, apply the pending color if it is time
+            return self.update(device_data)
+        self.counters.updates += 1
+        if force:
+            flags._pending_ = None
+            return self._apply_((red, green, blue), device_data, force=True)
+        if flags._pending_ is None:
+            flags._pending_since_ = monotonic()
+        else:
+            # the previous update is replaced, without reaching the instrument
+            self.counters.saved += 3
+        flags._pending_ = (red, green, blue)
+        return self.update(device_data)
+
+    """-------------------------------------------------------------------"""
+
+    def update(self, device_data=None):
+        """
+            apply the pending color if the coalescing window is over
+
+            returns:    number of reprogrammed channels
+        """
+        flags = self._flags_
+        if flags._pending_ is None:
+            return 0
+        if monotonic() - flags._pending_since_ < self.settings.coalesce_window:
+            return 0
+        color = flags._pending_
+        flags._pending_ = None
+        return self._apply_(color, device_data)
+
+    """-------------------------------------------------------------------"""
+
+    def pending(self):
+        """
+            returns True if a color is waiting to be applied
+        """
+        return self._flags_._pending_ is not None
+
+    """-------------------------------------------------------------------"""
+
+    def invalidate(self):
+        """
+            forget the cached duty cycles, e.g. after the pattern generator was reset
+        """
+        self._flags_._duty_ = [None, None, None]
+        return
+
+"""-------------------------------------------------------------------"""
+
+# the module level functions drive this LED, configured by the module level classes
+_default_ = RGBLED()
+_default_.pins, _default_.settings, _default_.counters, _default_._flags_ = pins, settings, counters, _flags_
+
+"""-------------------------------------------------------------------"""
+""" USER FUNCTIONS """
+"""-------------------------------------------------------------------"""
+
+def set_color(red, green, blue, device_data, force=False):
+    """
+        define the LED color in percentage, see RGBLED.set_color
+
+        returns:    number of reprogrammed channels
+    """
+    return _default_.set_color(red, green, blue, device_data, force)
+
+"""-------------------------------------------------------------------"""
+
+def update(device_data):
+    """
+        apply the pending color if the coalescing window is over
+
+        returns:    number of reprogrammed channels
+    """
+    return _default_.update(device_data)
+
+"""-------------------------------------------------------------------"""
+
+def pending():
+    """
+        returns True if a color is waiting to be applied
+    """
+    return _default_.pending()
+
+"""-------------------------------------------------------------------"""
+
+def invalidate():
+    """
+        forget the cached duty cycles, e.g. after the pattern generator was reset
+    """
+    return _default_.invalidate()
@@ -0,0 +1,219 @@
+""" This module writes structured diagnostic messages in the background """
+
+"""
+    Every module gets its own logger, with its own level. A record carries
+    the time, the module, an event name and keyword fields. The calling
+    thread only checks the level and the rate limit, then puts the record
+    in a queue; formatting and writing to the (possibly slow) console is
+    done by a background thread, so turning on diagnostics does not change
+    the timing of the control loop. Repeated events of a module are rate
+    limited, separately for every source named by the identifying fields
+    (e.g. the pins of a Pmod), and the number of suppressed records is
+    reported with the next record which passes.
+"""
+
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+"""-------------------------------------------------------------------"""
+
+# levels
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+class settings:
+    rate_limit = 1      # records of the same event closer than this are dropped [s], 0 to turn off
+    queue_size = 10000  # records waiting for the writer, new records are dropped if it is full
+    json = False        # write JSON lines instead of text
+    stream = None       # output stream, stdout by default
+    identity = ("tx", "cs", "name", "channel")    # fields naming the source of an event, rate limited separately
+
+class counters:
+    dropped = 0     # records dropped because the queue was full
+    suppressed = 0  # records dropped by the rate limit
+
+class _flags_:
+    _queue_ = None
+    _handler_ = None
+    _listener_ = None
+    _last_ = {}     # time of the last record of every event and source
+    _suppressed_ = {}   # records suppressed since the last record of every event
+    _lock_ = threading.Lock()
+
+# parent of the module loggers, silent below warnings by default
+_root_ = logging.getLogger("lamp")
+_root_.setLevel(WARNING)
+_root_.propagate = False
+
+"""-------------------------------------------------------------------"""
+""" FUNCTIONS FOR INTERNAL USE """
+"""-------------------------------------------------------------------"""
+
+class _Handler_(QueueHandler):
+    """
+        put records in the queue without formatting them
+    """
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            counters.dropped += 1
+        return
+
+"""-------------------------------------------------------------------"""
+
+class _RateLimit_(logging.Filter):
+    """
+        drop records of an event which repeat faster than the rate limit,
+        the same event of another source is not dropped
+    """
+    def filter(self, record):
+        if settings.rate_limit <= 0:
+            return True
+        fields = getattr(record, "fields", {})
+        key = (record.name, record.msg) + tuple((name, fields[name]) for name in settings.identity if name in fields)
+        with _flags_._lock_:
+            if record.created - _flags_._last_.get(key, float("-inf")) < settings.rate_limit:
+                _flags_._suppressed_[key] = _flags_._suppressed_.get(key, 0) + 1
+                counters.suppressed += 1
+                return False
+            _flags_._last_[key] = record.created
+            record.suppressed = _flags_._suppressed_.pop(key, 0)
+        return True
+
+"""-------------------------------------------------------------------"""
+
+class _Formatter_(logging.Formatter):
+    """
+        format records as text or as JSON lines
+    """
+    def format(self, record):
+        module = record.name.split(".", 1)[-1]
+        fields = getattr(record, "fields", {})
+        suppressed = getattr(record, "suppressed", 0)
+        if settings.json:
+            content = {"time": record.created, "level": record.levelname, "module": module, "event": record.msg}
+            content.update(fields)
+            if suppressed > 0:
+                content["suppressed"] = suppressed
+            return json.dumps(content, default=str)
+        message = time.strftime("%H:%M:%S", time.localtime(record.created)) + "." + str(int(record.msecs)).zfill(3)
+        message += " " + record.levelname + " " + module + ": " + str(record.msg)
+        for name, value in fields.items():
+            message += " " + name + "=" + str(value)
+        if suppressed > 0:
+            message += " (" + str(suppressed) + " similar suppressed)"
+        return message
+
+"""-------------------------------------------------------------------"""
+""" USER FUNCTIONS """
+"""-------------------------------------------------------------------"""
+
+class logger:
+    """
+        structured logger of a module
+    """
+    def __init__(self, module):
+        self.module = module
+        self._logger_ = _root_.getChild(module)
+
+    def enabled(self, level):
+        """
+            returns True if records of this level are written
+        """
+        return self._logger_.isEnabledFor(level)
+
+    def log(self, level, event, **fields):
+        """
+            write a record with the event name and its fields
+        """
+        if self._logger_.isEnabledFor(level):
+            if _flags_._listener_ is None:
+                start()
+            self._logger_.log(level, event, extra={"fields": fields})
+        return
+
+    def debug(self, event, **fields):
+        self.log(DEBUG, event, **fields)
+        return
+
+    def info(self, event, **fields):
+        self.log(INFO, event, **fields)
+        return
+
+    def warning(self, event, **fields):
+        self.log(WARNING, event, **fields)
+        return
+
+    def error(self, event, **fields):
+        self.log(ERROR, event, **fields)
+        return
+
+"""-------------------------------------------------------------------"""
+
+def get(module):
+    """
+        returns:    the logger of a module
+    """
+    return logger(module)
+
+"""-------------------------------------------------------------------"""
+
+def set_level(module, level):
+    """
+        set the level of a module, or of every module if module is None
+
+        level - DEBUG, INFO, WARNING, ERROR or the name of the level
+    """
+    if module is None:
+        _root_.setLevel(level)
+    else:
+        _root_.getChild(module).setLevel(level)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def start():
+    """
+        start the background writer, it is started by the first record
+    """
+    with _flags_._lock_:
+        if _flags_._listener_ is not None:
+            return
+        _flags_._queue_ = queue.Queue(settings.queue_size)
+        _flags_._handler_ = _Handler_(_flags_._queue_)
+        _flags_._handler_.addFilter(_RateLimit_())
+        output = logging.StreamHandler(settings.stream or sys.stdout)
+        output.setFormatter(_Formatter_())
+        _flags_._listener_ = QueueListener(_flags_._queue_, output)
+        _root_.addHandler(_flags_._handler_)
+        _flags_._listener_.start()
+    return
+
+"""-------------------------------------------------------------------"""
+
+def stop():
+    """
+        write the waiting records and stop the background writer
+    """
+    with _flags_._lock_:
+        if _flags_._listener_ is None:
+            return
+        _root_.removeHandler(_flags_._handler_)
+        _flags_._listener_.stop()
+        _flags_._listener_ = None
+        _flags_._handler_ = None
+    return
+
+atexit.register(stop)
@@ -0,0 +1,135 @@
+""" This module schedules the periodic tasks of the lamp controller """
+
+"""
+    Every task is a function which is called periodically and returns
+    True if it had something to do and False if it was idle. The period
+    of an idle task is multiplied by the backoff factor, up to its
+    maximum period, and it is reset as soon as the task becomes active
+    again. Between calls the scheduler sleeps until the next deadline,
+    instead of polling the instruments in a tight loop. Due tasks are run
+    in the order of their deadlines, so the tasks of several lamps are
+    interleaved fairly, whatever order they were registered in. The loop
+    latency (how late every task is started) and the CPU use are measured.
+"""
+
+from time import monotonic, process_time, sleep
+
+"""-------------------------------------------------------------------"""
+
+class settings:
+    backoff = 2     # period multiplier for idle tasks
+
+class task:
+    name = ""
+    function = None
+    period = 0  # period when active [s]
+    max_period = 0  # period limit when idle [s]
+    current_period = 0
+    deadline = 0
+    runs = 0
+    active_runs = 0
+    run_time = 0    # total time spent in the task [s]
+    latency = 0     # total start latency [s]
+    max_latency = 0
+
+class _flags_:
+    _tasks_ = []
+    _start_wall_ = 0
+    _start_cpu_ = 0
+    _stop_ = False
+
+"""-------------------------------------------------------------------"""
+""" USER FUNCTIONS """
+"""-------------------------------------------------------------------"""
+
+def add(name, function, period, max_period=None):
+    """
+        register a task
+
+        function() is called every "period" seconds, returning True if it
+        was active, the period grows up to max_period while it is idle
+    """
+    new_task = task()
+    new_task.name = name
+    new_task.function = function
+    new_task.period = period
+    new_task.max_period = period if max_period is None else max(period, max_period)
+    new_task.current_period = period
+    new_task.deadline = monotonic()
+    _flags_._tasks_.append(new_task)
+    return new_task
+
+"""-------------------------------------------------------------------"""
+
+def run_once():
+    """
+        run every task which is due, the most overdue first
+
+        returns:    time until the next deadline [s]
+    """
+    now = monotonic()
+    due = sorted([current for current in _flags_._tasks_ if current.deadline <= now], key=lambda current: current.deadline)
+    for current in due:
+        start = monotonic()
+        # measure the start latency
+        latency = start - current.deadline
+        current.latency += latency
+        current.max_latency = max(current.max_latency, latency)
+        # run the task
+        active = current.function()
+        end = monotonic()
+        current.runs += 1
+        current.run_time += end - start
+        # adjust the period
+        if active:
+            current.active_runs += 1
+            current.current_period = current.period
+        else:
+            current.current_period = min(current.current_period * settings.backoff, current.max_period)
+        current.deadline = max(current.deadline + current.current_period, end)
+    if len(_flags_._tasks_) == 0:
+        return 0
+    return max(min(current.deadline for current in _flags_._tasks_) - monotonic(), 0)
+
+"""-------------------------------------------------------------------"""
+
+def run():
+    """
+        run the tasks until stop() is called
+    """
+    _flags_._stop_ = False
+    _flags_._start_wall_ = monotonic()
+    _flags_._start_cpu_ = process_time()
+    while not _flags_._stop_:
+        sleep(run_once())
+    return
+
+"""-------------------------------------------------------------------"""
+
+def stop():
+    """
+        stop the running scheduler after the current task
+    """
+    _flags_._stop_ = True
+    return
+
+"""-------------------------------------------------------------------"""
+
+def statistics():
+    """
+        returns:    dictionary with the CPU use and the statistics of every task
+    """
+    wall = monotonic() - _flags_._start_wall_
+    cpu = process_time() - _flags_._start_cpu_
+    result = {"cpu_use": cpu / wall if wall > 0 else 0, "tasks": {}}
+    for current in _flags_._tasks_:
+        runs = max(current.runs, 1)
+        result["tasks"][current.name] = {
+            "runs": current.runs,
+            "active_runs": current.active_runs,
+            "period": current.current_period,
+            "mean_run_time": current.run_time / runs,
+            "mean_latency": current.latency / runs,
+            "max_latency": current.max_latency,
+        }
+    return result
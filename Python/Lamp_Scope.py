@@ -0,0 +1,96 @@
+""" This module measures the battery and charger voltages of the lamp """
+
+"""
+    The oscilloscope records every used channel in a single acquisition.
+    The battery voltage is the difference of the positive and negative
+    terminals, sampled at the same moments, and the readings are averaged
+    over the recorded buffer with array operations, by default without
+    the outliers of the buffer (see Lamp_Filters).
+"""
+
+import numpy as np
+import WF_Backend as backend
+import WF_Executor as executor
+from WF_Backend import wf # import WaveForms instruments, or the simulator
+import Lamp_Log as log
+import Lamp_Filters as filters
+
+"""-------------------------------------------------------------------"""
+
+class channels:
+    battery_p = 1   # positive battery terminal
+    battery_n = 2   # negative battery terminal
+    charger = 4     # charger output
+
+class settings:
+    sampling_frequency = 10e03  # in Hz
+    buffer_size = 10    # samples averaged in every measurement
+    amplitude_range = 5     # in V
+    method = "hampel"   # "mean" or "hampel" (mean without the outliers)
+    outlier = 3     # outliers deviate more than this many (scaled) MADs from the median
+
+class _flags_:
+    _open_ = False
+
+_log_ = log.get("scope")
+
+"""-------------------------------------------------------------------"""
+""" USER FUNCTIONS """
+"""-------------------------------------------------------------------"""
+
+def open(device_data):
+    """
+        initialize the oscilloscope
+    """
+    executor.call(device_data, "scope", wf.scope.open, device_data, sampling_frequency=settings.sampling_frequency, buffer_size=settings.buffer_size, amplitude_range=settings.amplitude_range)
+    _flags_._open_ = True
+    _log_.info("opened")
+    return
+
+"""-------------------------------------------------------------------"""
+
+def record(device_data):
+    """
+        record the battery and charger channels in one acquisition
+
+        returns:    array with one row for every channel (battery_p, battery_n, charger)
+    """
+    if not _flags_._open_:
+        open(device_data)
+    return np.array(executor.call(device_data, "scope", backend.record_channels, device_data, [channels.battery_p, channels.battery_n, channels.charger]))
+
+"""-------------------------------------------------------------------"""
+
+def measure(device_data):
+    """
+        measure the averaged battery and charger voltages
+
+        returns:    battery voltage, charger voltage
+    """
+    battery_p, battery_n, charger = record(device_data)
+    if settings.method == "hampel":
+        battery, charger = filters.robust_mean([battery_p - battery_n, charger], settings.outlier)
+        return float(battery), float(charger)
+    return float(np.mean(battery_p - battery_n)), float(np.mean(charger))
+
+"""-------------------------------------------------------------------"""
+
+def measure_async(device_data):
+    """
+        measure the battery and charger voltages on the instrument executor, see WF_Executor
+
+        returns:    future of (battery voltage, charger voltage)
+    """
+    return executor.submit(device_data, "scope", measure, device_data)
+
+"""-------------------------------------------------------------------"""
+
+def close(device_data):
+    """
+        reset the oscilloscope
+    """
+    if _flags_._open_:
+        executor.call(device_data, "scope", wf.scope.close, device_data)
+        _flags_._open_ = False
+    _log_.info("closed")
+    return
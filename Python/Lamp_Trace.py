@@ -0,0 +1,228 @@
+""" This module measures the latency of the lamp control path """
+
+"""
+    Tracing is opt-in: enable() replaces the traced functions with timed
+    wrappers and disable() puts the original functions back, so the
+    control path runs unchanged while tracing is off. The durations of
+    every stage are kept in bounded buffers, from which the latency
+    percentiles and histograms are computed. Events can also be exported
+    in the Chrome trace format (chrome://tracing, Perfetto).
+"""
+
+import json
+import threading
+from collections import deque
+from time import perf_counter
+import numpy as np
+import Lamp_Log as log
+
+"""-------------------------------------------------------------------"""
+
+class settings:
+    history = 10000     # durations kept for every stage
+    chrome_trace = False    # keep events for export_chrome_trace
+    max_events = 100000     # events kept for the Chrome trace
+    summary_period = 60     # time between periodic summaries [s]
+
+class _flags_:
+    _enabled_ = False
+    _originals_ = []    # (owner, name, function) of every wrapped function
+    _durations_ = {}    # durations of every stage [s]
+    _counters_ = {}     # event counters
+    _events_ = deque()  # Chrome trace events
+    _origin_ = 0    # time of enabling
+    _last_summary_ = 0
+
+_log_ = log.get("trace")
+
+"""-------------------------------------------------------------------"""
+""" FUNCTIONS FOR INTERNAL USE """
+"""-------------------------------------------------------------------"""
+
+def _record_(stage, start, end):
+    """
+        store the duration of a stage
+    """
+    durations = _flags_._durations_.get(stage)
+    if durations is None:
+        durations = _flags_._durations_[stage] = deque(maxlen=settings.history)
+    durations.append(end - start)
+    if settings.chrome_trace:
+        _flags_._events_.append({"name": stage, "ph": "X", "ts": (start - _flags_._origin_) * 1e06, "dur": (end - start) * 1e06, "pid": 0, "tid": threading.get_ident()})
+    return
+
+"""-------------------------------------------------------------------"""
+
+def _wrap_(stage, function):
+    """
+        create a timed wrapper of a function
+    """
+    def traced(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _record_(stage, start, perf_counter())
+    traced.__wrapped__ = function
+    traced.__doc__ = function.__doc__
+    return traced
+
+"""-------------------------------------------------------------------"""
+
+def _default_targets_():
+    """
+        the traced stages of the lamp control path
+    """
+    import Pmod_BLE as ble
+    import Pmod_ALS as als
+    import Lamp_LED as led
+    import WF_Backend as backend
+    # the methods are wrapped in the classes, so every Pmod and LED is traced,
+    # the lamps receive through the streaming receiver: fetching the recording and demodulating it
+    return [(ble.PmodBLE, "read", "ble.read"), (ble.PmodBLE, "_read_logic_", "ble._read_logic_"),
+            (ble, "_fetch_stream_", "ble._fetch_stream_"), (ble.PmodBLE, "_receive_stream_", "ble._receive_stream_"),
+            (ble.PmodBLE, "_write_pattern_", "ble._write_pattern_"), (als.PmodALS, "read", "als.read"),
+            (als.PmodALS, "read_many", "als.read_many"), (backend.wf.scope, "measure", "wf.scope.measure"),
+            (backend, "record_channels", "wf.scope.record_channels"), (led.RGBLED, "set_color", "rgb_led")]
+
+"""-------------------------------------------------------------------"""
+""" USER FUNCTIONS """
+"""-------------------------------------------------------------------"""
+
+def enable(targets=None):
+    """
+        start tracing
+
+        targets - list of (module or class, function name, stage name),
+                  the lamp control path by default
+    """
+    if _flags_._enabled_:
+        return
+    if targets is None:
+        targets = _default_targets_()
+    _flags_._origin_ = perf_counter()
+    _flags_._last_summary_ = _flags_._origin_
+    _flags_._events_ = deque(maxlen=settings.max_events)
+    for owner, name, stage in targets:
+        function = getattr(owner, name)
+        _flags_._originals_.append((owner, name, function))
+        setattr(owner, name, _wrap_(stage, function))
+    _flags_._enabled_ = True
+    return
+
+"""-------------------------------------------------------------------"""
+
+def disable():
+    """
+        stop tracing and restore the original functions
+    """
+    for owner, name, function in reversed(_flags_._originals_):
+        setattr(owner, name, function)
+    _flags_._originals_ = []
+    _flags_._enabled_ = False
+    return
+
+"""-------------------------------------------------------------------"""
+
+def enabled():
+    """
+        returns True while tracing
+    """
+    return _flags_._enabled_
+
+"""-------------------------------------------------------------------"""
+
+def count(name, value=1):
+    """
+        increment an event counter, while tracing
+    """
+    if _flags_._enabled_:
+        _flags_._counters_[name] = _flags_._counters_.get(name, 0) + value
+    return
+
+"""-------------------------------------------------------------------"""
+
+def event(name, **fields):
+    """
+        record an instant event with its fields, while tracing
+    """
+    if _flags_._enabled_:
+        _flags_._counters_[name] = _flags_._counters_.get(name, 0) + 1
+        if settings.chrome_trace:
+            _flags_._events_.append({"name": name, "ph": "i", "s": "t", "ts": (perf_counter() - _flags_._origin_) * 1e06, "pid": 0, "tid": threading.get_ident(), "args": fields})
+    return
+
+"""-------------------------------------------------------------------"""
+
+def summary():
+    """
+        returns:    dictionary with the number of calls, mean, p50, p99 and
+                    maximum latency [s] of every stage, and the counters
+    """
+    stages = {}
+    for stage, durations in list(_flags_._durations_.items()):
+        values = np.array(durations)
+        if values.size == 0:
+            continue
+        p50, p99 = np.percentile(values, [50, 99])
+        stages[stage] = {"calls": values.size, "mean": float(values.mean()), "p50": float(p50), "p99": float(p99), "max": float(values.max())}
+    return {"stages": stages, "counters": dict(_flags_._counters_)}
+
+"""-------------------------------------------------------------------"""
+
+def histogram(stage, bins=20):
+    """
+        latency histogram of a stage, with logarithmic bins
+
+        returns:    counts, bin edges [s]
+    """
+    values = np.array(_flags_._durations_.get(stage, []))
+    if values.size == 0:
+        return np.zeros(0, dtype=int), np.zeros(0)
+    low = max(values.min(), 1e-09)
+    high = max(values.max(), low * 10)
+    edges = np.logspace(np.log10(low), np.log10(high), bins + 1)
+    # the rounded outer edges could leave out the fastest or the slowest call
+    edges[0], edges[-1] = min(values.min(), low), high
+    return np.histogram(values, edges)
+
+"""-------------------------------------------------------------------"""
+
+def report(force=False):
+    """
+        write the summary with Lamp_Log, at INFO level, if the summary
+        period is over or forced
+    """
+    if not _log_.enabled(log.INFO):
+        return
+    now = perf_counter()
+    if not force and now - _flags_._last_summary_ < settings.summary_period:
+        return
+    _flags_._last_summary_ = now
+    result = summary()
+    for stage, values in sorted(result["stages"].items()):
+        _log_.info("latency " + stage, calls=values["calls"], p50_ms=round(values["p50"] * 1e03, 3), p99_ms=round(values["p99"] * 1e03, 3), max_ms=round(values["max"] * 1e03, 3))
+    if len(result["counters"]) > 0:
+        _log_.info("counters", **dict(sorted(result["counters"].items())))
+    return
+
+"""-------------------------------------------------------------------"""
+
+def export_chrome_trace(path):
+    """
+        save the recorded events in the Chrome trace JSON format
+    """
+    with open(path, "w") as file:
+        json.dump({"traceEvents": list(_flags_._events_), "displayTimeUnit": "ms"}, file)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def reset():
+    """
+        clear the durations, counters and events
+    """
+    _flags_._durations_ = {}
+    _flags_._counters_ = {}
+    _flags_._events_.clear()
+    return
@@ -0,0 +1,142 @@
+""" This module renders smooth transitions between two colors of the lamp """
+
+"""
+    A transition is rendered once as a schedule of duty cycle updates:
+    the fade curve is sampled for all three channels at once at the frame
+    rate, and only the frames in which at least one channel crosses a PWM
+    step are kept, with their exact duty cycles. A slow fade of a dim color needs only a
+    few updates (e.g. 42 instead of 203 pattern generator calls), while a
+    fast fade over the full range changes a channel in almost every frame
+    and needs as many calls as stepping the color frame by frame. Rendering
+    takes about as long as stepping in Python; schedules are cached by
+    their start and end colors, duration and curve, so repeated scenes are
+    not rendered again. A transition is played by calling color_at from
+    the LED task, while the other tasks (e.g. the Bluetooth receiver) keep
+    running.
+
+    curves: "linear" - the duty cycles change linearly
+            "gamma" - the perceived brightness changes linearly
+            "eased" - linear in perceived brightness, starting and ending slowly
+"""
+
+import numpy as np
+from functools import lru_cache
+
+"""-------------------------------------------------------------------"""
+
+class settings:
+    frame_period = 0.02     # time between the frames of a transition [s]
+    pwm_steps = 255     # duty cycle steps between 0% and 100%
+    gamma = 2.2     # exponent of the perceived brightness
+    cache_size = 128    # number of cached schedules, a change clears the cache
+
+class _flags_:
+    _cache_ = None  # the cached _render_, created with settings.cache_size
+
+"""-------------------------------------------------------------------"""
+""" FUNCTIONS FOR INTERNAL USE """
+"""-------------------------------------------------------------------"""
+
+def _progress_(time, curve):
+    """
+        the progress of the transition (0 to 1) at normalized times (0 to 1)
+    """
+    if curve == "eased":
+        # smoothstep: zero speed at both ends
+        return time * time * (3 - 2 * time)
+    return time
+
+"""-------------------------------------------------------------------"""
+
+def _render_(start, end, duration, curve, frame_period, pwm_steps, gamma):
+    """
+        compute the schedule of a transition
+
+        returns:    frame times [s], colors (one row for every frame)
+    """
+    frames = max(int(np.ceil(duration / frame_period)), 1)
+    times = np.linspace(0, duration, frames + 1)
+    progress = _progress_(np.linspace(0, 1, frames + 1), curve)[:, None]
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    if curve == "linear":
+        colors = start + (end - start) * progress
+    else:
+        # interpolate in perceived brightness, then convert back to duty cycles
+        low = (start / 100) ** (1 / gamma)
+        high = (end / 100) ** (1 / gamma)
+        colors = (low + (high - low) * progress) ** gamma * 100
+    # the first and the last frames are the colors, without rounding errors
+    colors[0] = start
+    colors[-1] = end
+    # keep the first and the last frames and the frames which cross a PWM step
+    steps = np.round(colors / (100 / pwm_steps))
+    keep = np.ones(times.size, dtype=bool)
+    keep[1:-1] = np.any(steps[1:-1] != steps[:-2], axis=1)
+    times, colors = times[keep], colors[keep]
+    times.flags.writeable = False
+    colors.flags.writeable = False
+    return times, colors
+
+"""-------------------------------------------------------------------"""
+
+def _cached_():
+    """
+        the cached _render_, created again if settings.cache_size changed
+    """
+    cache = _flags_._cache_
+    if cache is None or cache.cache_info().maxsize != settings.cache_size:
+        cache = _flags_._cache_ = lru_cache(maxsize=settings.cache_size)(_render_)
+    return cache
+
+"""-------------------------------------------------------------------"""
+""" USER FUNCTIONS """
+"""-------------------------------------------------------------------"""
+
+def render(start, end, duration, curve="linear"):
+    """
+        compute the schedule of a transition, or get it from the cache
+
+        start, end - (red, green, blue) percentages
+        duration - length of the transition [s]
+        curve - "linear", "gamma" or "eased"
+
+        returns:    frame times [s], colors (one row for every frame), read only
+    """
+    if curve not in ["linear", "gamma", "eased"]:
+        raise ValueError("unknown transition curve: " + str(curve))
+    start = tuple(float(value) for value in start)
+    end = tuple(float(value) for value in end)
+    return _cached_()(start, end, float(duration), curve, settings.frame_period, settings.pwm_steps, settings.gamma)
+
+"""-------------------------------------------------------------------"""
+
+def color_at(schedule, elapsed):
+    """
+        the color of a transition after "elapsed" seconds
+
+        returns:    (red, green, blue), True if the transition is over
+    """
+    times, colors = schedule
+    index = int(np.searchsorted(times, elapsed, side="right")) - 1
+    index = min(max(index, 0), times.size - 1)
+    red, green, blue = colors[index]
+    return (float(red), float(green), float(blue)), elapsed >= times[-1]
+
+"""-------------------------------------------------------------------"""
+
+def cache_info():
+    """
+        returns:    hits, misses, maximum size and current size of the schedule cache
+    """
+    return _cached_().cache_info()
+
+"""-------------------------------------------------------------------"""
+
+def clear_cache():
+    """
+        forget the cached schedules, e.g. after changing the settings
+    """
+    if _flags_._cache_ is not None:
+        _flags_._cache_.cache_clear()
+    return
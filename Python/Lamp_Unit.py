@@ -0,0 +1,442 @@
+""" This module groups the Pmods and the LED of one lamp """
+
+"""
+    A lamp is a Pmod BLE receiving the color commands, a Pmod ALS
+    measuring the light intensity and an RGB LED. Several lamps can be
+    driven by one device (or by several devices) from one process: every
+    lamp registers its own link, receive, LED and telemetry tasks in the
+    scheduler, which interleaves them. The battery and charger voltages
+    are measured by the oscilloscope, which is shared, so only the lamps
+    created with battery=True report them.
+
+    In automatic brightness mode the color set by the phone is scaled by
+    a curve of the ambient light. The light is sampled often while it
+    changes and rarely while it is stable (the scheduler backs off the
+    idle sampling task), the scale only follows changes larger than the
+    hysteresis, and the LED ignores changes smaller than one PWM step, so
+    a steady room causes no instrument traffic besides the slow sampling.
+
+    A new color is reached with a fade rendered by Lamp_Transition, which
+    the LED task plays frame by frame while the receiver keeps running.
+
+    The telemetry is also kept at full precision in a Lamp_History store,
+    and with the extended protocol of Lamp_Codec only the changed values
+    are sent, as 12-bit samples or small deltas. With the "change" trigger
+    the telemetry is measured and sent only when a value leaves its
+    deadband, or when the maximum report interval is over; a cheap probe
+    (one light reading) decides if the averaged measurement is needed.
+    The readings are filtered by Lamp_Filters, so a single failed reading
+    neither moves the averages nor triggers a report. The light sensor
+    and the oscilloscope measure at the same time, through WF_Executor.
+"""
+
+import os
+import copy
+import numpy as np
+from time import monotonic
+from WF_Backend import wf # import WaveForms instruments, or the simulator
+import Pmod_BLE as ble
+import Pmod_ALS as als
+import Lamp_LED as led
+import Lamp_Codec as codec
+import Lamp_Transition as transition
+import Lamp_History as history
+import Lamp_Filters as filters
+import Lamp_Scope as scope
+import Lamp_Scheduler as scheduler
+import Lamp_Log as log
+import WF_Executor as executor
+
+"""-------------------------------------------------------------------"""
+
+class settings:
+    light_average = 5   # how many measurements to average with the light sensor
+    out_data_update = 10    # output data update time [s]
+    receive_period = (0.01, 0.2)    # period of the BLE receive task, when active and idle [s]
+    led_period = (0.01, 0.1)    # period of the LED output task, when active and idle [s]
+    status_period = (0.1, 1)    # period of the link status task, when active and idle [s]
+    light_mode = "static"   # rx_mode of the light sensor
+    light_method = "hampel"     # reduction of the light readings, see Pmod_ALS.reduce
+    light_filter = 5    # window of the outlier filter of the single light readings, 0 to turn off
+    battery_smoothing = 0.5     # weight of a new battery voltage in the moving average, 1 to turn off
+    auto_brightness = False     # scale the color by the ambient light
+    brightness_curve = ((0, 30, 70, 100), (1.0, 0.7, 0.3, 0.1))   # ambient light [%] and color scale points
+    brightness_hysteresis = 3   # ambient light change which updates the scale [%]
+    light_period = (0.1, 5)     # period of the light sampling task, when changing and stable [s]
+    light_samples = 4   # readings reduced by the light sampling task
+    light_noise = 1     # ambient light changes smaller than this are stable [%]
+    fade_duration = 0   # length of the transition to a new color [s], 0 to turn off
+    fade_curve = "gamma"    # "linear", "gamma" or "eased", see Lamp_Transition
+    history_path = None     # directory of the telemetry history files, None keeps it in memory
+    telemetry_protocol = "legacy"   # "legacy" (6-bit bytes) or "extended" (12-bit, changes only), see Lamp_Codec
+    telemetry_keyframe = 30     # every n-th extended cycle sends all values, 0 only after reconnections
+    telemetry_mirror = False    # send the 6-bit bytes next to the extended ones, for older receivers
+    telemetry_trigger = "timer"     # "timer" (every out_data_update) or "change" (see telemetry_task)
+    telemetry_interval = (10, 60)   # minimum and maximum time between two reports of the "change" trigger [s]
+    telemetry_deadband = {"light": 2, "battery": 0.02, "charger": 0.2}  # changes which trigger a report [%, V, V]
+
+class counters:
+    probes = 0  # cheap measurements of the "change" trigger
+    measurements = 0    # full (averaged) measurements
+    transmissions = 0
+    saved_measurements = 0  # cycles without a full measurement
+    saved_transmissions = 0     # cycles without a transmission
+
+class _flags_:
+    red = 0
+    green = 0
+    blue = 0
+    connected = False
+    scale = 1.0     # color scale of the automatic brightness
+    light = None    # last ambient light sample [%]
+    light_time = 0
+    light_reference = None  # ambient light the scale was computed for [%]
+    target = None   # color the LED is fading to
+    transition = None   # schedule of the running transition
+    transition_start = 0
+    reported = None     # last reported telemetry values
+    report_time = 0
+
+"""-------------------------------------------------------------------"""
+""" FUNCTIONS FOR INTERNAL USE """
+"""-------------------------------------------------------------------"""
+
+def _copy_(template, values=None):
+    """
+        create an independent copy of a settings or state class
+
+        values - object or dictionary, overrides some of the attributes
+    """
+    content = {name: copy.deepcopy(value) for name, value in vars(template).items() if not name.startswith("__")}
+    if values is not None:
+        if type(values) != dict:
+            values = {name: value for name, value in vars(values).items() if not name.startswith("__")}
+        content.update(values)
+    return type(template.__name__, (), content)
+
+# configuration and state of a new lamp, the module level settings are
+# the defaults of every lamp, so they are copied when the lamp is created
+_initial_ = {"settings": settings, "counters": counters, "_flags_": _flags_}
+
+"""-------------------------------------------------------------------"""
+""" LAMP OBJECTS """
+"""-------------------------------------------------------------------"""
+
+class Lamp:
+    """
+        the Pmod BLE, Pmod ALS and RGB LED of one lamp
+    """
+    def __init__(self, name, device_data=None, pmod_ble=None, pmod_als=None, rgb_led=None, battery=False, settings=None):
+        """
+            name - prefix of the task names and log messages
+            device_data - the device the lamp is connected to,
+                          wf.device.data by default
+            pmod_ble, pmod_als, rgb_led - the parts of the lamp, the default
+                          Pmods and LED of the modules if not given
+            battery (True/False) - measure and send the battery and charger voltages
+            settings - object or dictionary overriding the default settings
+        """
+        self.name = name
+        self.device_data = device_data
+        self.ble = ble._default_ if pmod_ble is None else pmod_ble
+        self.als = als._default_ if pmod_als is None else pmod_als
+        self.led = led._default_ if rgb_led is None else rgb_led
+        self.battery = battery
+        self.settings = _copy_(_initial_["settings"], settings)
+        self.counters = _copy_(_initial_["counters"])
+        self.flags = _copy_(_initial_["_flags_"])
+        self._log_ = log.get("controller." + name)
+        path = None if self.settings.history_path is None else os.path.join(self.settings.history_path, name)
+        self.history = history.History(["light", "battery", "charger"], path)
+        # filters of the single light readings (one raw step is 100 / 255 %) and of the battery voltage
+        self._light_filter_ = filters.Hampel(self.settings.light_filter, floor=100 / 255) if self.settings.light_filter > 0 else None
+        self._battery_filter_ = filters.EMA(self.settings.battery_smoothing)
+        # channels of the telemetry
+        self._prefixes_ = [codec.pre_light] + ([codec.pre_bat, codec.pre_charge] if battery else [])
+        self._limits_ = [100] + ([5, 5] if battery else [])
+        self.encoder = codec.TelemetryEncoder(self._prefixes_, self._limits_, keyframe=self.settings.telemetry_keyframe, legacy=self.settings.telemetry_mirror)
+
+    """-------------------------------------------------------------------"""
+    """ FUNCTIONS FOR INTERNAL USE """
+    """-------------------------------------------------------------------"""
+
+    def _device_(self):
+        """
+            the device the lamp is connected to
+        """
+        return wf.device.data if self.device_data is None else self.device_data
+
+    """-------------------------------------------------------------------"""
+
+    def _fade_color_(self):
+        """
+            the color of the running transition, or the target color
+
+            the transition is dropped when it is over
+        """
+        flags = self.flags
+        if flags.transition is None:
+            return flags.target
+        color, finished = transition.color_at(flags.transition, monotonic() - flags.transition_start)
+        if finished:
+            flags.transition = None
+        return color
+
+    """-------------------------------------------------------------------"""
+
+    def _probe_(self):
+        """
+            cheap measurement: one light reading and one acquisition of the voltages
+
+            returns:    list of the values
+        """
+        flags = self.flags
+        # the scope measures while the light is read
+        voltages = scope.measure_async(self._device_()) if self.battery else None
+        # use the sample of the brightness loop if it is recent
+        if self.settings.auto_brightness and flags.light is not None and monotonic() - flags.light_time < self.settings.telemetry_interval[0]:
+            values = [flags.light]
+        else:
+            values = [self.als.read_percent_many_async(1, rx_mode=self.settings.light_mode, reopen=False).result()]
+            # a failed reading is NaN, the filter keeps the median instead
+            if self._light_filter_ is not None:
+                values = [self._light_filter_.update(values[0])]
+        if self.battery:
+            values.extend(self._voltages_(voltages))
+        self.counters.probes += 1
+        return values
+
+    """-------------------------------------------------------------------"""
+
+    def _measure_(self, probe=None):
+        """
+            full measurement: averaged light intensity, battery and charger voltages
+
+            probe - values of a probe, its voltages are used instead of a new acquisition
+
+            returns:    list of the values
+        """
+        flags = self.flags
+        # the scope measures while the light is read
+        voltages = scope.measure_async(self._device_()) if self.battery and probe is None else None
+        # measure the light intensity, or use the sample of the brightness loop if it is recent
+        if self.settings.auto_brightness and flags.light is not None and monotonic() - flags.light_time < self.settings.out_data_update:
+            values = [flags.light]
+        else:
+            values = [self.als.read_percent_many_async(self.settings.light_average, rx_mode=self.settings.light_mode, reopen=False, method=self.settings.light_method).result()]
+        if self.battery:
+            values.extend(self._voltages_(voltages) if probe is None else probe[1:])
+        self.counters.measurements += 1
+        # keep the full precision values
+        self.history.append(dict(zip(["light", "battery", "charger"], values)))
+        return values
+
+    """-------------------------------------------------------------------"""
+
+    def _voltages_(self, measurement):
+        """
+            wait for an acquisition of the battery and charger voltages,
+            the battery voltage is smoothed, the charger can switch at any time
+
+            measurement - future returned by scope.measure_async
+
+            returns:    battery voltage, charger voltage
+        """
+        try:
+            battery, charger = measurement.result()
+        except TimeoutError as error:
+            # a stalled acquisition fails like a measurement
+            self._log_.warning("voltage measurement failed", error=str(error))
+            battery, charger = np.nan, np.nan
+        battery = self._battery_filter_.update(battery)
+        return np.nan if battery is None else battery, charger
+
+    """-------------------------------------------------------------------"""
+
+    def _changed_(self, values):
+        """
+            check if a value moved farther from the last report than its deadband
+        """
+        if self.flags.reported is None:
+            return True
+        for name, value, reported in zip(["light", "battery", "charger"], values, self.flags.reported):
+            if np.isnan(value):
+                continue
+            if np.isnan(reported) or abs(value - reported) > self.settings.telemetry_deadband[name]:
+                return True
+        return False
+
+    """-------------------------------------------------------------------"""
+
+    def _send_(self, values):
+        """
+            send every measurement in one burst
+        """
+        if self.settings.telemetry_protocol == "extended":
+            self.ble.queue_data(self.encoder.encode(values))
+        else:
+            self.ble.queue_data(codec.encode_many(values, self._prefixes_, self._limits_))
+        self.ble.flush_data(tx_mode="pattern", reopen=False)
+        # a failed measurement keeps the last reported value
+        if self.flags.reported is not None:
+            values = [reported if np.isnan(value) else value for value, reported in zip(values, self.flags.reported)]
+        self.flags.reported, self.flags.report_time = values, monotonic()
+        self.counters.transmissions += 1
+        return
+
+    """-------------------------------------------------------------------"""
+    """ USER FUNCTIONS """
+    """-------------------------------------------------------------------"""
+
+    def open(self):
+        """
+            initialize the Pmods, start receiving and turn off the lamp
+        """
+        self.als.open()
+        self.ble.open()
+        self.ble.reboot()
+        self.ble.start_stream()
+        self.led.set_color(0, 0, 0, self._device_(), force=True)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def close(self, reset=False):
+        """
+            turn off the lamp and close the Pmods
+
+            closes all instruments if reset=True
+        """
+        self.led.set_color(0, 0, 0, self._device_(), force=True)
+        self.ble.close(reset)
+        self.als.close(reset)
+        self.history.close()
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def schedule(self):
+        """
+            register the tasks of the lamp, named "<name>.<task>"
+
+            returns:    list of the registered tasks
+        """
+        tasks = [scheduler.add(self.name + ".status", self.link_task, *self.settings.status_period),
+                 scheduler.add(self.name + ".receive", self.receive_task, *self.settings.receive_period),
+                 scheduler.add(self.name + ".led", self.led_task, *self.settings.led_period),
+                 scheduler.add(self.name + ".telemetry", self.telemetry_task, self.settings.telemetry_interval[0] if self.settings.telemetry_trigger == "change" else self.settings.out_data_update)]
+        if self.settings.auto_brightness:
+            tasks.append(scheduler.add(self.name + ".light", self.light_task, *self.settings.light_period))
+        if not executor.settings.parallel:
+            # there is no background receiver, read the recording in the loop
+            tasks.append(scheduler.add(self.name + ".stream", self.ble.poll_stream, self.ble.settings._stream_period_))
+        return tasks
+
+    """-------------------------------------------------------------------"""
+
+    def link_task(self):
+        """
+            poll the connection status of the Pmod BLE
+        """
+        connected = self.ble.get_status()
+        if connected == self.flags.connected:
+            return False
+        self.flags.connected = connected
+        # a new receiver needs every value
+        self.encoder.reset()
+        self.flags.reported = None
+        self._log_.info("connected" if connected else "disconnected")
+        return True
+
+    """-------------------------------------------------------------------"""
+
+    def receive_task(self):
+        """
+            receive and decode color commands
+        """
+        if not self.flags.connected:
+            return False
+        data, sys_msg, error = self.ble.read(blocking=False, rx_mode="stream", reopen=False)
+        if len(data) == 0:
+            return False
+        # decode incoming data
+        flags = self.flags
+        flags.red, flags.green, flags.blue = codec.decode_colors(data, (flags.red, flags.green, flags.blue))
+        return True
+
+    """-------------------------------------------------------------------"""
+
+    def led_task(self):
+        """
+            set the lamp color, turn the lamp off while disconnected
+
+            a new color is reached with a transition, if the fade duration is set
+        """
+        flags = self.flags
+        target = (flags.red, flags.green, flags.blue) if flags.connected else (0, 0, 0)
+        if target != flags.target:
+            if self.settings.fade_duration > 0 and flags.target is not None:
+                # fade from the color shown now, even if a transition is running
+                start = self._fade_color_()
+                flags.transition = transition.render(start, target, self.settings.fade_duration, self.settings.fade_curve)
+                flags.transition_start = monotonic()
+            flags.target = target
+        red, green, blue = self._fade_color_()
+        if self.settings.auto_brightness:
+            scale = flags.scale
+            red, green, blue = red * scale, green * scale, blue * scale
+        changed = self.led.set_color(red, green, blue, self._device_())
+        # apply coalesced updates
+        changed += self.led.update(self._device_())
+        return changed > 0 or self.led.pending() or flags.transition is not None
+
+    """-------------------------------------------------------------------"""
+
+    def telemetry_task(self):
+        """
+            measure and send the light intensity, and the battery and charger voltages
+
+            with the "change" trigger every cycle starts with a probe, the full
+            measurement is made only if a probed value left its deadband, and
+            it is sent only if it still differs from the last report, or if
+            the maximum interval is over
+        """
+        if not self.flags.connected:
+            return False
+        if self.settings.telemetry_trigger != "change":
+            self._send_(self._measure_())
+            return True
+        overdue = monotonic() - self.flags.report_time >= self.settings.telemetry_interval[1]
+        probe = self._probe_()
+        if not overdue and not self._changed_(probe):
+            self.counters.saved_measurements += 1
+            self.counters.saved_transmissions += 1
+            return False
+        values = self._measure_(probe)
+        if not overdue and not self._changed_(values):
+            self.counters.saved_transmissions += 1
+            return False
+        self._send_(values)
+        return True
+
+    """-------------------------------------------------------------------"""
+
+    def light_task(self):
+        """
+            sample the ambient light and update the brightness scale
+
+            returns True while the light is changing, so it is sampled faster
+        """
+        light = self.als.read_percent_many(self.settings.light_samples, rx_mode=self.settings.light_mode, reopen=False, method=self.settings.light_method)
+        if np.isnan(light):
+            # every reading failed, keep the scale
+            return False
+        flags = self.flags
+        changing = flags.light is None or abs(light - flags.light) > self.settings.light_noise
+        flags.light, flags.light_time = light, monotonic()
+        # follow only the changes larger than the hysteresis
+        if flags.light_reference is None or abs(light - flags.light_reference) > self.settings.brightness_hysteresis:
+            flags.light_reference = light
+            flags.scale = float(np.interp(light, *self.settings.brightness_curve))
+            self._log_.debug("brightness", light=light, scale=round(flags.scale, 3))
+        return changing
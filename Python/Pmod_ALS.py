@@ -8,9 +8,23 @@
     which contain 3 leading and 4 trailing zeros. The sensor saturates
     at the output value 127. The module also converts the raw data into
     percentage.
+
+    The SPI and static I/O modes are switched by the session manager,
+    which reconfigures the pins only when the mode changes, and every
+    instrument call runs on the lane of its instrument in WF_Executor.
+
+    Every PmodALS object drives one Pmod, so several Pmods can share
+    the instruments of one device. The module level functions drive the
+    default Pmod, which is configured by the module level classes.
 """
 
-import WF_SDK as wf # import WaveForms instruments
+import copy
+import numpy as np
+from WF_Backend import wf # import WaveForms instruments, or the simulator
+import WF_Session as session
+import WF_Executor as executor
+import Lamp_Log as log
+import Lamp_Filters as filters
 from time import sleep, time
 
 """-------------------------------------------------------------------"""
@@ -20,107 +34,376 @@ class pins:
     sdo = 1  # SDO pin of the Pmod
     sck = 2  # SCK pin of the Pmod
 
-class _flags_:
-    _static_init_ = False
-
 class settings:
-    DEBUG = False
     _spi_frequency_ = 1e06
     _spi_mode_ = 0
     _msb_first_ = True
     _bytes_count_ = 2
+    _trim_ = 0.2    # fraction of samples cut from both ends by the trimmed mean
+    _outlier_ = 3   # outliers of the "hampel" method deviate more than this many (scaled) MADs
+
+_log_ = log.get("als")
 
 """-------------------------------------------------------------------"""
 """ FUNCTIONS FOR INTERNAL USE """
 """-------------------------------------------------------------------"""
 
-def _read_static_(bytes_count):
+def _copy_(template, values=None):
     """
-        read a list of bytes on SPI using the logic analyzer and the pattern generator
+        create an independent copy of a settings or state class
+
+        values - object or dictionary, overrides some of the attributes
     """
-    period = 1 / settings._spi_frequency_
-    # set chip select LOW
-    wf.static.set_state(wf.device.data, pins.cs, False)
-    # repeat for every bit
-    bits = []
-    for _ in range(8 * bytes_count):
-        # get current time
-        period_start = time()
-        # provide a clock edge
-        if settings._spi_mode_ < 2:
-            wf.static.set_state(wf.device.data, pins.sck, True)
-        else:
-            wf.static.set_state(wf.device.data, pins.sck, False)
-        # get data on first edge
-        if settings._spi_mode_ / 2 == 0:
-            bits.append(wf.static.get_state(wf.device.data, pins.sdo))
-        # provide another clock edge
-        if settings._spi_mode_ < 2:
-            wf.static.set_state(wf.device.data, pins.sck, False)
+    content = {name: copy.deepcopy(value) for name, value in vars(template).items() if not name.startswith("__")}
+    if values is not None:
+        if type(values) != dict:
+            values = {name: value for name, value in vars(values).items() if not name.startswith("__")}
+        content.update(values)
+    return type(template.__name__, (), content)
+
+# configuration and state of a new Pmod
+_initial_ = {template.__name__: _copy_(template) for template in [pins, settings]}
+
+"""-------------------------------------------------------------------"""
+
+def _convert_(data):
+    """
+        convert the received bytes to the light intensity
+    """
+    msb = data[0] << 4
+    lsb = data[1] >> 4
+    # concatenate bytes without trailing and leading zeros
+    return msb | lsb
+
+"""-------------------------------------------------------------------"""
+""" PMOD ALS OBJECTS """
+"""-------------------------------------------------------------------"""
+
+class PmodALS:
+    """
+        a Pmod ALS connected to the digital I/O lines of a device
+    """
+    def __init__(self, device_data=None, pins=None, settings=None):
+        """
+            device_data - the device the Pmod is connected to,
+                          wf.device.data by default
+            pins - object or dictionary with the cs, sdo and sck pins
+            settings - object or dictionary overriding the default settings
+        """
+        self.device_data = device_data
+        self.pins = _copy_(_initial_["pins"], pins)
+        self.settings = _copy_(_initial_["settings"], settings)
+
+    """-------------------------------------------------------------------"""
+    """ FUNCTIONS FOR INTERNAL USE """
+    """-------------------------------------------------------------------"""
+
+    def _device_(self):
+        """
+            the device the Pmod is connected to
+        """
+        return wf.device.data if self.device_data is None else self.device_data
+
+    """-------------------------------------------------------------------"""
+
+    def _read_static_(self, bytes_count):
+        """
+            read a list of bytes on SPI using the static I/O instrument
+        """
+        period = 1 / self.settings._spi_frequency_
+        msb_first = self.settings._msb_first_
+        # clock levels and sampling edge of the configured SPI mode
+        leading, trailing, sample_leading = self._clock_sequence_()
+        # cache the instrument functions and pins
+        set_state = wf.static.set_state
+        get_state = wf.static.get_state
+        device_data = self._device_()
+        sck = self.pins.sck
+        sdo = self.pins.sdo
+        # the clock is paced until a bit takes longer than the period
+        paced = True
+        # set chip select LOW
+        set_state(device_data, self.pins.cs, False)
+        # repeat for every byte
+        data = []
+        for _ in range(bytes_count):
+            value = 0
+            for index in range(8):
+                # get current time
+                if paced:
+                    period_start = time()
+                # provide the leading clock edge
+                set_state(device_data, sck, leading)
+                if sample_leading:
+                    bit = get_state(device_data, sdo)
+                # provide the trailing clock edge
+                set_state(device_data, sck, trailing)
+                if not sample_leading:
+                    bit = get_state(device_data, sdo)
+                # shift the bit in
+                if msb_first:
+                    value = (value << 1) | (1 if bit else 0)
+                elif bit:
+                    value |= 1 << index
+                # delay if necessary
+                if paced:
+                    delay = period + period_start - time()
+                    if delay > 0:
+                        sleep(delay)
+                    else:
+                        # the instrument calls are slower than the clock
+                        paced = False
+            data.append(value)
+        # set chip select HIGH
+        set_state(device_data, self.pins.cs, True)
+        return data
+
+    """-------------------------------------------------------------------"""
+
+    def _clock_sequence_(self):
+        """
+            get the clock edges of a bit in the configured SPI mode
+
+            returns:    leading clock level, trailing clock level, sample on the leading edge (True/False)
+        """
+        # CPOL: clock idles high in modes 2 and 3
+        idle = self.settings._spi_mode_ >= 2
+        # CPHA: data is sampled on the leading edge in modes 0 and 2
+        return not idle, idle, self.settings._spi_mode_ % 2 == 0
+
+    """-------------------------------------------------------------------"""
+
+    def _open_static_(self):
+        """
+            initialize the static I/O pins
+        """
+        device_data = self._device_()
+        # set data direction
+        wf.static.set_mode(device_data, self.pins.cs, output=True)
+        wf.static.set_mode(device_data, self.pins.sdo, output=False)
+        wf.static.set_mode(device_data, self.pins.sck, output=True)
+        # set initial states
+        wf.static.set_state(device_data, self.pins.cs, True)
+        _, idle, _ = self._clock_sequence_()
+        wf.static.set_state(device_data, self.pins.sck, idle)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _close_static_(self):
+        """
+            reinitializes the static I/O pins
+        """
+        device_data = self._device_()
+        wf.static.set_mode(device_data, self.pins.cs, output=False)
+        wf.static.set_mode(device_data, self.pins.sdo, output=False)
+        wf.static.set_mode(device_data, self.pins.sck, output=False)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _open_spi_(self):
+        """
+            initialize the SPI instrument on the pins of the Pmod
+        """
+        wf.protocol.spi.open(self._device_(), cs=self.pins.cs, sck=self.pins.sck, miso=self.pins.sdo, clk_frequency=self.settings._spi_frequency_, mode=self.settings._spi_mode_, order=self.settings._msb_first_)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _session_(self, rx_mode, reopen=False):
+        """
+            switch the pins of the Pmod to the SPI instrument, or to static I/O
+
+            returns:    True if the instrument was reconfigured
+        """
+        device_data = self._device_()
+        outputs, inputs = (self.pins.cs, self.pins.sck), (self.pins.sdo,)
+        if rx_mode == "spi":
+            key = (outputs, inputs, self.settings._spi_frequency_, self.settings._spi_mode_, self.settings._msb_first_)
+            session.configure((self, "spi"), device_data, "spi", self._open_spi_, lambda: wf.protocol.spi.close(device_data), outputs, inputs, key)
         else:
-            wf.static.set_state(wf.device.data, pins.sck, True)
-        # get data on second edge
-        if settings._spi_mode_ / 2 == 1:
-            bits.append(wf.static.get_state(wf.device.data, pins.sdo))
-        # delay if necessary
+            key = (outputs, inputs, self.settings._spi_mode_)
+            session.configure((self, "static"), device_data, "static", self._open_static_, self._close_static_, outputs, inputs, key)
+        return session.use((self, rx_mode), reconfigure=reopen)
+
+    """-------------------------------------------------------------------"""
+
+    def _read_bytes_(self, rx_mode, reopen=False):
+        """
+            switch to the instrument of a mode and read the bytes of one reading
+        """
+        if rx_mode == "spi":
+            self._session_(rx_mode, reopen)
+            return wf.protocol.spi.read(self._device_(), self.settings._bytes_count_, self.pins.cs)
+        if rx_mode == "static":
+            self._session_(rx_mode, reopen)
+            return self._read_static_(self.settings._bytes_count_)
+        return []
+
+    """-------------------------------------------------------------------"""
+
+    def _read_many_(self, count, rx_mode, reopen=False):
+        """
+            switch to the instrument of a mode once and read "count" readings
+
+            returns:    array of raw values, NaN for failed conversions
+        """
+        data = np.full(count, np.nan)
+        if rx_mode == "spi":
+            self._session_(rx_mode, reopen)
+            for index in range(count):
+                try:
+                    data[index] = _convert_(wf.protocol.spi.read(self._device_(), self.settings._bytes_count_, self.pins.cs))
+                except:
+                    pass
+        elif rx_mode == "static":
+            self._session_(rx_mode, reopen)
+            for index in range(count):
+                try:
+                    data[index] = _convert_(self._read_static_(self.settings._bytes_count_))
+                except:
+                    pass
+        return data
+
+    """-------------------------------------------------------------------"""
+    """ USER FUNCTIONS """
+    """-------------------------------------------------------------------"""
+
+    def open(self):
+        """
+            initializes the necessary instruments for the Pmod ALS
+        """
+        # start the power supplies
+        if wf.supplies.state.off:
+            supplies_data = wf.supplies.data()
+            supplies_data.master_state = True
+            supplies_data.state = True
+            supplies_data.voltage = 3.3
+            executor.call(self._device_(), "supplies", wf.supplies.switch, self._device_(), supplies_data)
+        _log_.info("device opened", cs=self.pins.cs)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def close(self, reset=False):
+        """
+            closes all instruments if reset=True
+        """
+        if reset:
+            device_data = self._device_()
+            # stop and reset the power supplies
+            if wf.supplies.state.on:
+                supplies_data = wf.supplies.data()
+                supplies_data.master_state = True
+                supplies_data.state = True
+                supplies_data.voltage = 3.3
+                executor.call(device_data, "supplies", wf.supplies.switch, device_data, supplies_data)
+                executor.call(device_data, "supplies", wf.supplies.close, device_data)
+            executor.call(device_data, "spi", session.release, (self, "spi"))
+            executor.call(device_data, "static", wf.static.close, device_data)
+            session.forget(device_data, "static")
+        _log_.info("device closed", cs=self.pins.cs)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def read(self, rx_mode="spi", reopen=False):
+        """
+            read raw data in spi/static mode
+
+            reopen (True/False) - reconfigure the instrument even if the mode did not change
+        """
+        # read 2 bytes, on the lane of the instrument
+        data = executor.call(self._device_(), rx_mode, self._read_bytes_, rx_mode, reopen)
         try:
-            sleep(period + period_start - time())
+            return _convert_(data)
         except:
-            pass
-    # set chip select HIGH
-    wf.static.set_state(wf.device.data, pins.cs, True)
-    # decode bit list
-    data = []
-    for index_high in range(bytes_count):
-        current_byte = []
-        for index_low in range(8):
-            # convert from bool
-            if bits[round(index_high * 8 + index_low)]:
-                bits[round(index_high * 8 + index_low)] = 1
-            else:
-                bits[round(index_high * 8 + index_low)] = 0
-            current_byte.append(bits[round(index_high * 8 + index_low)])
-        # invert byte if necessary
-        if settings._msb_first_:
-            current_byte = current_byte[::-1]
-        # convert bit list in integer
-        multiplier = 1
-        data.append(0)
-        for bit in current_byte:
-            data[index_high] += (multiplier * bit)
-            multiplier *= 2
-    return data
-
-"""-------------------------------------------------------------------"""
-
-def _open_static_():
-    """
-        initialize the static I/O pins
-    """
-    # set data direction
-    wf.static.set_mode(wf.device.data, pins.cs, output=True)
-    wf.static.set_mode(wf.device.data, pins.sdo, output=False)
-    wf.static.set_mode(wf.device.data, pins.sck, output=True)
-    # set initial states
-    wf.static.set_state(wf.device.data, pins.cs, True)
-    if settings._spi_mode_ < 2:
-        wf.static.set_state(wf.device.data, pins.sck, False)
-    else:
-        wf.static.set_state(wf.device.data, pins.sck, True)
-    _flags_._static_init_ = True
-    return
-
-"""-------------------------------------------------------------------"""
-
-def _close_static_():
-    """
-        reinitializes the static I/O pins
-    """
-    _flags_._static_init_ = False
-    wf.static.set_mode(wf.device.data, pins.cs, output=False)
-    wf.static.set_mode(wf.device.data, pins.sdo, output=False)
-    wf.static.set_mode(wf.device.data, pins.sck, output=False)
-    return
+            return 0
+
+    """-------------------------------------------------------------------"""
+
+    def read_many(self, count, rx_mode="spi", reopen=False):
+        """
+            read raw data "count" times in spi/static mode,
+            configuring the instrument only once
+
+            returns:    array of raw values, NaN for failed conversions
+        """
+        return executor.call(self._device_(), rx_mode, self._read_many_, count, rx_mode, reopen)
+
+    """-------------------------------------------------------------------"""
+
+    def reduce(self, data, method="mean"):
+        """
+            reduce a list of readings to a single value,
+            ignoring failed conversions
+
+            method: "mean", "median", "trimmed" (mean without the extremes)
+                    or "hampel" (mean without the outliers, see Lamp_Filters)
+
+            returns:    the value, NaN if every conversion failed
+        """
+        data = np.asarray(data, dtype=float)
+        data = np.sort(data[~np.isnan(data)])
+        if data.size == 0:
+            return float("nan")
+        if method == "median":
+            return float(np.median(data))
+        if method == "hampel":
+            # deviations of one raw step are never outliers
+            return filters.robust_mean(data, self.settings._outlier_, floor=1)
+        if method == "trimmed":
+            cut = int(data.size * self.settings._trim_)
+            if data.size > 2 * cut:
+                data = data[cut:data.size - cut]
+        return float(np.mean(data))
+
+    """-------------------------------------------------------------------"""
+
+    def read_percent(self, rx_mode="spi", reopen=False):
+        """
+            receive and convert raw data
+        """
+        data = self.read(rx_mode, reopen) * 100 / 255
+        return round(data, 2)
+
+    """-------------------------------------------------------------------"""
+
+    def read_percent_many(self, count, rx_mode="spi", reopen=False, method="mean"):
+        """
+            receive "count" readings, reduce and convert them
+
+            returns:    the percentage, NaN if every conversion failed
+        """
+        data = self.reduce(self.read_many(count, rx_mode, reopen), method) * 100 / 255
+        return round(data, 2)
+
+    """-------------------------------------------------------------------"""
+
+    def read_async(self, rx_mode="spi", reopen=False):
+        """
+            read raw data on the instrument executor, see WF_Executor
+
+            returns:    future of the raw value
+        """
+        return executor.submit(self._device_(), rx_mode, self.read, rx_mode, reopen)
+
+    """-------------------------------------------------------------------"""
+
+    def read_percent_many_async(self, count, rx_mode="spi", reopen=False, method="mean"):
+        """
+            receive, reduce and convert "count" readings on the instrument executor
+
+            returns:    future of the percentage
+        """
+        return executor.submit(self._device_(), rx_mode, self.read_percent_many, count, rx_mode, reopen, method)
+
+"""-------------------------------------------------------------------"""
+
+# the module level functions drive this Pmod, configured by the module level classes
+_default_ = PmodALS()
+_default_.pins, _default_.settings = pins, settings
 
 """-------------------------------------------------------------------"""
 """ USER FUNCTIONS """
@@ -130,16 +413,7 @@ def open():
     """
         initializes the necessary instruments for the Pmod ALS
     """
-    # start the power supplies
-    if wf.supplies.state.off:
-        supplies_data = wf.supplies.data()
-        supplies_data.master_state = True
-        supplies_data.state = True
-        supplies_data.voltage = 3.3
-        wf.supplies.switch(wf.device.data, supplies_data)
-    if settings.DEBUG:
-        print("ALS: device opened")
-    return
+    return _default_.open()
 
 """-------------------------------------------------------------------"""
 
@@ -147,19 +421,7 @@ def close(reset=False):
     """
         closes all instruments if reset=True
     """
-    if reset:
-        # stop and reset the power supplies
-        if wf.supplies.state.on:
-            supplies_data = wf.supplies.data()
-            supplies_data.master_state = True
-            supplies_data.state = True
-            supplies_data.voltage = 3.3
-            wf.supplies.switch(wf.device.data, supplies_data)
-            wf.supplies.close(wf.device.data)
-        wf.static.close(wf.device.data)
-    if settings.DEBUG:
-        print("ALS: device closed")
-    return
+    return _default_.close(reset)
 
 """-------------------------------------------------------------------"""
 
@@ -167,28 +429,25 @@ def read(rx_mode="spi", reopen=False):
     """
         read raw data in spi/static mode
     """
-    # read 2 bytes
-    data = []
-    if rx_mode == "spi":
-        if not wf.protocol.spi.state.on or reopen:
-            wf.protocol.spi.open(wf.device.data, cs=pins.cs, sck=pins.sck, miso=pins.sdo, clk_frequency=settings._spi_frequency_, mode=settings._spi_mode_, order=settings._msb_first_)
-        data = wf.protocol.spi.read(wf.device.data, settings._bytes_count_, pins.cs)
-        if reopen:
-            wf.protocol.spi.close(wf.device.data)
-    elif rx_mode == "static":
-        if not _flags_._static_init_ or reopen:
-            _open_static_()
-        data = _read_static_(settings._bytes_count_)
-        if reopen:
-            _close_static_()
-    try:
-        msb = data[0] << 4
-        lsb = data[1] >> 4
-        # concatenate bytes without trailing and leading zeros
-        result = msb | lsb
-        return result
-    except:
-        return 0
+    return _default_.read(rx_mode, reopen)
+
+"""-------------------------------------------------------------------"""
+
+def read_many(count, rx_mode="spi", reopen=False):
+    """
+        read raw data "count" times in spi/static mode, see PmodALS.read_many
+
+        returns:    array of raw values, NaN for failed conversions
+    """
+    return _default_.read_many(count, rx_mode, reopen)
+
+"""-------------------------------------------------------------------"""
+
+def reduce(data, method="mean"):
+    """
+        reduce a list of readings to a single value, see PmodALS.reduce
+    """
+    return _default_.reduce(data, method)
 
 """-------------------------------------------------------------------"""
 
@@ -196,5 +455,28 @@ def read_percent(rx_mode="spi", reopen=False):
     """
         receive and convert raw data
     """
-    data = read(rx_mode, reopen) * 100 / 255
-    return round(data, 2)
+    return _default_.read_percent(rx_mode, reopen)
+
+"""-------------------------------------------------------------------"""
+
+def read_percent_many(count, rx_mode="spi", reopen=False, method="mean"):
+    """
+        receive "count" readings, reduce and convert them
+    """
+    return _default_.read_percent_many(count, rx_mode, reopen, method)
+
+"""-------------------------------------------------------------------"""
+
+def read_async(rx_mode="spi", reopen=False):
+    """
+        read raw data on the instrument executor, returns a future
+    """
+    return _default_.read_async(rx_mode, reopen)
+
+"""-------------------------------------------------------------------"""
+
+def read_percent_many_async(count, rx_mode="spi", reopen=False, method="mean"):
+    """
+        receive, reduce and convert "count" readings on the instrument executor, returns a future
+    """
+    return _default_.read_percent_many_async(count, rx_mode, reopen, method)
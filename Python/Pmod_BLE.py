@@ -8,10 +8,26 @@
     it also can send and receive data, decoding the received bytes
     and separating the buffer into a list which contains only data
     and one which contains only system messages (starting and ending with "%").
+    The instruments are switched by the session manager, which reconfigures
+    them only when the requested mode changes, and every instrument call
+    runs on the lane of its instrument in WF_Executor.
+
+    Every PmodBLE object drives one Pmod, so several Pmods can share
+    the instruments of one device. The module level functions drive the
+    default Pmod, which is configured by the module level classes.
 """
 
+import copy
 import time
-import WF_SDK as wf # import WaveForms instruments
+import queue
+import threading
+import numpy as np
+import WF_Backend as backend
+import WF_Session as session
+import WF_Executor as executor
+from WF_Backend import wf # import WaveForms instruments, or the simulator
+import Lamp_Trace as trace
+import Lamp_Log as log
 
 """-------------------------------------------------------------------"""
 """ SETTINGS, VARIABLES AND DATA TYPES """
@@ -35,116 +51,1068 @@ class commands:
 
 class _flags_:
     _currently_sys_ = False
-    _previous_msg_ = ""
+    _previous_msg_ = bytearray()
+    _framing_errors_ = 0
+    _tx_queue_ = bytearray()
+    _armed_ = False     # the logic analyzer waits for the next message
 
 class settings:
-    DEBUG = False
     _baud_rate_ = 115200
     _record_multiplier_ = round(9.978)
     _buffer_size_ = 600    # max 32000 for the ADP3250
     _treshold_ = 0.5
+    _max_sys_msg_ = 64  # longest system message kept between reads
+    _ring_size_ = 65536     # samples kept by the streaming receiver
+    _auto_tune_ = False     # adapt the oversampling and the buffer size to the traffic
+    _tune_multipliers_ = [3, 4, 5, 6, 8, 10]    # oversampling factors to choose from
+    _tune_window_ = 50  # frames observed before the oversampling is changed
+    _max_error_rate_ = 0.02     # highest accepted framing error rate
+    _buffer_margin_ = 0.5   # buffer space for longer messages, relative to the expected length
+    _max_buffer_size_ = 32000
+    _stream_period_ = 5e-03     # time between two reads of the streaming receiver [s]
+    _max_retries_ = 10  # attempts of a command which has to succeed
+
+class _tune_:
+    _statistics_ = {}   # captures, bytes, errors and capture time of every oversampling factor
+    _frames_ = 0    # frames observed with the current factor
+    _errors_ = 0    # framing errors observed with the current factor
+    _rejected_ = []     # factors which did not decode reliably
+    _message_ = 1   # expected message length in bytes
+    _changed_ = False   # the logic analyzer has to be reconfigured
+
+class _stream_:
+    _running_ = False
+    _ring_ = np.ones(0, dtype=bool)     # line levels not demodulated yet
+    _written_ = 0   # number of samples written into the ring
+    _consumed_ = 0  # number of samples demodulated
+    _overruns_ = 0  # number of samples dropped because the ring was full
+    _gaps_ = 0  # number of recording gaps, the frames across them are dropped
+    _queue_ = queue.Queue()     # decoded bytes
+
+class _recorder_:
+    _thread_ = None     # background receiver of every streaming Pmod
+    _running_ = False
+    _stop_ = threading.Event()  # set to stop the background receiver
+    _members_ = []  # streaming Pmods
+    _device_ = None
+    _rate_ = 0  # sampling frequency of the logic analyzer [Hz]
+    _buffer_size_ = 0   # samples kept by the device between two reads
+    _period_ = 0    # time between two reads [s]
+    _changed_ = False   # the logic analyzer has to be reconfigured
+    _reads_ = 0     # number of reads of the recording
+    _lost_ = 0  # samples lost because the device buffer was full
+    _corrupted_ = 0     # samples which may be corrupted
+    _errors_ = 0    # failed reads
 
-class _word_type_:
-    _start_ = 1
-    _stop_ = 0
-    _data_ = 0
+_bit_weights_ = 1 << np.arange(8)   # LSB first
+
+_log_ = log.get("ble")
+
+# UART frame of every byte: start bit, 8 data bits (LSB first), stop bit
+_frame_table_ = [bytes([0] + [(value >> bit) & 1 for bit in range(8)] + [1]) for value in range(256)]
 
 """-------------------------------------------------------------------"""
 """ FUNCTIONS FOR INTERNAL USE """
 """-------------------------------------------------------------------"""
 
-def _write_pattern_(data):
+def _copy_(template, values=None):
+    """
+        create an independent copy of a settings or state class
+
+        values - object or dictionary, overrides some of the attributes
+    """
+    content = {}
+    for name, value in vars(template).items():
+        if name.startswith("__"):
+            continue
+        # queues hold locks, they can not be copied
+        content[name] = queue.Queue() if isinstance(value, queue.Queue) else copy.deepcopy(value)
+    if values is not None:
+        if type(values) != dict:
+            values = {name: value for name, value in vars(values).items() if not name.startswith("__")}
+        content.update(values)
+    return type(template.__name__, (), content)
+
+# configuration and state of a new Pmod
+_initial_ = {template.__name__: _copy_(template) for template in [pins, settings, _flags_, _tune_, _stream_]}
+
+"""-------------------------------------------------------------------"""
+
+def _build_pattern_(data):
     """
-        send UART data using the pattern generator
+        convert a string, an integer or a list of integers
+        to the bits of consecutive UART frames
     """
-    # cast data to integer list
+    # cast data to bytes
     if type(data) == str:
-        data = list(data)
-        data = [ord(character) for character in data]
+        data = data.encode("latin-1", "replace")
     elif type(data) == int:
         data = [data]
-    # do for every element
-    out_data = []
-    for element in data:
-        # convert to bit list
-        element = [1 if element & (1 << (7 - n)) else 0 for n in range(8)]
-        element = element[::-1]
-        # append start and stop bits
-        element.insert(0, 0)
-        element.append(1)
-        for bit in element:
-            out_data.append(bit)
-    # generate data
-    wf.pattern.generate(wf.device.data, pins.rx, wf.pattern.function.custom, settings._baud_rate_, data=out_data, idle=wf.pattern.idle_state.high)
-    wf.pattern.disable(wf.device.data, pins.rx)
-    return
+    if type(data) != bytes:
+        data = bytes([element & 0xFF for element in data])
+    # look up and join the frames
+    return b"".join(map(_frame_table_.__getitem__, data))
 
 """-------------------------------------------------------------------"""
 
-def _read_logic_():
+def _threshold_(buffer, treshold):
     """
-        get UART data using the logic analyzer
+        convert a logic analyzer buffer to a boolean array of line levels
     """
-    # record buffer
-    buffer, _ = wf.logic.record(wf.device.data, pins.tx)
-    # get bits from buffer
-    bits = []
-    normalizer = max(buffer)
-    for index_high in range(round(len(buffer) / settings._record_multiplier_)):
-        bits.append(0)
-        for index_low in range(settings._record_multiplier_):
-            try:
-                bits[index_high] += (buffer[round(index_high * settings._record_multiplier_ + index_low)] / normalizer)
-            except:
-                pass
-        if bits[index_high] > settings._record_multiplier_ * settings._treshold_:
-            bits[index_high] = 1
-        else:
-            bits[index_high] = 0
-    # split list
-    words = []
-    for index_high in range(round(len(bits) / 10)):
-        words.append([])
-        for index_low in range(10):
-            try:
-                words[index_high].append(bits[round(index_high * 10 + index_low)])
-            except:
-                pass
-    # decode word list
-    data_struct = []
-    for element in words:
-        try:
-            temp = _word_type_()
-            temp._start_ = element[0]
-            temp._stop_ = element[9]
-            temp._data_ = 0
-            multiplier = 1
-            for bit in element[1:9]:
-                temp._data_ += multiplier * bit
-                multiplier *= 2
-            data_struct.append(temp)
-        except:
-            pass
+    samples = np.fromiter(buffer, dtype=float, count=len(buffer))
+    normalizer = samples.max() if samples.size else 0
+    if normalizer <= 0:
+        return np.zeros(samples.size, dtype=bool)
+    return samples > normalizer * treshold
+
+"""-------------------------------------------------------------------"""
+
+def _frame_levels_(levels, multiplier, start_edge=True):
+    """
+        find UART frames in a list of line levels
+
+        every frame is synchronized to the falling edge of its start bit,
+        then the bits are sampled in their middle, so idle gaps and glitches
+        only affect the frame they occur in
+        multiplier - samples per bit
+        start_edge (True/False) - a low first level is the start of a frame
+
+        returns:    data, number of framing errors,
+                    index of the first level needed by the next call
+    """
+    # sampling points relative to the start edge
+    offsets = ((np.arange(10) + 0.5) * multiplier).astype(int)
+    # falling edges are start bit candidates
+    edges = np.flatnonzero(levels[:-1] & ~levels[1:]) + 1
+    if start_edge and levels.size > 0 and not levels[0]:
+        edges = np.insert(edges, 0, 0)
+    # drop the incomplete frame at the end of the buffer
+    incomplete = edges[edges + offsets[-1] >= levels.size]
+    edges = edges[edges + offsets[-1] < levels.size]
+    # sample every candidate frame at once
+    bits = levels[edges[:, None] + offsets]
+    values = (bits[:, 1:9] @ _bit_weights_).tolist()
+    start_ok = (~bits[:, 0]).tolist()
+    stop_ok = bits[:, 9].tolist()
+    # the next candidate is the first edge after the middle of the stop bit
+    following = np.searchsorted(edges, edges + offsets[-1]).tolist()
+    stop_middle = (edges + offsets[-1]).tolist()
+    # walk through the frames
     data = []
-    for element in data_struct:
-        if element._start_ == 0 and element._stop_ == 1:
-            data.append(element._data_)
-    return data, ""
+    errors = 0
+    index = 0
+    resume = 0
+    while index < len(values):
+        if not start_ok[index]:
+            # glitch, the start bit is too short
+            errors += 1
+            resume = edges[index] + 1
+            index += 1
+            continue
+        if stop_ok[index]:
+            data.append(values[index])
+        else:
+            # missing stop bit
+            errors += 1
+        resume = stop_middle[index]
+        index = following[index]
+    # keep the incomplete frame with the level before it, or the last level
+    keep = max(levels.size - 1, 0)
+    incomplete = incomplete[incomplete >= resume]
+    if incomplete.size > 0:
+        keep = max(int(incomplete[0]) - 1, 0)
+    return data, errors, keep
 
 """-------------------------------------------------------------------"""
 
-def _open_logic_(blocking=False):
+def _stream_loop_():
     """
-        initialize the logic analyzer
-        blocking (True/False) - read function is blocking in logic mode
+        read the continuous recording every few milliseconds, until
+        the recorder is stopped
     """
-    # initialize the logic analizer interface
-    wf.logic.open(wf.device.data, settings._baud_rate_ * settings._record_multiplier_, buffer_size=settings._buffer_size_)
-    # configure triggering
-    timeout = 0 if blocking else 1
-    wf.logic.trigger(wf.device.data, True, pins.tx, timeout=timeout, rising_edge=False, count=0)
+    while not _recorder_._stop_.wait(_recorder_._period_):
+        _poll_stream_()
     return
 
+"""-------------------------------------------------------------------"""
+
+def _poll_stream_():
+    """
+        read the continuous recording on the logic analyzer lane
+    """
+    try:
+        executor.call(_recorder_._device_, "stream", _read_stream_)
+    except Exception as error:
+        # keep receiving, the next read may succeed
+        _recorder_._errors_ += 1
+        _log_.error("stream read failed", error=repr(error))
+    return
+
+"""-------------------------------------------------------------------"""
+
+def _read_stream_():
+    """
+        fetch the samples recorded since the previous read and
+        demodulate the TX line of every streaming Pmod
+    """
+    # clear the flag first, a Pmod joining meanwhile sets it again
+    changed, _recorder_._changed_ = _recorder_._changed_, False
+    members = list(_recorder_._members_)
+    if changed or any(member._tune_._changed_ for member in members):
+        _open_stream_(members)
+    _fetch_stream_(members)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def _fetch_stream_(members):
+    """
+        fetch the recorded samples and demodulate the TX line of every member
+    """
+    start = time.perf_counter()
+    samples, lost, corrupted = backend.read_logic_record(_recorder_._device_)
+    duration = time.perf_counter() - start
+    _recorder_._reads_ += 1
+    _recorder_._lost_ += lost
+    _recorder_._corrupted_ += corrupted
+    if lost > 0 or corrupted > 0:
+        _log_.warning("stream samples lost", lost=lost, corrupted=corrupted)
+    for member in members:
+        if lost > 0:
+            # the frame across the gap can not be decoded
+            member._stream_._gaps_ += 1
+            member._restart_ring_()
+        member._receive_stream_(((samples >> member.pins.tx) & 1).astype(bool), duration)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def _open_stream_(members):
+    """
+        start the continuous recording of every DIO line, or restart it
+        if the sampling frequency or the buffer size changed
+
+        the samples recorded before a restart are demodulated first and
+        the ones not demodulated yet are resampled to the new frequency,
+        so the frames in flight are kept
+    """
+    # the fastest Pmod sets the sampling frequency, the largest buffer the buffer size
+    rate = max(member.settings._baud_rate_ * member.settings._record_multiplier_ for member in members)
+    buffer_size = max(member.settings._max_buffer_size_ for member in members)
+    _recorder_._period_ = min(member.settings._stream_period_ for member in members)
+    device_data = _recorder_._device_
+    restart = _recorder_._rate_ > 0 and (rate, buffer_size) != (_recorder_._rate_, _recorder_._buffer_size_)
+    if restart:
+        _fetch_stream_(members)
+    def setup():
+        backend.start_logic_record(device_data, rate, buffer_size)
+        return
+    # every line is recorded, so Pmods can join and leave without a restart
+    session.configure(("stream", device_data), device_data, "logic", setup, lambda: backend.stop_logic_record(device_data),
+                      reads=[member.pins.tx for member in members], key=(rate, buffer_size))
+    reconfigured = session.use(("stream", device_data))
+    for member in members:
+        member._tune_._changed_ = False
+        if restart and rate != _recorder_._rate_:
+            member._resample_ring_(rate / _recorder_._rate_)
+        elif reconfigured and not restart and _recorder_._rate_ > 0:
+            # the recording was interrupted, e.g. by a triggered capture
+            member._stream_._gaps_ += 1
+            member._restart_ring_()
+    _recorder_._rate_, _recorder_._buffer_size_ = rate, buffer_size
+    return
+
+"""-------------------------------------------------------------------"""
+""" PMOD BLE OBJECTS """
+"""-------------------------------------------------------------------"""
+
+class PmodBLE:
+    """
+        a Pmod BLE connected to the digital I/O lines of a device
+    """
+    def __init__(self, device_data=None, pins=None, settings=None):
+        """
+            device_data - the device the Pmod is connected to,
+                          wf.device.data by default
+            pins - object or dictionary with the rx, tx, rst and status pins
+            settings - object or dictionary overriding the default settings
+        """
+        self.device_data = device_data
+        self.pins = _copy_(_initial_["pins"], pins)
+        self.settings = _copy_(_initial_["settings"], settings)
+        self._flags_ = _copy_(_initial_["_flags_"])
+        self._tune_ = _copy_(_initial_["_tune_"])
+        self._stream_ = _copy_(_initial_["_stream_"])
+
+    """-------------------------------------------------------------------"""
+    """ FUNCTIONS FOR INTERNAL USE """
+    """-------------------------------------------------------------------"""
+
+    def _device_(self):
+        """
+            the device the Pmod is connected to
+        """
+        return wf.device.data if self.device_data is None else self.device_data
+
+    """-------------------------------------------------------------------"""
+
+    def _write_pattern_(self, data):
+        """
+            send UART data using the pattern generator
+        """
+        # generate data
+        wf.pattern.generate(self._device_(), self.pins.rx, wf.pattern.function.custom, self.settings._baud_rate_, data=_build_pattern_(data), idle=wf.pattern.idle_state.high)
+        wf.pattern.disable(self._device_(), self.pins.rx)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _write_uart_(self, data, reopen=False):
+        """
+            send data using the UART instrument
+        """
+        self._session_("uart", reopen)
+        wf.protocol.uart.write(self._device_(), data)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _read_uart_(self, blocking=False, reopen=False):
+        """
+            get data using the UART instrument
+
+            returns:    data, error
+        """
+        self._session_("uart", reopen)
+        data, error = wf.protocol.uart.read(self._device_())
+        if blocking:
+            while len(data) <= 0 and len(error) <= 0:
+                data, error = wf.protocol.uart.read(self._device_())
+        return data, error
+
+    """-------------------------------------------------------------------"""
+
+    def _read_logic_(self, blocking=False):
+        """
+            get UART data using the logic analyzer
+
+            a non-blocking read leaves the acquisition armed, so a message
+            arriving between two reads is captured and returned by the next
+            one, a second message before that read is lost
+        """
+        device_data = self._device_()
+        start = time.perf_counter()
+        if blocking:
+            # record buffer
+            buffer, _ = wf.logic.record(device_data, self.pins.tx)
+            self._flags_._armed_ = False
+        else:
+            if not self._flags_._armed_:
+                backend.arm_logic(device_data)
+            buffer = backend.fetch_logic(device_data, self.pins.tx)
+            if buffer is None:
+                # nothing yet, keep waiting for the trigger
+                self._flags_._armed_ = True
+                return [], ""
+            # wait for the next message while this one is decoded
+            backend.arm_logic(device_data)
+            self._flags_._armed_ = True
+        duration = time.perf_counter() - start
+        levels = _threshold_(buffer, self.settings._treshold_)
+        data, errors, keep = _frame_levels_(levels, self.settings._record_multiplier_)
+        # a frame cut off at the end of the buffer means the message did not fit
+        self._observe_(len(data), errors, duration, truncated=keep < levels.size - 1)
+        return data, self._framing_error_(errors)
+
+    """-------------------------------------------------------------------"""
+
+    def _open_read_logic_(self, blocking=False, reopen=False):
+        """
+            switch to the logic analyzer and get UART data
+        """
+        self._session_("logic", reopen)
+        try:
+            return self._read_logic_(blocking)
+        finally:
+            if self._recorded_():
+                # the capture interrupted the recording of the streaming Pmods, restart it
+                _recorder_._changed_ = True
+
+    """-------------------------------------------------------------------"""
+
+    def _decode_logic_(self, buffer):
+        """
+            decode a logic analyzer buffer into a list of bytes
+
+            returns:    data, error
+        """
+        data, errors, _ = _frame_levels_(_threshold_(buffer, self.settings._treshold_), self.settings._record_multiplier_)
+        return data, self._framing_error_(errors)
+
+    """-------------------------------------------------------------------"""
+
+    def _framing_error_(self, errors):
+        """
+            count framing errors and convert them to an error message
+        """
+        if errors <= 0:
+            return ""
+        self._flags_._framing_errors_ += errors
+        _log_.warning("framing errors", tx=self.pins.tx, count=errors, total=self._flags_._framing_errors_)
+        return "framing errors: " + str(errors)
+
+    """-------------------------------------------------------------------"""
+
+    def _tokenize_(self, chunk):
+        """
+            split received bytes into data and system messages (between "%" signs)
+            in one pass, the start of a fragmented system message is kept for the
+            next call, up to settings._max_sys_msg_ bytes
+
+            returns:    data, list of system messages
+        """
+        flags = self._flags_
+        data = bytearray()
+        messages = []
+        position = 0
+        while position < len(chunk):
+            marker = chunk.find(b"%", position)
+            if flags._currently_sys_:
+                # inside a system message
+                end = len(chunk) if marker < 0 else marker + 1
+                flags._previous_msg_ += chunk[position:end]
+                position = end
+                if marker >= 0:
+                    # the end of the message
+                    messages.append(bytes(flags._previous_msg_))
+                    flags._previous_msg_ = bytearray()
+                    flags._currently_sys_ = False
+                elif len(flags._previous_msg_) > self.settings._max_sys_msg_:
+                    # too long for a system message, it was data
+                    data += flags._previous_msg_
+                    flags._previous_msg_ = bytearray()
+                    flags._currently_sys_ = False
+            elif marker < 0:
+                # only data
+                data += chunk[position:]
+                position = len(chunk)
+            else:
+                # the start of a message
+                data += chunk[position:marker]
+                flags._previous_msg_ = bytearray(b"%")
+                flags._currently_sys_ = True
+                position = marker + 1
+        return bytes(data), messages
+
+    """-------------------------------------------------------------------"""
+
+    def _open_logic_(self):
+        """
+            initialize the logic analyzer
+        """
+        # initialize the logic analizer interface
+        wf.logic.open(self._device_(), self.settings._baud_rate_ * self.settings._record_multiplier_, buffer_size=self.settings._buffer_size_)
+        self._tune_._changed_ = False
+        self._flags_._armed_ = False
+        # configure triggering, the acquisition waits for a start bit
+        wf.logic.trigger(self._device_(), True, self.pins.tx, timeout=0, rising_edge=False, count=0)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _open_uart_(self):
+        """
+            initialize the UART instrument on the pins of the Pmod
+        """
+        wf.protocol.uart.open(self._device_(), rx=self.pins.tx, tx=self.pins.rx, baud_rate=self.settings._baud_rate_)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _open_static_(self):
+        """
+            initialize the reset and status lines
+        """
+        wf.static.set_mode(self._device_(), self.pins.rst, output=True)
+        wf.static.set_mode(self._device_(), self.pins.status, output=False)
+        wf.static.set_state(self._device_(), self.pins.rst, True)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _session_(self, mode, reopen=False):
+        """
+            switch to the instrument of a mode: "uart", "logic" or "static"
+
+            returns:    True if the instrument was reconfigured
+        """
+        device_data = self._device_()
+        settings = self.settings
+        if mode == "uart":
+            session.configure((self, mode), device_data, "uart", self._open_uart_, lambda: wf.protocol.uart.close(device_data),
+                              drives=[self.pins.rx], reads=[self.pins.tx], key=(self.pins.rx, self.pins.tx, settings._baud_rate_))
+        elif mode == "logic":
+            session.configure((self, mode), device_data, "logic", self._open_logic_, lambda: wf.logic.close(device_data),
+                              reads=[self.pins.tx], key=(self.pins.tx, settings._baud_rate_ * settings._record_multiplier_, settings._buffer_size_))
+        elif mode == "static":
+            session.configure((self, mode), device_data, "static", self._open_static_, None,
+                              drives=[self.pins.rst], reads=[self.pins.status], key=(self.pins.rst, self.pins.status))
+        return session.use((self, mode), reconfigure=reopen)
+
+    """-------------------------------------------------------------------"""
+
+    def _observe_(self, count, errors, duration, truncated=False):
+        """
+            record the result of a capture and, with auto tuning,
+            adapt the oversampling factor and the buffer size
+
+            count - number of decoded bytes
+            errors - number of framing errors
+            duration - capture time [s]
+            truncated (True/False) - the message did not fit in the buffer
+        """
+        settings = self.settings
+        tune = self._tune_
+        multiplier = settings._record_multiplier_
+        statistics = tune._statistics_.setdefault(multiplier, {"captures": 0, "bytes": 0, "errors": 0, "capture_time": 0})
+        statistics["captures"] += 1
+        statistics["bytes"] += count
+        statistics["errors"] += errors
+        statistics["capture_time"] += duration
+        if not settings._auto_tune_:
+            return
+        # follow the length of the messages
+        if truncated:
+            tune._message_ = 2 * max(tune._message_, count)
+        elif count > 0:
+            tune._message_ += 0.2 * (count - tune._message_)
+        # judge the current factor on a full window, or as soon as it fails
+        tune._frames_ += count + errors
+        tune._errors_ += errors
+        candidates = sorted(settings._tune_multipliers_)
+        if tune._errors_ > settings._max_error_rate_ * settings._tune_window_:
+            # unreliable, go back to a higher factor
+            if multiplier not in tune._rejected_:
+                tune._rejected_.append(multiplier)
+            higher = [factor for factor in candidates if factor > multiplier and factor not in tune._rejected_]
+            multiplier = higher[0] if len(higher) > 0 else max(candidates + [multiplier])
+            tune._frames_ = tune._errors_ = 0
+        elif tune._frames_ >= settings._tune_window_:
+            # reliable, try a lower factor
+            lower = [factor for factor in candidates if factor < multiplier and factor not in tune._rejected_]
+            if len(lower) > 0:
+                multiplier = lower[-1]
+            tune._frames_ = tune._errors_ = 0
+        # size the buffer for the expected message and the margin
+        frames = int(np.ceil(tune._message_ * (1 + settings._buffer_margin_))) + 1
+        buffer_size = min(frames * 10 * multiplier, settings._max_buffer_size_)
+        resize = abs(buffer_size - settings._buffer_size_) > 0.25 * settings._buffer_size_
+        if multiplier != settings._record_multiplier_ or resize:
+            settings._record_multiplier_ = multiplier
+            settings._buffer_size_ = buffer_size
+            tune._changed_ = True
+            trace.event("ble.tune", multiplier=multiplier, buffer_size=buffer_size)
+            _log_.debug("oversampling changed", tx=self.pins.tx, multiplier=multiplier, buffer_size=buffer_size)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _restart_ring_(self):
+        """
+            the frame across a recording gap can not be decoded,
+            restart the ring from an idle level
+        """
+        stream = self._stream_
+        if stream._ring_.size > 0:
+            stream._ring_[(stream._written_ - 1) % stream._ring_.size] = True
+            stream._consumed_ = max(stream._written_ - 1, 0)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _resample_ring_(self, ratio):
+        """
+            convert the samples not demodulated yet to another sampling
+            frequency, so a frame in flight is decoded after the change
+
+            ratio - new sampling frequency / old sampling frequency
+        """
+        stream = self._stream_
+        size = stream._ring_.size
+        levels = stream._ring_[np.arange(stream._consumed_, stream._written_) % size]
+        if levels.size == 0:
+            return
+        count = max(int(round(levels.size * ratio)), 1)
+        levels = levels[np.minimum((np.arange(count) / ratio).astype(int), levels.size - 1)]
+        # the first level is still the one before the unread samples
+        stream._consumed_ = stream._written_
+        self._push_ring_(levels)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _push_ring_(self, levels):
+        """
+            write line levels into the ring buffer, dropping the oldest
+            samples if it is full
+        """
+        stream = self._stream_
+        size = stream._ring_.size
+        if levels.size > size:
+            # the skipped samples are counted with the overflow
+            stream._written_ += levels.size - size
+            levels = levels[-size:]
+        overflow = stream._written_ + levels.size - stream._consumed_ - size
+        if overflow > 0:
+            stream._overruns_ += overflow
+            stream._consumed_ += overflow
+        # copy in at most two slices
+        start = stream._written_ % size
+        first = min(levels.size, size - start)
+        stream._ring_[start:start + first] = levels[:first]
+        stream._ring_[:levels.size - first] = levels[first:]
+        stream._written_ += levels.size
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def _demodulate_ring_(self, multiplier):
+        """
+            decode the complete frames in the ring buffer and queue the bytes,
+            incomplete frames are kept until the next capture arrives
+
+            multiplier - samples per bit
+
+            returns:    number of decoded bytes, number of framing errors
+        """
+        stream = self._stream_
+        size = stream._ring_.size
+        indices = np.arange(stream._consumed_, stream._written_) % size
+        # the first level is always the one before the unread samples
+        data, errors, keep = _frame_levels_(stream._ring_[indices], multiplier, start_edge=False)
+        stream._consumed_ += keep
+        for value in data:
+            stream._queue_.put(value)
+        return len(data), errors
+
+    """-------------------------------------------------------------------"""
+
+    def _recorded_(self):
+        """
+            returns True if the streaming receiver records the lines of
+            the device of the Pmod
+        """
+        return _recorder_._running_ and _recorder_._device_ is self._device_()
+
+    """-------------------------------------------------------------------"""
+
+    def _receive_stream_(self, levels, duration):
+        """
+            demodulate the line levels of a read of the streaming receiver
+
+            duration - read time [s]
+        """
+        if not self._stream_._running_:
+            return
+        self._push_ring_(levels)
+        count, errors = self._demodulate_ring_(_recorder_._rate_ / self.settings._baud_rate_)
+        self._framing_error_(errors)
+        self._observe_(count, errors, duration)
+        return
+
+    """-------------------------------------------------------------------"""
+    """ USER FUNCTIONS """
+    """-------------------------------------------------------------------"""
+
+    def get_status(self):
+        """
+            returns True when the Pmod is connected and False otherwise
+        """
+        # check connection status
+        if executor.call(self._device_(), "static", wf.static.get_state, self._device_(), self.pins.status) == True:
+            return False
+        else:
+            return True
+
+    """-------------------------------------------------------------------"""
+
+    def open(self):
+        """
+            initializes the necessary instruments for the Pmod BLE
+        """
+        # start the power supplies
+        if wf.supplies.state.off:
+            supplies_data = wf.supplies.data()
+            supplies_data.master_state = True
+            supplies_data.state = True
+            supplies_data.voltage = 3.3
+            executor.call(self._device_(), "supplies", wf.supplies.switch, self._device_(), supplies_data)
+        # initialize the reset line
+        executor.call(self._device_(), "static", self._session_, "static")
+        _log_.info("device opened", tx=self.pins.tx)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def reboot(self):
+        """
+            hard reset the device
+        """
+        # pull down the reset line
+        executor.call(self._device_(), "static", wf.static.set_state, self._device_(), self.pins.rst, False)
+        # wait
+        time.sleep(1)
+        # pull up the reset line
+        executor.call(self._device_(), "static", wf.static.set_state, self._device_(), self.pins.rst, True)
+        _log_.info("rebooting", tx=self.pins.tx)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def reset(self, rx_mode="uart", tx_mode="uart", reopen=False):
+        """
+            factory reset the device
+            sets:   name to PmodBLE_XXXX
+                    high power mode
+                    UART transparent mode
+
+            returns:    False if the factory reset failed settings._max_retries_ times
+        """
+        # enter command mode
+        self.write_command(commands.command_mode, rx_mode, tx_mode, reopen)
+        _log_.info("entering command mode")
+        time.sleep(3)
+        # factory reset the Pmod
+        success = self.write_command(commands.factory_reset, rx_mode, tx_mode, reopen)
+        retries = 1
+        while success != True and retries < self.settings._max_retries_:
+            success = self.write_command(commands.factory_reset, rx_mode, tx_mode, reopen)
+            retries += 1
+            time.sleep(1)
+        if success != True:
+            _log_.error("factory reset failed", tx=self.pins.tx, attempts=retries)
+            return False
+        _log_.info("factory reset finished")
+        # enter command mode
+        self.write_command(commands.command_mode, rx_mode, tx_mode, reopen)
+        _log_.info("entering command mode")
+        time.sleep(3)
+        # rename device
+        self.write_command(commands.rename, rx_mode, tx_mode, reopen)
+        _log_.info("device renamed", name="PmodBLE_XXXX")
+        time.sleep(1)
+        # set high power mode
+        self.write_command(commands.high_power, rx_mode, tx_mode, reopen)
+        _log_.info("high power mode enabled")
+        time.sleep(1)
+        # set communication mode
+        self.write_command(commands.mode, rx_mode, tx_mode, reopen)
+        _log_.info("UART transparent mode enabled")
+        time.sleep(1)
+        # exit command mode
+        self.write_command(commands.data_mode, rx_mode, tx_mode, reopen)
+        _log_.info("exiting command mode")
+        time.sleep(3)
+        return True
+
+    """-------------------------------------------------------------------"""
+
+    def close(self, reset=False):
+        """
+            reboots the deivice
+
+            closes all instruments if reset=True
+        """
+        self.stop_stream()
+        self.reboot()
+        # restart the module
+        if reset:
+            # reset the instruments
+            device_data = self._device_()
+            executor.call(device_data, "pattern", wf.pattern.close, device_data)
+            executor.call(device_data, "logic", wf.logic.close, device_data)
+            executor.call(device_data, "uart", wf.protocol.uart.close, device_data)
+            executor.call(device_data, "static", wf.static.close, device_data)
+            session.forget(device_data)
+            # stop and reset the power supplies
+            if wf.supplies.state.on:
+                supplies_data = wf.supplies.data()
+                supplies_data.master_state = False
+                supplies_data.state = False
+                supplies_data.voltage = 0
+                executor.call(device_data, "supplies", wf.supplies.switch, device_data, supplies_data)
+                executor.call(device_data, "supplies", wf.supplies.close, device_data)
+        _log_.info("device closed", tx=self.pins.tx)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def write_command(self, command, rx_mode="uart", tx_mode="uart", reopen=False):
+        """
+            send a command to the Pmod BLE
+
+            command list: Pmod_BLE.commands
+        """
+        # send the command
+        self.write_data(command, tx_mode=tx_mode, reopen=reopen)
+        # record response, on the same instrument configuration
+        response, _, error = self.read(rx_mode=rx_mode, blocking=False, reopen=False)
+        # analyze response, framing errors are line noise, they are only counted
+        response = response[0:3]
+        if response == "ERR" or response == "Err" or (error != "" and not error.startswith("framing errors")):
+            return False
+        return True
+
+    """-------------------------------------------------------------------"""
+
+    def write_data(self, data, tx_mode="uart", reopen=False):
+        """
+            transmit data over UART using the protocol.uart, or the pattern instrument
+            reopen (True/False) - reconfigure the instrument even if the mode did not change
+        """
+        # send data on the lane of the instrument
+        if tx_mode == "uart":
+            executor.call(self._device_(), "uart", self._write_uart_, data, reopen)
+        elif tx_mode == "pattern":
+            executor.call(self._device_(), "pattern", self._write_pattern_, data)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def queue_data(self, data):
+        """
+            add data to the transmit queue without sending it
+
+            the queued bytes are sent together by flush_data
+        """
+        # cast data to bytes
+        if type(data) == str:
+            data = data.encode("latin-1", "replace")
+        elif type(data) == int:
+            data = [data]
+        self._flags_._tx_queue_.extend([element & 0xFF for element in data])
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def flush_data(self, tx_mode="pattern", reopen=False):
+        """
+            transmit every queued byte in a single burst
+        """
+        if len(self._flags_._tx_queue_) > 0:
+            data = bytes(self._flags_._tx_queue_)
+            self._flags_._tx_queue_.clear()
+            if tx_mode == "uart":
+                data = data.decode("latin-1")
+            self.write_data(data, tx_mode=tx_mode, reopen=reopen)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def write_data_async(self, data, tx_mode="uart", reopen=False):
+        """
+            transmit data on the instrument executor, see WF_Executor
+
+            returns:    future, done when the data is sent
+        """
+        return executor.submit(self._device_(), tx_mode, self.write_data, data, tx_mode, reopen)
+
+    """-------------------------------------------------------------------"""
+
+    def flush_data_async(self, tx_mode="pattern", reopen=False):
+        """
+            transmit every queued byte in a single burst on the instrument executor,
+            bytes queued after the call are sent by the next flush
+
+            returns:    future, done when the data is sent
+        """
+        if len(self._flags_._tx_queue_) == 0:
+            return executor.finished()
+        data = bytes(self._flags_._tx_queue_)
+        self._flags_._tx_queue_.clear()
+        if tx_mode == "uart":
+            data = data.decode("latin-1")
+        return self.write_data_async(data, tx_mode, reopen)
+
+    """-------------------------------------------------------------------"""
+
+    def start_stream(self):
+        """
+            start receiving continuously with the logic analyzer in a background
+            thread, the decoded bytes can be read with read(rx_mode="stream")
+
+            the TX lines of every streaming Pmod are recorded together, without
+            parallel instrument calls (executor.settings.parallel = False) there
+            is no background thread and the recording is read by poll_stream
+        """
+        if self._stream_._running_:
+            return
+        # the ring starts with an idle level
+        self._stream_._ring_ = np.ones(self.settings._ring_size_, dtype=bool)
+        self._stream_._written_ = 1
+        self._stream_._consumed_ = 0
+        self._stream_._running_ = True
+        _recorder_._members_.append(self)
+        _recorder_._changed_ = True
+        if not _recorder_._running_:
+            _recorder_._device_ = self._device_()
+            _recorder_._rate_ = 0
+            executor.call(_recorder_._device_, "stream", _open_stream_, list(_recorder_._members_))
+            _recorder_._running_ = True
+            if executor.settings.parallel:
+                _recorder_._stop_.clear()
+                _recorder_._thread_ = threading.Thread(target=_stream_loop_, name="ble stream", daemon=True)
+                _recorder_._thread_.start()
+        _log_.info("streaming started", tx=self.pins.tx)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def stop_stream(self):
+        """
+            stop the background receiver of this Pmod
+        """
+        if not self._stream_._running_:
+            return
+        self._stream_._running_ = False
+        _recorder_._members_.remove(self)
+        if len(_recorder_._members_) > 0:
+            # the other Pmods keep streaming
+            _recorder_._changed_ = True
+        else:
+            # let the last read finish, then stop the recording
+            if _recorder_._thread_ is not None:
+                _recorder_._stop_.set()
+                _recorder_._thread_.join()
+                _recorder_._thread_ = None
+            _recorder_._running_ = False
+            executor.call(_recorder_._device_, "stream", session.release, ("stream", _recorder_._device_))
+        _log_.info("streaming stopped", tx=self.pins.tx)
+        return
+
+    """-------------------------------------------------------------------"""
+
+    def stream_bytes(self, timeout=None):
+        """
+            iterate over the bytes decoded by the background receiver
+
+            timeout - seconds to wait for a byte, the iteration ends
+                      when it expires (None waits forever)
+        """
+        if _recorder_._thread_ is not None or not self._stream_._running_:
+            while True:
+                try:
+                    yield self._stream_._queue_.get(timeout=timeout)
+                except queue.Empty:
+                    return
+        # without a background receiver, read the recording while waiting
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                yield self._stream_._queue_.get_nowait()
+                continue
+            except queue.Empty:
+                pass
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            time.sleep(_recorder_._period_)
+            self.poll_stream()
+
+    """-------------------------------------------------------------------"""
+
+    def poll_stream(self):
+        """
+            read the recording in the calling thread, if there is no background
+            receiver (executor.settings.parallel = False), e.g. from a scheduler task
+
+            returns:    True if bytes were decoded for this Pmod
+        """
+        if not self._stream_._running_ or _recorder_._thread_ is not None:
+            return False
+        queued = self._stream_._queue_.qsize()
+        _poll_stream_()
+        return self._stream_._queue_.qsize() > queued
+
+    """-------------------------------------------------------------------"""
+
+    def tune_statistics(self):
+        """
+            returns:    dictionary with the captures, decoded bytes, framing errors,
+                        error rate and mean capture time of every oversampling factor
+        """
+        result = {}
+        for multiplier, statistics in sorted(self._tune_._statistics_.items()):
+            frames = statistics["bytes"] + statistics["errors"]
+            result[multiplier] = dict(statistics)
+            result[multiplier]["error_rate"] = statistics["errors"] / frames if frames > 0 else 0
+            result[multiplier]["capture_time"] = statistics["capture_time"] / statistics["captures"]
+        return result
+
+    """-------------------------------------------------------------------"""
+
+    def stream_statistics(self):
+        """
+            returns:    dictionary with the reads, the lost and corrupted samples and
+                        the failed reads of the streaming receiver, and the recording
+                        gaps and the ring overruns of this Pmod
+        """
+        return {"reads": _recorder_._reads_, "lost": _recorder_._lost_, "corrupted": _recorder_._corrupted_,
+                "errors": _recorder_._errors_, "gaps": self._stream_._gaps_, "overruns": self._stream_._overruns_}
+
+    """-------------------------------------------------------------------"""
+
+    def read(self, blocking=False, rx_mode="uart", reopen=False):
+        """
+            receive a message on UART using the protocol.uart, or the logic instrument,
+            or get the bytes decoded by the background receiver (rx_mode="stream")
+            blocking (True/False) blocks until message is received, in logic mode
+                                  a non-blocking read returns the message captured
+                                  since the previous read, one message per read;
+                                  a capture on a device with streaming Pmods
+                                  interrupts their recording for a moment
+            reopen (True/False) - reconfigure the instrument even if the mode did not change
+
+            returns:    data, system message, error
+        """
+        # record incoming message
+        data = []
+        error = ""
+        if rx_mode == "uart":
+            data, error = executor.call(self._device_(), "uart", self._read_uart_, blocking, reopen)
+        elif rx_mode == "logic":
+            if self._stream_._running_:
+                raise RuntimeError("the Pmod is streaming, read it with rx_mode=\"stream\"")
+            data, error = executor.call(self._device_(), "logic", self._open_read_logic_, blocking, reopen)
+        elif rx_mode == "stream":
+            data = []
+            if blocking and not self._stream_._running_:
+                # nothing would ever arrive
+                raise RuntimeError("the streaming receiver is not running, call start_stream first")
+            if blocking:
+                # wait for the first byte
+                data.append(next(self.stream_bytes()))
+            else:
+                # without a background receiver
+                self.poll_stream()
+            # collect everything decoded so far
+            while True:
+                try:
+                    data.append(self._stream_._queue_.get_nowait())
+                except queue.Empty:
+                    break
+        # separate data and system messages
+        data, messages = self._tokenize_(bytes(data))
+        data = data.decode("latin-1")
+        sys_msg = b"".join(messages).decode("latin-1")
+        return data, sys_msg, error
+
+"""-------------------------------------------------------------------"""
+
+# the module level functions drive this Pmod, configured by the module level classes
+_default_ = PmodBLE()
+_default_.pins, _default_.settings = pins, settings
+_default_._flags_, _default_._tune_, _default_._stream_ = _flags_, _tune_, _stream_
+
 """-------------------------------------------------------------------"""
 """ USER FUNCTIONS """
 """-------------------------------------------------------------------"""
@@ -153,11 +1121,7 @@ def get_status():
     """
         returns True when the Pmod is connected and False otherwise
     """
-    # check connection status
-    if wf.static.get_state(wf.device.data, pins.status) == True:
-        return False
-    else:
-        return True
+    return _default_.get_status()
 
 """-------------------------------------------------------------------"""
 
@@ -165,20 +1129,7 @@ def open():
     """
         initializes the necessary instruments for the Pmod BLE
     """
-    # start the power supplies
-    if wf.supplies.state.off:
-        supplies_data = wf.supplies.data()
-        supplies_data.master_state = True
-        supplies_data.state = True
-        supplies_data.voltage = 3.3
-        wf.supplies.switch(wf.device.data, supplies_data)
-    # initialize the reset line
-    wf.static.set_mode(wf.device.data, pins.rst, output=True)
-    wf.static.set_mode(wf.device.data, pins.status, output=False)
-    wf.static.set_state(wf.device.data, pins.rst, True)
-    if settings.DEBUG:
-        print("BLE: device opened")
-    return
+    return _default_.open()
 
 """-------------------------------------------------------------------"""
 
@@ -186,63 +1137,15 @@ def reboot():
     """
         hard reset the device
     """
-    # pull down the reset line
-    wf.static.set_state(wf.device.data, pins.rst, False)
-    # wait
-    time.sleep(1)
-    # pull up the reset line
-    wf.static.set_state(wf.device.data, pins.rst, True)
-    if settings.DEBUG:
-        print("BLE: rebooting")
-    return
+    return _default_.reboot()
 
 """-------------------------------------------------------------------"""
 
 def reset(rx_mode="uart", tx_mode="uart", reopen=False):
     """
-        factory reset the device
-        sets:   name to PmodBLE_XXXX
-                high power mode
-                UART transparent mode
-    """
-    # enter command mode
-    write_command(commands.command_mode, rx_mode, tx_mode, reopen)
-    if settings.DEBUG:
-        print("BLE: entering command mode")
-    time.sleep(3)
-    # factory reset the Pmod
-    success = write_command(commands.factory_reset, rx_mode, tx_mode, reopen)
-    while success != True:
-        success = write_command(commands.factory_reset, rx_mode, tx_mode, reopen)
-        time.sleep(1)
-    if settings.DEBUG:
-        print("BLE: factory reset finished")
-    # enter command mode
-    write_command(commands.command_mode, rx_mode, tx_mode, reopen)
-    if settings.DEBUG:
-        print("BLE: entering command mode")
-    time.sleep(3)
-    # rename device
-    write_command(commands.rename, rx_mode, tx_mode, reopen)
-    if settings.DEBUG:
-        print("BLE: device renamed: PmodBLE_XXXX")
-    time.sleep(1)
-    # set high power mode
-    write_command(commands.high_power, rx_mode, tx_mode, reopen)
-    if settings.DEBUG:
-        print("BLE: high power mode enabled")
-    time.sleep(1)
-    # set communication mode
-    write_command(commands.mode, rx_mode, tx_mode, reopen)
-    if settings.DEBUG:
-        print("BLE: UART transparent mode enabled")
-    time.sleep(1)
-    # exit command mode
-    write_command(commands.data_mode, rx_mode, tx_mode, reopen)
-    if settings.DEBUG:
-        print("BLE: exiting command mode")
-    time.sleep(3)
-    return
+        factory reset the device, see PmodBLE.reset
+    """
+    return _default_.reset(rx_mode, tx_mode, reopen)
 
 """-------------------------------------------------------------------"""
 
@@ -252,25 +1155,7 @@ def close(reset=False):
 
         closes all instruments if reset=True
     """
-    reboot()
-    # restart the module
-    if reset:
-        # reset the instruments
-        wf.pattern.close(wf.device.data)
-        wf.logic.close(wf.device.data)
-        wf.protocol.uart.close(wf.device.data)
-        wf.static.close(wf.device.data)
-        # stop and reset the power supplies
-        if wf.supplies.state.on:
-            supplies_data = wf.supplies.data()
-            supplies_data.master_state = False
-            supplies_data.state = False
-            supplies_data.voltage = 0
-            wf.supplies.switch(wf.device.data, supplies_data)
-            wf.supplies.close(wf.device.data)
-    if settings.DEBUG:
-        print("BLE: device closed")
-    return
+    return _default_.close(reset)
 
 """-------------------------------------------------------------------"""
 
@@ -280,15 +1165,7 @@ def write_command(command, rx_mode="uart", tx_mode="uart", reopen=False):
 
         command list: Pmod_BLE.commands
     """
-    # send the command
-    write_data(command, tx_mode=tx_mode, reopen=reopen)
-    # record response
-    response, _, error = read(rx_mode=rx_mode, blocking=False, reopen=reopen)
-    # analyze response
-    response = response[0:3]
-    if response == "ERR" or response == "Err" or error != "":
-        return False
-    return True
+    return _default_.write_command(command, rx_mode, tx_mode, reopen)
 
 """-------------------------------------------------------------------"""
 
@@ -296,87 +1173,96 @@ def write_data(data, tx_mode="uart", reopen=False):
     """
         transmit data over UART using the protocol.uart, or the pattern instrument
     """
-    # send data
-    if tx_mode == "uart":
-        if not wf.protocol.uart.state.on or reopen:
-            wf.protocol.uart.open(wf.device.data, rx=pins.tx, tx=pins.rx, baud_rate=settings._baud_rate_)
-        wf.protocol.uart.write(wf.device.data, data)
-        if reopen:
-            wf.protocol.uart.close(wf.device.data)
-    elif tx_mode == "pattern":
-        _write_pattern_(data)
-    return
+    return _default_.write_data(data, tx_mode, reopen)
+
+"""-------------------------------------------------------------------"""
+
+def queue_data(data):
+    """
+        add data to the transmit queue without sending it
+
+        the queued bytes are sent together by flush_data
+    """
+    return _default_.queue_data(data)
+
+"""-------------------------------------------------------------------"""
+
+def flush_data(tx_mode="pattern", reopen=False):
+    """
+        transmit every queued byte in a single burst
+    """
+    return _default_.flush_data(tx_mode, reopen)
+
+"""-------------------------------------------------------------------"""
+
+def write_data_async(data, tx_mode="uart", reopen=False):
+    """
+        transmit data on the instrument executor, returns a future
+    """
+    return _default_.write_data_async(data, tx_mode, reopen)
+
+"""-------------------------------------------------------------------"""
+
+def flush_data_async(tx_mode="pattern", reopen=False):
+    """
+        transmit every queued byte on the instrument executor, returns a future
+    """
+    return _default_.flush_data_async(tx_mode, reopen)
+
+"""-------------------------------------------------------------------"""
+
+def start_stream():
+    """
+        start receiving continuously, see PmodBLE.start_stream
+    """
+    return _default_.start_stream()
+
+"""-------------------------------------------------------------------"""
+
+def stop_stream():
+    """
+        stop the background receiver
+    """
+    return _default_.stop_stream()
+
+"""-------------------------------------------------------------------"""
+
+def stream_bytes(timeout=None):
+    """
+        iterate over the bytes decoded by the background receiver, see PmodBLE.stream_bytes
+    """
+    return _default_.stream_bytes(timeout)
+
+"""-------------------------------------------------------------------"""
+
+def poll_stream():
+    """
+        read the recording in the calling thread, see PmodBLE.poll_stream
+    """
+    return _default_.poll_stream()
+
+"""-------------------------------------------------------------------"""
+
+def tune_statistics():
+    """
+        returns:    statistics of every oversampling factor, see PmodBLE.tune_statistics
+    """
+    return _default_.tune_statistics()
+
+"""-------------------------------------------------------------------"""
+
+def stream_statistics():
+    """
+        returns:    dictionary with the statistics of the streaming receiver
+    """
+    return _default_.stream_statistics()
 
 """-------------------------------------------------------------------"""
 
 def read(blocking=False, rx_mode="uart", reopen=False):
     """
-        receive a message on UART using the protocol.uart, or the logic instrument
-        blocking (True/False) blocks until message is received
+        receive a message, see PmodBLE.read
 
         returns:    data, system message, error
     """
-    # record incoming message
-    data = []
-    error = ""
-    if rx_mode == "uart":
-        if not wf.protocol.uart.state.on or reopen:
-            wf.protocol.uart.open(wf.device.data, rx=pins.tx, tx=pins.rx, baud_rate=settings._baud_rate_)
-        data, error = wf.protocol.uart.read(wf.device.data)
-        if blocking:
-            while len(data) <= 0 and len(error) <= 0:
-                data, error = wf.protocol.uart.read(wf.device.data)
-        if reopen:
-            wf.protocol.uart.close(wf.device.data)
-    elif rx_mode == "logic":
-        if not wf.logic.state.on or reopen:
-            _open_logic_(blocking)
-        data, error = _read_logic_()
-        if reopen:
-            wf.logic.close(wf.device.data)
-    # convert the integer list to string
-    temp = ""
-    for index in range(len(data)):
-        data[index] = chr (data[index])
-        temp += data[index]
-    data = temp
-    sys_msg = ""
-    # check for system messages
-    special = data.count("%")
-    """---------------------------------"""
-    if rx_mode == "uart":
-        if special == 0:
-            if _flags_._currently_sys_:
-                # the middle of a system message
-                _flags_._previous_msg_ = _flags_._previous_msg_ + data
-                data = ""
-            else:
-                # not a system message
-                pass
-            """---------------------------------"""
-        elif special == 2:
-            # clear system message
-            sys_msg = data
-            data = ""
-            _flags_._currently_sys_ = False
-            _flags_._previous_msg_ = ""
-            """---------------------------------"""
-        else:
-            # fragmented system message
-            data_list = data.split("%")
-            if _flags_._currently_sys_:
-                # the end of the message
-                sys_msg = _flags_._previous_msg_ + data_list[0] + "%"
-                _flags_._currently_sys_ = False
-                _flags_._previous_msg_ = ""
-                data = data_list[1]
-            else:
-                # the start of the message
-                _flags_._currently_sys_ = True
-                _flags_._previous_msg_ = "%" + data_list[1]
-                data = data_list[0]
-    elif rx_mode == "logic":
-        if special > 0:
-            sys_msg = data
-            data = ""
-    return data, sys_msg, error
+    return _default_.read(blocking, rx_mode, reopen)
@@ -2,7 +2,8 @@
 
 # import modules
 import Pmod_ALS as als
-import WF_SDK as wf # import WaveForms instruments
+import WF_Session as session
+from WF_Backend import wf # import WaveForms instruments, or the simulator
 from time import sleep
 
 # define pins
@@ -19,15 +20,17 @@ try:
 
     while True:
         # display measurements
-        light = als.read_percent(rx_mode="static", reopen=True)
+        light = als.read_percent(rx_mode="static")
         print("static: " + str(light) + "%")
-        light = als.read_percent(rx_mode="spi", reopen=True)
+        light = als.read_percent(rx_mode="spi")
         print("spi: " + str(light) + "%")
         sleep(0.5)
 
 except KeyboardInterrupt:
     pass
 finally:
+    # display the instrument churn
+    print("instrument reconfigurations: " + str(session.statistics()["reconfigurations"]))
     # close the device
     als.close(reset=True)
     wf.device.close(device_data)
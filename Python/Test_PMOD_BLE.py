@@ -2,7 +2,9 @@
  
 # import modules
 import Pmod_BLE as ble
-import WF_SDK as wf # import WaveForms instruments
+import Lamp_Codec as codec
+import Lamp_Log as log
+from WF_Backend import wf # import WaveForms instruments, or the simulator
  
 # define pins
 ble.pins.tx = 4
@@ -11,7 +13,7 @@ ble.pins.rst = 5
 ble.pins.status = 6
 
 # turn on messages
-ble.settings.DEBUG = True
+log.set_level("ble", log.INFO)
  
 try:
     # initialize the interface
@@ -19,7 +21,7 @@ try:
     # check for connection errors
     wf.device.check_error(device_data)
     ble.open()
-    ble.reset(rx_mode="uart", tx_mode="uart", reopen=True)
+    ble.reset(rx_mode="uart", tx_mode="uart", reopen=False)
     ble.reboot()
  
     while True:
@@ -30,6 +32,7 @@ try:
             # display data and system messages
             if data != "":
                 print("data: " + data)  # display it
+                print("colors: " + str(codec.decode_colors(data)))  # and the decoded lamp colors
                 ble.write_data("ok", tx_mode="pattern", reopen=False)  # and send response
             elif sys_msg != "":
                 print("system: " + sys_msg)
@@ -0,0 +1,157 @@
+""" This module selects the instrument backend of the lamp stack """
+
+"""
+    The WF_BACKEND environment variable selects the backend, before the
+    first module of the lamp stack is imported: "sdk" (default) uses the
+    WaveForms SDK and a connected device, "sim" uses the WF_SIM software
+    simulator, so the stack can be tested and benchmarked without hardware.
+"""
+
+import os
+import ctypes
+import numpy as np
+from time import perf_counter, sleep
+
+"""-------------------------------------------------------------------"""
+
+name = os.environ.get("WF_BACKEND", "sdk")
+
+if name == "sim":
+    import WF_SIM as wf # import the simulated instruments
+else:
+    import WF_SDK as wf # import WaveForms instruments
+
+class settings:
+    scope_timeout = 1   # longest wait for an oscilloscope acquisition [s]
+    poll_interval = 1e-04   # time between two status checks of an acquisition [s]
+
+"""-------------------------------------------------------------------"""
+
+def record_channels(device_data, channels):
+    """
+        record several oscilloscope channels in a single acquisition,
+        so they are sampled simultaneously
+
+        raises TimeoutError if the acquisition does not finish
+        within settings.scope_timeout
+
+        returns:    list of buffers, one for every channel
+    """
+    if name == "sim":
+        return wf.scope.record_channels(device_data, channels)
+    # WF_SDK.scope.record starts a new acquisition for every channel,
+    # so all channels are read from one acquisition here
+    dwf = wf.scope.dwf
+    constants = wf.scope.constants
+    dwf.FDwfAnalogInAcquisitionModeSet(device_data.handle, constants.acqmodeSingle)
+    dwf.FDwfAnalogInConfigure(device_data.handle, ctypes.c_bool(False), ctypes.c_bool(True))
+    # wait for the acquisition to finish
+    status = ctypes.c_byte()
+    deadline = perf_counter() + settings.scope_timeout
+    while True:
+        dwf.FDwfAnalogInStatus(device_data.handle, ctypes.c_bool(True), ctypes.byref(status))
+        if status.value == constants.DwfStateDone.value:
+            break
+        if perf_counter() >= deadline:
+            # stop the stalled acquisition, so the next one can start
+            dwf.FDwfAnalogInConfigure(device_data.handle, ctypes.c_bool(False), ctypes.c_bool(False))
+            raise TimeoutError("the oscilloscope acquisition did not finish in " + str(settings.scope_timeout) + "s")
+        sleep(settings.poll_interval)
+    # copy the buffers
+    buffers = []
+    for channel in channels:
+        buffer = (ctypes.c_double * wf.scope.data.buffer_size)()
+        dwf.FDwfAnalogInStatusData(device_data.handle, ctypes.c_int(channel - 1), buffer, ctypes.c_int(wf.scope.data.buffer_size))
+        buffers.append(list(buffer))
+    return buffers
+
+"""-------------------------------------------------------------------"""
+
+def arm_logic(device_data):
+    """
+        start a triggered acquisition of the logic analyzer without waiting
+        for it, the buffer is fetched with fetch_logic once it is done
+    """
+    if name == "sim":
+        wf.logic.arm(device_data)
+        return
+    wf.logic.dwf.FDwfDigitalInConfigure(device_data.handle, ctypes.c_bool(False), ctypes.c_bool(True))
+    return
+
+"""-------------------------------------------------------------------"""
+
+def fetch_logic(device_data, channel):
+    """
+        check the acquisition started by arm_logic, without waiting
+
+        returns:    buffer of a DIO line if the acquisition is done, None otherwise
+    """
+    if name == "sim":
+        return wf.logic.fetch(device_data, channel)
+    dwf = wf.logic.dwf
+    status = ctypes.c_byte()
+    dwf.FDwfDigitalInStatus(device_data.handle, ctypes.c_bool(True), ctypes.byref(status))
+    if status.value != wf.logic.constants.DwfStateDone.value:
+        return None
+    buffer_size = wf.logic.data.buffer_size
+    samples = (ctypes.c_uint16 * buffer_size)()
+    dwf.FDwfDigitalInStatusData(device_data.handle, samples, ctypes.c_int(2 * buffer_size))
+    return ((np.frombuffer(samples, dtype=np.uint16) >> channel) & 1).tolist()
+
+"""-------------------------------------------------------------------"""
+
+def start_logic_record(device_data, sampling_frequency, buffer_size=0):
+    """
+        start recording every DIO line continuously, the samples are
+        fetched with read_logic_record while the acquisition goes on,
+        so there are no gaps between consecutive reads
+
+        buffer_size - samples kept by the device between two reads
+    """
+    wf.logic.open(device_data, sampling_frequency, buffer_size=buffer_size)
+    if name == "sim":
+        wf.logic.start_record(device_data)
+        return
+    dwf = wf.logic.dwf
+    constants = wf.logic.constants
+    dwf.FDwfDigitalInAcquisitionModeSet(device_data.handle, constants.acqmodeRecord)
+    dwf.FDwfDigitalInTriggerSourceSet(device_data.handle, constants.trigsrcNone)
+    # the longest record, it runs until stop_logic_record
+    dwf.FDwfDigitalInTriggerPositionSet(device_data.handle, ctypes.c_uint(0xFFFFFFFF))
+    dwf.FDwfDigitalInConfigure(device_data.handle, ctypes.c_bool(False), ctypes.c_bool(True))
+    return
+
+"""-------------------------------------------------------------------"""
+
+def read_logic_record(device_data):
+    """
+        fetch the samples recorded since the previous read
+
+        returns:    array of samples (one bit for every DIO line), number of
+                    samples lost and number of samples corrupted because
+                    the device buffer was full
+    """
+    if name == "sim":
+        return wf.logic.read_record(device_data)
+    dwf = wf.logic.dwf
+    status = ctypes.c_byte()
+    available = ctypes.c_int()
+    lost = ctypes.c_int()
+    corrupted = ctypes.c_int()
+    dwf.FDwfDigitalInStatus(device_data.handle, ctypes.c_bool(True), ctypes.byref(status))
+    dwf.FDwfDigitalInStatusRecord(device_data.handle, ctypes.byref(available), ctypes.byref(lost), ctypes.byref(corrupted))
+    samples = (ctypes.c_uint16 * available.value)()
+    if available.value > 0:
+        dwf.FDwfDigitalInStatusData(device_data.handle, samples, ctypes.c_int(2 * available.value))
+    return np.frombuffer(samples, dtype=np.uint16).copy(), lost.value, corrupted.value
+
+"""-------------------------------------------------------------------"""
+
+def stop_logic_record(device_data):
+    """
+        stop the continuous recording and reset the logic analyzer
+    """
+    if name == "sim":
+        wf.logic.stop_record(device_data)
+    wf.logic.close(device_data)
+    return
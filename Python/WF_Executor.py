@@ -0,0 +1,173 @@
+""" This module runs instrument calls of a device concurrently """
+
+"""
+    Every instrument of a device (static I/O, SPI, pattern generator,
+    scope, ...) has a lane: the calls submitted to a lane run one after
+    another, in the order of submission, while the lanes of different
+    instruments run at the same time on a pool of worker threads. A call
+    returns a future, so e.g. the light sensor and the oscilloscope can
+    measure together, and the caller waits for the slowest of them
+    instead of the sum of both.
+
+    The lanes are the physical instruments: the protocols (UART, SPI),
+    the pattern generator and the logic analyzer run on the digital
+    engines, so their calls share one lane. Every instrument call of the
+    lamp stack goes through submit or call, and a call made from inside
+    a lane runs at once, so a call can use its own instrument again.
+
+    If the SDK turns out not to be thread safe, settings.parallel = False
+    runs every call in the calling thread, one at a time, and returns a
+    finished future, so the callers do not change. The streaming receiver
+    of Pmod_BLE then polls the recording from the scheduler instead of
+    a background thread.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+"""-------------------------------------------------------------------"""
+
+class settings:
+    parallel = True     # False runs every call in the calling thread
+    workers = 4     # number of worker threads
+
+# lane of every mode, the modes missing here have a lane of their own
+instruments = {"uart": "digital", "spi": "digital", "pattern": "digital", "logic": "digital", "stream": "digital",
+               "static": "static", "scope": "scope", "supplies": "supplies"}
+
+class counters:
+    submitted = 0   # calls submitted to the executor
+    overlapped = 0  # calls started while another instrument was busy
+
+class _flags_:
+    _pool_ = None   # the worker threads
+    _lanes_ = {}    # queue of the waiting calls of every instrument
+    _busy_ = set()  # instruments running a call
+    _lock_ = threading.Lock()
+    _serial_ = threading.RLock()    # held by the running call if not parallel
+    _local_ = threading.local()     # lane of the call running in a thread
+
+"""-------------------------------------------------------------------"""
+""" FUNCTIONS FOR INTERNAL USE """
+"""-------------------------------------------------------------------"""
+
+def _run_(future, function, args, kwargs):
+    """
+        run a call and store its result or exception in the future
+    """
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        future.set_result(function(*args, **kwargs))
+    except BaseException as error:
+        future.set_exception(error)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def _drain_(lane):
+    """
+        run the waiting calls of an instrument in order, on a worker thread
+    """
+    while True:
+        with _flags_._lock_:
+            calls = _flags_._lanes_[lane]
+            if len(calls) == 0:
+                _flags_._busy_.discard(lane)
+                return
+            call = calls.popleft()
+        _flags_._local_.lane = lane
+        try:
+            _run_(*call)
+        finally:
+            _flags_._local_.lane = None
+
+"""-------------------------------------------------------------------"""
+""" USER FUNCTIONS """
+"""-------------------------------------------------------------------"""
+
+def lane(device_data, instrument):
+    """
+        returns:    the lane of an instrument or mode of a device
+    """
+    return device_data, instruments.get(instrument, instrument)
+
+"""-------------------------------------------------------------------"""
+
+def submit(device_data, instrument, function, *args, **kwargs):
+    """
+        run function(*args, **kwargs) on an instrument of a device
+
+        calls on the same instrument run in order, one at a time,
+        calls on different instruments run concurrently
+
+        instrument - instrument or mode used by the call, e.g. "static", "spi", "scope"
+
+        returns:    concurrent.futures.Future of the result
+    """
+    future = Future()
+    counters.submitted += 1
+    if not settings.parallel:
+        with _flags_._serial_:
+            _run_(future, function, args, kwargs)
+        return future
+    key = lane(device_data, instrument)
+    if getattr(_flags_._local_, "lane", None) == key:
+        # called from the lane itself, waiting for it would never end
+        _run_(future, function, args, kwargs)
+        return future
+    with _flags_._lock_:
+        if _flags_._pool_ is None:
+            _flags_._pool_ = ThreadPoolExecutor(max_workers=settings.workers, thread_name_prefix="instrument")
+        _flags_._lanes_.setdefault(key, deque()).append((future, function, args, kwargs))
+        if key in _flags_._busy_:
+            return future
+        if len(_flags_._busy_) > 0:
+            counters.overlapped += 1
+        _flags_._busy_.add(key)
+    _flags_._pool_.submit(_drain_, key)
+    return future
+
+"""-------------------------------------------------------------------"""
+
+def call(device_data, instrument, function, *args, **kwargs):
+    """
+        run function(*args, **kwargs) on an instrument of a device and
+        wait for it, see submit
+
+        returns:    the result of the call, raises its exception
+    """
+    return submit(device_data, instrument, function, *args, **kwargs).result()
+
+"""-------------------------------------------------------------------"""
+
+def finished(result=None):
+    """
+        returns:    a future which already holds the result
+    """
+    future = Future()
+    future.set_result(result)
+    return future
+
+"""-------------------------------------------------------------------"""
+
+def wait(futures):
+    """
+        wait for every future
+
+        returns:    list of the results, raises the first exception
+    """
+    return [future.result() for future in futures]
+
+"""-------------------------------------------------------------------"""
+
+def shutdown():
+    """
+        wait for the submitted calls and stop the worker threads
+    """
+    with _flags_._lock_:
+        pool, _flags_._pool_ = _flags_._pool_, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+    return
@@ -0,0 +1,12 @@
+""" Software simulator of the WaveForms SDK instruments used by the smart lamp """
+
+"""
+    The simulator has the same interface as the used parts of WF_SDK.
+    A virtual Pmod BLE, Pmod ALS, RGB LED and battery are connected to
+    its instruments (see WF_SIM.model), so the lamp stack can run and be
+    benchmarked without an Analog Discovery Pro. Every instrument call is
+    counted and adds its latency and acquisition time to a simulated
+    clock (see WF_SIM.core).
+"""
+
+from WF_SIM import core, model, device, static, pattern, logic, scope, supplies, protocol
@@ -0,0 +1,52 @@
+""" Timing counters and settings shared by the simulated instruments """
+
+from time import sleep
+
+"""-------------------------------------------------------------------"""
+
+class settings:
+    realtime = False    # sleep for the simulated instrument time
+    call_latency = 100e-06  # round trip time of a single instrument call [s]
+
+class counters:
+    calls = {}  # number of calls of every instrument function
+    time = 0    # simulated instrument time [s]
+
+"""-------------------------------------------------------------------"""
+
+def account(name, duration=0):
+    """
+        count an instrument call, which keeps the instrument busy for "duration" seconds
+    """
+    counters.calls[name] = counters.calls.get(name, 0) + 1
+    duration += settings.call_latency
+    counters.time += duration
+    if settings.realtime:
+        sleep(duration)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def now():
+    """
+        returns:    the simulated time [s]
+    """
+    return counters.time
+
+"""-------------------------------------------------------------------"""
+
+def total_calls(prefix=""):
+    """
+        returns:    the number of instrument calls with names starting with prefix
+    """
+    return sum(count for name, count in counters.calls.items() if name.startswith(prefix))
+
+"""-------------------------------------------------------------------"""
+
+def reset():
+    """
+        clear the counters
+    """
+    counters.calls = {}
+    counters.time = 0
+    return
@@ -0,0 +1,39 @@
+""" Simulated device control """
+
+from WF_SIM import core
+
+"""-------------------------------------------------------------------"""
+
+class data:
+    handle = 1
+    name = "ADP3450 (simulated)"
+    version = "simulated"
+
+class error(Exception):
+    pass
+
+"""-------------------------------------------------------------------"""
+
+def open(device="", config=0):
+    """
+        open the simulated device
+    """
+    core.account("device.open")
+    return data
+
+"""-------------------------------------------------------------------"""
+
+def check_error(device_data):
+    """
+        the simulated device never fails to open
+    """
+    return
+
+"""-------------------------------------------------------------------"""
+
+def close(device_data):
+    """
+        close the simulated device
+    """
+    core.account("device.close")
+    return
@@ -0,0 +1,190 @@
+""" Simulated logic analyzer """
+
+from time import perf_counter
+import numpy as np
+from WF_SIM import core, model
+
+"""-------------------------------------------------------------------"""
+
+class data:
+    sampling_frequency = 100e06
+    buffer_size = 4096
+    max_buffer_size = 32768
+
+class state:
+    on = False
+    off = True
+
+class _trigger_:
+    enabled = False
+    channel = 0
+    timeout = 0
+    rising_edge = True
+
+class _armed_:
+    armed = False   # a triggered acquisition was started by arm
+
+class _record_:
+    running = False
+    last = 0    # time of the previous read
+    phase = 0   # fractional sample count of the previous read
+
+"""-------------------------------------------------------------------"""
+
+def open(device_data, sampling_frequency=100e06, buffer_size=0):
+    """
+        initialize the logic analyzer
+    """
+    core.account("logic.open")
+    data.sampling_frequency = sampling_frequency
+    data.buffer_size = buffer_size if buffer_size > 0 else data.max_buffer_size
+    state.on = True
+    state.off = False
+    return
+
+"""-------------------------------------------------------------------"""
+
+def trigger(device_data, enable, channel, position=0, timeout=0, rising_edge=True, length_min=0, length_max=20, count=0):
+    """
+        set up triggering
+    """
+    core.account("logic.trigger")
+    _trigger_.enabled = enable
+    _trigger_.channel = channel
+    _trigger_.timeout = timeout
+    _trigger_.rising_edge = rising_edge
+    return
+
+"""-------------------------------------------------------------------"""
+
+def record(device_data, channel):
+    """
+        record a buffer of samples on a DIO line
+
+        the TX line of the virtual Pmod BLE is continuous: consecutive
+        records return consecutive parts of it
+
+        returns:    buffer, error
+    """
+    buffers, waited = _acquire_([channel])
+    core.account("logic.record", (waited + data.buffer_size) / data.sampling_frequency)
+    return buffers[0], ""
+
+"""-------------------------------------------------------------------"""
+
+def arm(device_data):
+    """
+        start a triggered acquisition, without waiting for it
+    """
+    core.account("logic.arm")
+    _armed_.armed = True
+    return
+
+"""-------------------------------------------------------------------"""
+
+def fetch(device_data, channel):
+    """
+        check the acquisition started by arm
+
+        the virtual Pmod BLE triggers it when the phone has data
+
+        returns:    buffer of the line if the acquisition is done, None otherwise
+    """
+    trigger = model.find_ble(_trigger_.channel, "tx")
+    if not _armed_.armed or (_trigger_.enabled and trigger is not None and not model.line_pending(trigger)):
+        # waiting for the trigger
+        core.account("logic.fetch")
+        return None
+    _armed_.armed = False
+    buffers, waited = _acquire_([channel])
+    core.account("logic.fetch", (waited + data.buffer_size) / data.sampling_frequency)
+    return buffers[0]
+
+"""-------------------------------------------------------------------"""
+
+def _acquire_(channels):
+    """
+        wait for the trigger, then sample the lines of the virtual devices
+
+        returns:    list of buffers, number of samples before the trigger
+    """
+    waited = 0
+    trigger = model.find_ble(_trigger_.channel, "tx")
+    if _trigger_.enabled and not _trigger_.rising_edge and trigger is not None and _trigger_.channel in channels:
+        # wait for the falling edge of the next start bit
+        waited = model.skip_idle(data.sampling_frequency, trigger)
+        if waited is None:
+            # auto trigger after the timeout
+            waited = _trigger_.timeout * data.sampling_frequency
+    buffers = []
+    for channel in channels:
+        ble = model.find_ble(channel, "tx")
+        if ble is None:
+            buffers.append([0] * data.buffer_size)
+        else:
+            buffers.append(model.line_samples(data.buffer_size, data.sampling_frequency, ble))
+    return buffers, waited
+
+"""-------------------------------------------------------------------"""
+
+def start_record(device_data):
+    """
+        start recording every DIO line continuously, in real time
+    """
+    core.account("logic.start_record")
+    _record_.running = True
+    _record_.last = perf_counter()
+    _record_.phase = 0
+    return
+
+"""-------------------------------------------------------------------"""
+
+def read_record(device_data):
+    """
+        fetch the samples recorded since the previous read
+
+        the lines are sampled at the wall clock time passed since the
+        previous read, samples which did not fit in the buffer are lost
+
+        returns:    array of samples (one bit for every DIO line), number
+                    of lost samples, number of corrupted samples
+    """
+    core.account("logic.read_record")
+    if not _record_.running:
+        return np.zeros(0, dtype=np.uint16), 0, 0
+    now = perf_counter()
+    _record_.phase += (now - _record_.last) * data.sampling_frequency
+    _record_.last = now
+    count = int(_record_.phase)
+    _record_.phase -= count
+    lost = max(count - data.buffer_size, 0)
+    count -= lost
+    samples = np.zeros(count, dtype=np.uint16)
+    for device in model.ble_devices:
+        # the lost samples pass on the line without being recorded
+        model.line_samples(lost, data.sampling_frequency, device)
+        samples |= np.array(model.line_samples(count, data.sampling_frequency, device), dtype=np.uint16) << device.tx
+    return samples, lost, 0
+
+"""-------------------------------------------------------------------"""
+
+def stop_record(device_data):
+    """
+        stop the continuous recording
+    """
+    core.account("logic.stop_record")
+    _record_.running = False
+    return
+
+"""-------------------------------------------------------------------"""
+
+def close(device_data):
+    """
+        reset the logic analyzer
+    """
+    core.account("logic.close")
+    _record_.running = False
+    _armed_.armed = False
+    state.on = False
+    state.off = True
+    return
@@ -0,0 +1,289 @@
+""" Virtual devices connected to the simulated instruments """
+
+"""
+    The default wiring matches Lamp_Controller. The virtual Pmod BLE turns
+    the bytes sent by the phone into a UART waveform on its TX line and
+    decodes the frames generated on its RX line. The virtual Pmod ALS
+    shifts out its light level on SPI, through the SPI protocol instrument
+    or bit by bit through the static I/O pins, in every SPI mode. The RGB
+    LED records its duty cycles and the scope channels return constant
+    voltages with gaussian noise. More virtual Pmods can be connected to
+    other pins with add_ble and add_als, the instruments find the device
+    wired to the used pin.
+"""
+
+import copy
+import numpy as np
+
+"""-------------------------------------------------------------------"""
+
+class ble:
+    rx = 3  # RX pin of the Pmod
+    tx = 4  # TX pin of the Pmod
+    rst = 5 # RESET pin of the Pmod
+    status = 6  # STATUS pin of the Pmod
+    baud_rate = 115200
+    connected = True
+    gap = 0     # idle bit times between incoming bytes
+    incoming = bytearray()  # bytes sent by the phone, not on the line yet
+    received = bytearray()  # bytes decoded from the RX line
+    _line_ = []     # samples of the TX line, not recorded yet
+    _phase_ = 0     # fractional sample position of the TX line
+
+class als:
+    cs = 8  # CS pin of the Pmod
+    sdo = 9 # SDO pin of the Pmod
+    sck = 10    # SCK pin of the Pmod
+    level = 128     # raw light level, 0 to 255
+    noise = 0   # standard deviation of the light level
+    mode = 0    # SPI mode
+    _word_ = 0  # word being shifted out
+    _index_ = 0
+    _output_ = 0
+    _sck_ = False
+
+class led:
+    red = 0     # pattern generator channel of the red LED
+    green = 1   # pattern generator channel of the green LED
+    blue = 2    # pattern generator channel of the blue LED
+    duty = {}   # last duty cycle of every channel
+
+class scope:
+    voltages = {1: 3.9, 2: 0.1, 3: 0, 4: 5}  # voltage on every channel
+    noise = 0.005   # standard deviation of the voltages
+
+_random_ = np.random.default_rng(0)
+
+# every connected virtual Pmod, the first ones are the default devices
+ble_devices = [ble]
+als_devices = [als]
+
+# state of a newly connected device
+_ble_initial_ = {name: copy.deepcopy(value) for name, value in vars(ble).items() if not name.startswith("__")}
+_als_initial_ = {name: copy.deepcopy(value) for name, value in vars(als).items() if not name.startswith("__")}
+
+"""-------------------------------------------------------------------"""
+""" DEVICES """
+"""-------------------------------------------------------------------"""
+
+def add_ble(rx, tx, rst, status):
+    """
+        connect another virtual Pmod BLE
+
+        returns:    the new device, it can be passed to send, receive, ...
+    """
+    device = type("ble", (), copy.deepcopy(_ble_initial_))
+    device.rx, device.tx, device.rst, device.status = rx, tx, rst, status
+    ble_devices.append(device)
+    return device
+
+"""-------------------------------------------------------------------"""
+
+def add_als(cs, sdo, sck):
+    """
+        connect another virtual Pmod ALS
+
+        returns:    the new device, it can be passed to als_word, als_bytes, ...
+    """
+    device = type("als", (), copy.deepcopy(_als_initial_))
+    device.cs, device.sdo, device.sck = cs, sdo, sck
+    als_devices.append(device)
+    return device
+
+"""-------------------------------------------------------------------"""
+
+def find_ble(channel, line):
+    """
+        returns:    the virtual Pmod BLE which has "line" ("rx", "tx", "rst"
+                    or "status") on this channel, None if there is none
+    """
+    for device in ble_devices:
+        if getattr(device, line) == channel:
+            return device
+    return None
+
+"""-------------------------------------------------------------------"""
+
+def find_als(channel, line):
+    """
+        returns:    the virtual Pmod ALS which has "line" ("cs", "sdo" or
+                    "sck") on this channel, None if there is none
+    """
+    for device in als_devices:
+        if getattr(device, line) == channel:
+            return device
+    return None
+
+"""-------------------------------------------------------------------"""
+""" VIRTUAL PMOD BLE """
+"""-------------------------------------------------------------------"""
+
+def send(data, device=ble):
+    """
+        send data from the phone to the ADP
+    """
+    if type(data) == str:
+        data = data.encode("latin-1")
+    device.incoming.extend(data)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def receive(device=ble):
+    """
+        returns:    the bytes received from the ADP since the last call
+    """
+    data = bytes(device.received)
+    device.received.clear()
+    return data
+
+"""-------------------------------------------------------------------"""
+
+def _extend_line_(sampling_frequency, device=ble):
+    """
+        append the waveform of the next incoming byte to the TX line
+
+        returns:    False if the phone has no data
+    """
+    if len(device.incoming) == 0:
+        return False
+    samples_per_bit = sampling_frequency / device.baud_rate
+    value = device.incoming.pop(0)
+    bits = [0] + [(value >> bit) & 1 for bit in range(8)] + [1] + [1] * device.gap
+    for bit in bits:
+        # keep the fractional part, so the bit rate stays exact
+        device._phase_ += samples_per_bit
+        length = int(device._phase_)
+        device._phase_ -= length
+        device._line_.extend([bit] * length)
+    return True
+
+"""-------------------------------------------------------------------"""
+
+def line_samples(count, sampling_frequency, device=ble):
+    """
+        get the next "count" samples of the TX line of the Pmod BLE
+    """
+    while len(device._line_) < count and _extend_line_(sampling_frequency, device):
+        pass
+    samples = device._line_[:count]
+    del device._line_[:count]
+    return samples + [1] * (count - len(samples))
+
+"""-------------------------------------------------------------------"""
+
+def skip_idle(sampling_frequency, device=ble):
+    """
+        drop the idle samples before the next start bit on the TX line
+
+        returns:    number of dropped samples, None if the phone has no data
+    """
+    dropped = 0
+    while 0 not in device._line_:
+        dropped += len(device._line_)
+        device._line_ = []
+        if not _extend_line_(sampling_frequency, device):
+            return None
+    start = device._line_.index(0)
+    del device._line_[:start]
+    return dropped + start
+
+"""-------------------------------------------------------------------"""
+
+def line_pending(device=ble):
+    """
+        returns:    True if the phone has data which is not recorded yet
+    """
+    return len(device.incoming) > 0 or 0 in device._line_
+
+"""-------------------------------------------------------------------"""
+
+def decode_pattern(bits, device=ble):
+    """
+        decode the UART frames of a custom pattern, one bit per element
+    """
+    bits = list(bits)
+    index = 0
+    while index + 10 <= len(bits):
+        if bits[index] != 0:
+            # idle
+            index += 1
+            continue
+        frame = bits[index:index + 10]
+        if frame[9]:
+            device.received.append(sum(bit << position for position, bit in enumerate(frame[1:9])))
+        index += 10
+    return
+
+"""-------------------------------------------------------------------"""
+""" VIRTUAL PMOD ALS """
+"""-------------------------------------------------------------------"""
+
+def als_word(device=als):
+    """
+        returns:    the 16-bit word of the next conversion
+    """
+    level = device.level
+    if device.noise > 0:
+        level += _random_.normal(0, device.noise)
+    level = int(min(max(round(level), 0), 255))
+    return ((level >> 4) << 8) | ((level & 0x0F) << 4)
+
+"""-------------------------------------------------------------------"""
+
+def als_pin(channel, value, device=als):
+    """
+        drive the chip select and clock pins of the Pmod ALS
+    """
+    cpol = device.mode >= 2
+    cpha = device.mode % 2
+    if channel == device.cs and not value:
+        # a conversion starts on the falling edge of chip select
+        device._word_ = als_word(device)
+        device._index_ = 0
+        device._sck_ = cpol
+        device._output_ = _als_bit_(0, device) if cpha == 0 else 0
+    elif channel == device.sck and value != device._sck_:
+        leading = device._sck_ == cpol
+        device._sck_ = value
+        if cpha == 0 and not leading:
+            # shift on the trailing edge
+            device._index_ += 1
+            device._output_ = _als_bit_(device._index_, device)
+        elif cpha == 1 and leading:
+            # shift on the leading edge
+            device._output_ = _als_bit_(device._index_, device)
+            device._index_ += 1
+    return
+
+"""-------------------------------------------------------------------"""
+
+def _als_bit_(index, device=als):
+    """
+        bit of the current word, MSB first, followed by zeros
+    """
+    if index >= 16:
+        return 0
+    return (device._word_ >> (15 - index)) & 1
+
+"""-------------------------------------------------------------------"""
+
+def als_bytes(count, device=als):
+    """
+        returns:    "count" bytes of a conversion, read with the SPI instrument
+    """
+    word = als_word(device)
+    return ([(word >> 8) & 0xFF, word & 0xFF] + [0] * count)[:count]
+
+"""-------------------------------------------------------------------"""
+""" SCOPE """
+"""-------------------------------------------------------------------"""
+
+def voltage(channel, count=None):
+    """
+        returns:    one sample, or "count" samples of a scope channel
+    """
+    level = scope.voltages.get(channel, 0)
+    if count is None:
+        return float(level + _random_.normal(0, scope.noise))
+    return level + _random_.normal(0, scope.noise, count)
@@ -0,0 +1,64 @@
+""" Simulated pattern generator """
+
+from WF_SIM import core, model
+
+"""-------------------------------------------------------------------"""
+
+class function:
+    pulse = 1
+    custom = 2
+    random = 3
+
+class idle_state:
+    initial = 0
+    high = 1
+    low = 2
+    high_impedance = 3
+
+class state:
+    on = False
+    off = True
+
+_custom_ = function.custom
+_pulse_ = function.pulse
+
+"""-------------------------------------------------------------------"""
+
+def generate(device_data, channel, function, frequency, duty_cycle=50, data=[], wait=0, repeat=0, run_time=0, idle=idle_state.initial, trigger_enabled=False, trigger_source=0, trigger_edge_rising=True):
+    """
+        generate a signal on a DIO line
+    """
+    duration = 0
+    if function == _custom_:
+        # a custom pattern is played once, one bit per clock period
+        duration = len(data) / frequency
+        ble = model.find_ble(channel, "rx")
+        if ble is not None:
+            model.decode_pattern(data, ble)
+    elif function == _pulse_:
+        model.led.duty[channel] = duty_cycle
+    core.account("pattern.generate", duration)
+    state.on = True
+    state.off = False
+    return
+
+"""-------------------------------------------------------------------"""
+
+def disable(device_data, channel):
+    """
+        disable a DIO line
+    """
+    core.account("pattern.disable")
+    return
+
+"""-------------------------------------------------------------------"""
+
+def close(device_data):
+    """
+        reset the pattern generator
+    """
+    core.account("pattern.close")
+    model.led.duty = {}
+    state.on = False
+    state.off = True
+    return
@@ -0,0 +1,3 @@
+""" Simulated digital protocol instruments """
+
+from WF_SIM.protocol import uart, spi
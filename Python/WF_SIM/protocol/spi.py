@@ -0,0 +1,47 @@
+""" Simulated SPI protocol instrument """
+
+from WF_SIM import core, model
+
+"""-------------------------------------------------------------------"""
+
+class state:
+    on = False
+    off = True
+
+class _settings_:
+    clk_frequency = 1e06
+
+"""-------------------------------------------------------------------"""
+
+def open(device_data, cs, sck, miso=None, mosi=None, clk_frequency=1e06, mode=0, order=True):
+    """
+        initializes SPI communication
+    """
+    core.account("protocol.spi.open")
+    _settings_.clk_frequency = clk_frequency
+    state.on = True
+    state.off = False
+    return
+
+"""-------------------------------------------------------------------"""
+
+def read(device_data, count, cs):
+    """
+        receives "count" bytes from the virtual Pmod ALS
+    """
+    core.account("protocol.spi.read", count * 8 / _settings_.clk_frequency)
+    als = model.find_als(cs, "cs")
+    if als is None:
+        return [0] * count
+    return model.als_bytes(count, als)
+
+"""-------------------------------------------------------------------"""
+
+def close(device_data):
+    """
+        reset the spi interface
+    """
+    core.account("protocol.spi.close")
+    state.on = False
+    state.off = True
+    return
@@ -0,0 +1,66 @@
+""" Simulated UART protocol instrument """
+
+from WF_SIM import core, model
+
+"""-------------------------------------------------------------------"""
+
+class state:
+    on = False
+    off = True
+
+class _settings_:
+    baud_rate = 9600
+    device = None   # the virtual Pmod BLE on the used pins
+
+"""-------------------------------------------------------------------"""
+
+def open(device_data, rx, tx, baud_rate=9600, parity=None, data_bits=8, stop_bits=1):
+    """
+        initializes UART communication
+    """
+    core.account("protocol.uart.open")
+    _settings_.baud_rate = baud_rate
+    # the RX line of the instrument is the TX line of the Pmod
+    _settings_.device = model.find_ble(rx, "tx")
+    state.on = True
+    state.off = False
+    return
+
+"""-------------------------------------------------------------------"""
+
+def read(device_data):
+    """
+        receives data from the virtual Pmod BLE
+
+        returns:    list of integers, error
+    """
+    received = []
+    if _settings_.device is not None:
+        received = list(_settings_.device.incoming)
+        _settings_.device.incoming.clear()
+    core.account("protocol.uart.read", len(received) * 10 / _settings_.baud_rate)
+    return received, ""
+
+"""-------------------------------------------------------------------"""
+
+def write(device_data, data):
+    """
+        send data to the virtual Pmod BLE
+    """
+    if type(data) == str:
+        data = data.encode("latin-1")
+    if _settings_.device is not None:
+        _settings_.device.received.extend(data)
+    core.account("protocol.uart.write", len(data) * 10 / _settings_.baud_rate)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def close(device_data):
+    """
+        reset the uart interface
+    """
+    core.account("protocol.uart.close")
+    state.on = False
+    state.off = True
+    return
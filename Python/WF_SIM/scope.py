@@ -0,0 +1,67 @@
+""" Simulated oscilloscope """
+
+from WF_SIM import core, model
+
+"""-------------------------------------------------------------------"""
+
+class data:
+    sampling_frequency = 20e06
+    buffer_size = 8192
+    max_buffer_size = 32768
+
+class state:
+    on = False
+    off = True
+
+"""-------------------------------------------------------------------"""
+
+def open(device_data, sampling_frequency=20e06, buffer_size=0, offset=0, amplitude_range=5):
+    """
+        initialize the oscilloscope
+    """
+    core.account("scope.open")
+    data.sampling_frequency = sampling_frequency
+    data.buffer_size = buffer_size if buffer_size > 0 else data.max_buffer_size
+    state.on = True
+    state.off = False
+    return
+
+"""-------------------------------------------------------------------"""
+
+def measure(device_data, channel):
+    """
+        measure a voltage
+    """
+    core.account("scope.measure")
+    return model.voltage(channel)
+
+"""-------------------------------------------------------------------"""
+
+def record(device_data, channel):
+    """
+        record an analog signal
+    """
+    core.account("scope.record", data.buffer_size / data.sampling_frequency)
+    return model.voltage(channel, data.buffer_size).tolist()
+
+"""-------------------------------------------------------------------"""
+
+def record_channels(device_data, channels):
+    """
+        record several channels in a single acquisition
+
+        returns:    list of buffers, one for every channel
+    """
+    core.account("scope.record_channels", data.buffer_size / data.sampling_frequency)
+    return [model.voltage(channel, data.buffer_size).tolist() for channel in channels]
+
+"""-------------------------------------------------------------------"""
+
+def close(device_data):
+    """
+        reset the oscilloscope
+    """
+    core.account("scope.close")
+    state.on = False
+    state.off = True
+    return
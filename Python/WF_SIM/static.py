@@ -0,0 +1,60 @@
+""" Simulated static I/O instrument """
+
+from WF_SIM import core, model
+
+"""-------------------------------------------------------------------"""
+
+class _flags_:
+    _outputs_ = {}  # state of every output pin
+
+"""-------------------------------------------------------------------"""
+
+def set_mode(device_data, channel, output):
+    """
+        set a DIO line as input, or as output
+    """
+    core.account("static.set_mode")
+    if output:
+        _flags_._outputs_.setdefault(channel, False)
+    else:
+        _flags_._outputs_.pop(channel, None)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def get_state(device_data, channel):
+    """
+        get the state of a DIO line
+    """
+    core.account("static.get_state")
+    ble = model.find_ble(channel, "status")
+    if ble is not None:
+        # the status line is low while a phone is connected
+        return not ble.connected
+    als = model.find_als(channel, "sdo")
+    if als is not None:
+        return bool(als._output_)
+    return _flags_._outputs_.get(channel, False)
+
+"""-------------------------------------------------------------------"""
+
+def set_state(device_data, channel, value):
+    """
+        set the state of a DIO line
+    """
+    core.account("static.set_state")
+    _flags_._outputs_[channel] = bool(value)
+    als = model.find_als(channel, "cs") or model.find_als(channel, "sck")
+    if als is not None:
+        model.als_pin(channel, bool(value), als)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def close(device_data):
+    """
+        reset the static I/O instrument
+    """
+    core.account("static.close")
+    _flags_._outputs_ = {}
+    return
@@ -0,0 +1,44 @@
+""" Simulated power supplies """
+
+from WF_SIM import core
+
+"""-------------------------------------------------------------------"""
+
+class data:
+    name = ""
+    master_state = False
+    state = False
+    positive_state = False
+    negative_state = False
+    positive_voltage = 0
+    negative_voltage = 0
+    voltage = 0
+    positive_current = 0
+    negative_current = 0
+    current = 0
+
+class state:
+    on = False
+    off = True
+
+"""-------------------------------------------------------------------"""
+
+def switch(device_data, supplies_data):
+    """
+        turn the power supplies on/off
+    """
+    core.account("supplies.switch")
+    state.on = bool(supplies_data.master_state)
+    state.off = not state.on
+    return
+
+"""-------------------------------------------------------------------"""
+
+def close(device_data):
+    """
+        reset the supplies
+    """
+    core.account("supplies.close")
+    state.on = False
+    state.off = True
+    return
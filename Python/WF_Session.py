@@ -0,0 +1,248 @@
+""" This module keeps track of the instrument configurations of the devices """
+
+"""
+    Every mode of a Pmod (UART, SPI, logic analyzer, static I/O) is a named
+    configuration in a pool: the instrument it uses, the function which
+    sets it up, the function which releases it, and the pins it drives
+    and reads. Switching to a configuration which is already active costs
+    nothing; an instrument is reconfigured only when the requested mode
+    differs from the current one. Configurations which need the same
+    instrument, or drive a pin used by the other, exclude each other: the
+    active one is released first. The pooled configurations are kept,
+    so switching back is a single setup call. The number of
+    reconfigurations, reuses and releases of every instrument is counted.
+
+    The instruments are set up and released outside the lock of the pool,
+    so the lanes of WF_Executor set up different instruments at the same
+    time; only a configuration conflicting with one being set up waits.
+"""
+
+import threading
+
+"""-------------------------------------------------------------------"""
+
+class counters:
+    reconfigurations = {}   # setup calls of every instrument
+    reuses = {}     # requests served by the active configuration
+    releases = {}   # configurations released of every instrument
+
+class _flags_:
+    _pool_ = {}     # configuration of every name
+    _active_ = {}   # names of the active configurations of every device
+    _pending_ = {}  # names of the configurations of every device being set up
+    _lock_ = threading.RLock()
+    _done_ = threading.Condition(_lock_)    # notified when a setup is over
+
+# instruments which are configured pin by pin, so they can be shared
+_per_pin_ = ["static"]
+
+"""-------------------------------------------------------------------"""
+""" FUNCTIONS FOR INTERNAL USE """
+"""-------------------------------------------------------------------"""
+
+class _configuration_:
+    """
+        a pooled instrument configuration
+    """
+    def __init__(self, name, device_data, instrument, setup, teardown, drives, reads, key):
+        self.name = name
+        self.device_data = device_data
+        self.instrument = instrument
+        self.setup = setup
+        self.teardown = teardown
+        self.drives = set(drives)
+        self.reads = set(reads)
+        self.key = key
+        self.stale = False  # the settings changed while it was active
+
+    def conflicts(self, other):
+        """
+            returns True if the configurations can not be active together
+        """
+        if self.instrument == other.instrument and self.instrument not in _per_pin_:
+            return True
+        return len(self.drives & (other.drives | other.reads)) > 0 or len(other.drives & self.reads) > 0
+
+"""-------------------------------------------------------------------"""
+
+def _count_(counter, instrument):
+    """
+        increment the counter of an instrument
+    """
+    counter[instrument] = counter.get(instrument, 0) + 1
+    return
+
+"""-------------------------------------------------------------------"""
+
+def _deactivate_(configuration, teardown=True):
+    """
+        remove a configuration from the active ones, releasing the instrument
+    """
+    _flags_._active_.get(configuration.device_data, []).remove(configuration.name)
+    if teardown and configuration.teardown is not None:
+        configuration.teardown()
+        _count_(counters.releases, configuration.instrument)
+    return
+
+"""-------------------------------------------------------------------"""
+""" USER FUNCTIONS """
+"""-------------------------------------------------------------------"""
+
+def configure(name, device_data, instrument, setup, teardown=None, drives=(), reads=(), key=None):
+    """
+        add a configuration to the pool, or update it
+
+        name - any hashable value identifying the configuration
+        instrument - "uart", "spi", "logic", "static", ...
+        setup() - configures the instrument
+        teardown() - releases the instrument, or None
+        drives, reads - the pins driven and read by the instrument
+        key - the settings of the configuration, if they change
+              the instrument is reconfigured on the next use
+    """
+    with _flags_._lock_:
+        previous = _flags_._pool_.get(name)
+        if previous is not None and previous.key == key and previous.device_data is device_data:
+            # the pins can change without reconfiguring the instrument
+            previous.drives, previous.reads = set(drives), set(reads)
+            return
+        configuration = _configuration_(name, device_data, instrument, setup, teardown, drives, reads, key)
+        if previous is not None and is_active(name):
+            # reconfigure on the next use, with the new setup
+            _flags_._active_[previous.device_data].remove(name)
+            _flags_._active_.setdefault(device_data, []).append(name)
+            configuration.stale = True
+        _flags_._pool_[name] = configuration
+    return
+
+"""-------------------------------------------------------------------"""
+
+def use(name, reconfigure=False):
+    """
+        make a pooled configuration active, releasing the conflicting ones
+
+        reconfigure (True/False) - set up the instrument even if it is active
+
+        returns:    True if the instrument was reconfigured
+    """
+    with _flags_._lock_:
+        while True:
+            configuration = _flags_._pool_[name]
+            active = _flags_._active_.setdefault(configuration.device_data, [])
+            pending = _flags_._pending_.setdefault(configuration.device_data, [])
+            if name in active and not configuration.stale and not reconfigure:
+                _count_(counters.reuses, configuration.instrument)
+                return False
+            # wait for the setups of this configuration and of the ones in the way
+            if not any(other == name or configuration.conflicts(_flags_._pool_[other]) for other in pending):
+                break
+            _flags_._done_.wait()
+        if name in active:
+            active.remove(name)
+        # release the configurations in the way
+        released = [_flags_._pool_[other] for other in list(active) if configuration.conflicts(_flags_._pool_[other])]
+        for other in released:
+            active.remove(other.name)
+        pending.append(name)
+    done = False
+    try:
+        # the instruments are reconfigured without holding the lock
+        for other in released:
+            if other.teardown is not None and other.instrument != configuration.instrument:
+                other.teardown()
+                with _flags_._lock_:
+                    _count_(counters.releases, other.instrument)
+        configuration.setup()
+        done = True
+    finally:
+        with _flags_._lock_:
+            pending.remove(name)
+            if done:
+                _count_(counters.reconfigurations, configuration.instrument)
+                current = _flags_._pool_[name]
+                # configured again meanwhile, set it up again on the next use
+                current.stale = current is not configuration
+                _flags_._active_.setdefault(current.device_data, []).append(name)
+            _flags_._done_.notify_all()
+    return True
+
+"""-------------------------------------------------------------------"""
+
+def release(name):
+    """
+        release the instrument of a configuration, if it is active
+    """
+    with _flags_._lock_:
+        if is_active(name):
+            _deactivate_(_flags_._pool_[name])
+    return
+
+"""-------------------------------------------------------------------"""
+
+def forget(device_data, instrument=None):
+    """
+        mark the configurations of a device as inactive, without releasing
+        them, after the instruments were closed or reset directly
+
+        instrument - only the configurations of this instrument, all if None
+    """
+    with _flags_._lock_:
+        for name in list(_flags_._active_.get(device_data, [])):
+            configuration = _flags_._pool_[name]
+            if instrument is None or configuration.instrument == instrument:
+                _deactivate_(configuration, teardown=False)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def is_active(name):
+    """
+        returns True if the configuration is active
+    """
+    configuration = _flags_._pool_.get(name)
+    return configuration is not None and name in _flags_._active_.get(configuration.device_data, [])
+
+"""-------------------------------------------------------------------"""
+
+def active(device_data, instrument=None):
+    """
+        returns:    the names of the active configurations of a device
+    """
+    with _flags_._lock_:
+        return [name for name in _flags_._active_.get(device_data, []) if instrument is None or _flags_._pool_[name].instrument == instrument]
+
+"""-------------------------------------------------------------------"""
+
+def pin_mode(device_data, pin):
+    """
+        returns:    instrument, "output" or "input" and the name of the
+                    configuration using a pin, or None if it is unused
+    """
+    with _flags_._lock_:
+        for name in _flags_._active_.get(device_data, []):
+            configuration = _flags_._pool_[name]
+            if pin in configuration.drives:
+                return configuration.instrument, "output", name
+            if pin in configuration.reads:
+                return configuration.instrument, "input", name
+    return None
+
+"""-------------------------------------------------------------------"""
+
+def statistics():
+    """
+        returns:    dictionary with the reconfigurations, reuses and
+                    releases of every instrument
+    """
+    return {"reconfigurations": dict(counters.reconfigurations), "reuses": dict(counters.reuses), "releases": dict(counters.releases)}
+
+"""-------------------------------------------------------------------"""
+
+def reset_statistics():
+    """
+        clear the counters
+    """
+    counters.reconfigurations = {}
+    counters.reuses = {}
+    counters.releases = {}
+    return
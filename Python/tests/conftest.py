@@ -0,0 +1,34 @@
+""" Shared setup of the tests: the lamp stack runs on the simulated instruments """
+
+# import modules
+import os
+import sys
+import copy
+os.environ["WF_BACKEND"] = "sim"    # run on the simulated instruments
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pytest
+import numpy as np
+import WF_SIM as sim
+
+"""-------------------------------------------------------------------"""
+
+# state of the virtual devices before the first test
+_devices_ = [sim.model.ble, sim.model.als, sim.model.led, sim.model.scope]
+_initial_ = {device: {name: copy.deepcopy(value) for name, value in vars(device).items() if not name.startswith("__")} for device in _devices_}
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture(autouse=True)
+def simulator():
+    """
+        reset the virtual devices and the counters of the simulator before every test
+    """
+    for device, values in _initial_.items():
+        for name, value in values.items():
+            setattr(device, name, copy.deepcopy(value))
+    sim.model.ble_devices[:] = [sim.model.ble]
+    sim.model.als_devices[:] = [sim.model.als]
+    sim.model._random_ = np.random.default_rng(0)
+    sim.core.settings.realtime = False
+    sim.core.reset()
+    yield sim
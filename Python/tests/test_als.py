@@ -0,0 +1,69 @@
+""" Tests of the Pmod ALS on the simulated sensor """
+
+# import modules
+import numpy as np
+import pytest
+import Pmod_ALS as als
+import WF_Session as session
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture
+def pmod(simulator):
+    """
+        a Pmod ALS wired to the virtual sensor, with a fast SPI clock
+    """
+    sensor = simulator.model.als
+    sensor.level = 0xA5
+    return als.PmodALS(pins={"cs": sensor.cs, "sdo": sensor.sdo, "sck": sensor.sck}, settings={"_spi_frequency_": 1e09})
+
+"""-------------------------------------------------------------------"""
+
+@pytest.mark.parametrize("mode", range(4))
+@pytest.mark.parametrize("msb_first", [True, False])
+@pytest.mark.parametrize("length", [1, 2, 3])
+def test_static_engine_in_every_spi_mode(simulator, pmod, mode, msb_first, length):
+    simulator.model.als.mode = mode
+    pmod.settings._spi_mode_ = mode
+    pmod.settings._msb_first_ = msb_first
+    pmod._open_static_()
+    expected = simulator.model.als_bytes(length)
+    if not msb_first:
+        expected = [int(format(value, "08b")[::-1], 2) for value in expected]
+    assert pmod._read_static_(length) == expected
+
+"""-------------------------------------------------------------------"""
+
+@pytest.mark.parametrize("rx_mode", ["static", "spi"])
+def test_read_in_both_modes(pmod, rx_mode):
+    assert pmod.read(rx_mode=rx_mode) == 0xA5
+    assert pmod.read_percent(rx_mode=rx_mode) == round(0xA5 * 100 / 255, 2)
+
+"""-------------------------------------------------------------------"""
+
+@pytest.mark.parametrize("rx_mode", ["static", "spi"])
+def test_read_many_configures_once(pmod, rx_mode):
+    pmod.read(rx_mode="spi" if rx_mode == "static" else "static")
+    session.reset_statistics()
+    assert pmod.read_percent_many(10, rx_mode=rx_mode) == round(0xA5 * 100 / 255, 2)
+    assert session.statistics()["reconfigurations"] == {rx_mode: 1}
+
+"""-------------------------------------------------------------------"""
+
+@pytest.mark.parametrize("method", ["mean", "median", "trimmed", "hampel"])
+def test_reduce_ignores_failed_conversions(pmod, method):
+    assert pmod.reduce([100, float("nan"), 100, 100], method) == 100
+    assert np.isnan(pmod.reduce([float("nan")], method))
+
+"""-------------------------------------------------------------------"""
+
+def test_hampel_removes_a_glitch(pmod):
+    assert pmod.reduce([100, 101, 99, 100, 0, 100, 101], "hampel") == pytest.approx(100.166, abs=1e-02)
+
+"""-------------------------------------------------------------------"""
+
+def test_failed_readings_are_nan(pmod, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("no answer")
+    monkeypatch.setattr(als.wf.protocol.spi, "read", fail)
+    assert np.isnan(pmod.read_percent_many(5, rx_mode="spi"))
@@ -0,0 +1,78 @@
+""" Tests of the Bluetooth codec and the extended telemetry protocol """
+
+# import modules
+import numpy as np
+import Lamp_Codec as codec
+
+prefixes = [codec.pre_light, codec.pre_bat, codec.pre_charge]
+limits = [100, 5, 5]
+
+"""-------------------------------------------------------------------"""
+
+def test_decode_colors_keeps_missing_channels():
+    data = bytes([codec.pre_red << 6 | 0x3F, codec.pre_blue << 6 | 0])
+    assert codec.decode_colors(data, color=(1, 2, 3)) == [100, 2, 0]
+
+"""-------------------------------------------------------------------"""
+
+def test_decode_stream_matches_decode_colors():
+    data = bytes(np.random.default_rng(0).integers(0, 256, 1000, dtype=np.uint8))
+    channels, percents = codec.decode_stream(data)
+    colors = codec.decode_colors(data)
+    for index in range(3):
+        assert percents[channels == index][-1] == colors[index]
+
+"""-------------------------------------------------------------------"""
+
+def test_encode_round_trip_within_one_step():
+    values = np.linspace(-1, 6, 500)
+    for value, byte in zip(values, codec.encode_many(values, codec.pre_bat, 5)):
+        prefix, decoded = codec.decode_value(byte, 5)
+        assert prefix == codec.pre_bat
+        assert abs(decoded - min(max(value, 0), 5)) < 5 / 0x3F + 1e-09
+
+"""-------------------------------------------------------------------"""
+
+def test_encode_invalid_values():
+    assert codec.encode(float("nan"), codec.pre_bat, 5) == 0
+    assert codec.encode(1, codec.pre_bat, 5, 5) == 0
+
+"""-------------------------------------------------------------------"""
+
+def test_telemetry_round_trip():
+    random = np.random.default_rng(1)
+    for legacy, keyframe in [(False, 30), (True, 30), (False, 0)]:
+        encoder = codec.TelemetryEncoder(prefixes, limits, keyframe=keyframe, legacy=legacy)
+        decoder = codec.TelemetryDecoder(prefixes, limits)
+        decoded = {}
+        for row in np.column_stack([random.uniform(0, 100, 200), 4 + random.normal(0, 0.01, 200), np.full(200, 5.0)]):
+            data = encoder.encode(row)
+            # records can be split between reads
+            decoded.update(decoder.decode(data[:1]))
+            decoded.update(decoder.decode(data[1:]))
+            for prefix, value, limit in zip(prefixes, row, limits):
+                assert abs(decoded[prefix] - value) <= limit / 0xFFF / 2 + 1e-09
+
+"""-------------------------------------------------------------------"""
+
+def test_telemetry_skips_unchanged_samples():
+    encoder = codec.TelemetryEncoder(prefixes, limits, keyframe=0)
+    assert len(encoder.encode([50, 4, 0])) == 9
+    assert encoder.encode([50, 4, 0]) == b"" and encoder.skipped == 3
+    encoder.reset()
+    assert len(encoder.encode([50, 4, 0])) == 9
+
+"""-------------------------------------------------------------------"""
+
+def test_telemetry_keyframes():
+    encoder = codec.TelemetryEncoder(prefixes, limits, keyframe=3)
+    sizes = [len(encoder.encode([50, 4, 0])) for _ in range(6)]
+    assert sizes == [9, 0, 0, 9, 0, 0]
+
+"""-------------------------------------------------------------------"""
+
+def test_legacy_decoders_ignore_extended_bytes():
+    encoder = codec.TelemetryEncoder(prefixes, limits)
+    data = encoder.encode([100, 5, 5])
+    assert codec.decode_colors(data) == [0, 0, 0]
+    assert np.all(codec.decode_stream(data)[0] == -1)
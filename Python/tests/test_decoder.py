@@ -0,0 +1,82 @@
+""" Tests of the UART decoder of the Pmod BLE """
+
+# import modules
+import numpy as np
+import Pmod_BLE as ble
+
+"""-------------------------------------------------------------------"""
+
+def frames(data, multiplier, gap=0):
+    """
+        line levels of UART frames, with "gap" idle samples after every frame
+    """
+    levels = []
+    for value in data:
+        bits = [0] + [(value >> bit) & 1 for bit in range(8)] + [1]
+        levels += [level for bit in bits for level in [bit] * multiplier] + [1] * gap
+    return np.array(levels, dtype=bool)
+
+"""-------------------------------------------------------------------"""
+
+def test_frame_levels_decodes_every_byte():
+    levels = frames(range(256), 10)
+    data, errors, _ = ble._frame_levels_(levels, 10)
+    assert data == list(range(256)) and errors == 0
+
+"""-------------------------------------------------------------------"""
+
+def test_frame_levels_resynchronizes_after_idle_gaps():
+    data, errors, _ = ble._frame_levels_(frames([0x00, 0xFF, 0x55, 0xAA], 10, gap=17), 10)
+    assert data == [0x00, 0xFF, 0x55, 0xAA] and errors == 0
+
+"""-------------------------------------------------------------------"""
+
+def test_frame_levels_counts_a_missing_stop_bit():
+    levels = frames([0x41, 0x42], 10)
+    # the stop bit of the first frame is low
+    levels[90:100] = False
+    data, errors, _ = ble._frame_levels_(levels, 10)
+    assert 0x41 not in data and errors >= 1
+
+"""-------------------------------------------------------------------"""
+
+def test_frame_levels_keeps_the_incomplete_frame():
+    levels = frames([0x41, 0x42], 10)
+    cut = levels[:150]
+    data, errors, keep = ble._frame_levels_(cut, 10)
+    assert data == [0x41] and errors == 0
+    # the next call starts at the idle level before the second start bit
+    assert keep == 99
+    data, _, _ = ble._frame_levels_(np.concatenate([cut[keep:], levels[150:]]), 10, start_edge=False)
+    assert data == [0x42]
+
+"""-------------------------------------------------------------------"""
+
+def test_decode_logic_thresholds_analog_levels():
+    pmod = ble.PmodBLE()
+    buffer = (frames(b"lamp", pmod.settings._record_multiplier_).astype(float) * 3.3).tolist()
+    assert pmod._decode_logic_(buffer) == (list(b"lamp"), "")
+
+"""-------------------------------------------------------------------"""
+
+def test_decode_logic_reports_framing_errors():
+    pmod = ble.PmodBLE()
+    levels = frames(b"ab", pmod.settings._record_multiplier_)
+    levels[9 * pmod.settings._record_multiplier_:10 * pmod.settings._record_multiplier_] = False
+    data, error = pmod._decode_logic_(levels.astype(int).tolist())
+    assert error.startswith("framing errors") and pmod._flags_._framing_errors_ > 0
+
+"""-------------------------------------------------------------------"""
+
+def test_build_pattern_matches_the_decoder():
+    pattern = np.frombuffer(ble._build_pattern_("hello"), dtype=np.uint8).astype(bool)
+    data, errors, _ = ble._frame_levels_(np.repeat(pattern, 4), 4)
+    assert bytes(data) == b"hello" and errors == 0
+
+"""-------------------------------------------------------------------"""
+
+def test_logic_read_through_the_simulator(simulator):
+    pmod = ble.PmodBLE(pins={"rx": simulator.model.ble.rx, "tx": simulator.model.ble.tx, "rst": simulator.model.ble.rst, "status": simulator.model.ble.status})
+    simulator.model.send("hello")
+    data, sys_msg, error = pmod.read(rx_mode="logic")
+    assert (data, sys_msg, error) == ("hello", "", "")
@@ -0,0 +1,113 @@
+""" Tests of the instrument executor """
+
+# import modules
+import threading
+import pytest
+import WF_Executor as executor
+from time import sleep
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture(params=[True, False], ids=["parallel", "serial"])
+def parallel(request):
+    """
+        run a test with and without worker threads
+    """
+    previous = executor.settings.parallel
+    executor.settings.parallel = request.param
+    yield request.param
+    executor.shutdown()
+    executor.settings.parallel = previous
+
+"""-------------------------------------------------------------------"""
+
+def test_lanes_are_the_physical_instruments():
+    assert executor.lane(None, "uart") == executor.lane(None, "spi") == executor.lane(None, "pattern") == executor.lane(None, "logic") == executor.lane(None, "stream")
+    assert executor.lane(None, "static") != executor.lane(None, "spi")
+    assert executor.lane("first", "scope") != executor.lane("second", "scope")
+    assert executor.lane(None, "custom") == (None, "custom")
+
+"""-------------------------------------------------------------------"""
+
+def test_calls_of_a_lane_run_in_order(parallel):
+    running = {}
+    overlaps = []
+    order = []
+    lock = threading.Lock()
+
+    def call(instrument, index):
+        with lock:
+            running[instrument] = running.get(instrument, 0) + 1
+            overlaps.append(running[instrument] > 1)
+        sleep(1e-04)
+        with lock:
+            order.append((instrument, index))
+            running[instrument] -= 1
+        return index
+
+    futures = [executor.submit(None, instrument, call, instrument, index) for index in range(10) for instrument in ["static", "scope", "spi", "pattern"]]
+    assert executor.wait(futures) == [index for index in range(10) for _ in range(4)]
+    assert not any(overlaps)
+    for instrument in ["static", "scope", "spi", "pattern"]:
+        assert [index for name, index in order if name == instrument] == list(range(10))
+    # spi and pattern share the digital lane
+    digital = [name for name, _ in order if name in ["spi", "pattern"]]
+    assert digital == ["spi", "pattern"] * 10
+
+"""-------------------------------------------------------------------"""
+
+def test_exceptions_reach_the_caller(parallel):
+    future = executor.submit(None, "scope", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        future.result()
+    with pytest.raises(ZeroDivisionError):
+        executor.call(None, "scope", lambda: 1 / 0)
+
+"""-------------------------------------------------------------------"""
+
+def test_calls_from_inside_a_lane_run_at_once(parallel):
+    def outer():
+        # the digital lane is busy with this call, uart has to run inline
+        return executor.call(None, "uart", lambda: "inner") + executor.call(None, "scope", lambda: "-scope")
+    assert executor.call(None, "pattern", outer) == "inner-scope"
+
+"""-------------------------------------------------------------------"""
+
+def test_serial_mode_runs_in_the_calling_thread():
+    previous = executor.settings.parallel
+    executor.settings.parallel = False
+    try:
+        future = executor.submit(None, "scope", threading.get_ident)
+        assert future.done() and future.result() == threading.get_ident()
+    finally:
+        executor.settings.parallel = previous
+
+"""-------------------------------------------------------------------"""
+
+def test_different_instruments_overlap():
+    previous = executor.settings.parallel
+    executor.settings.parallel = True
+    try:
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(1)
+            return "scope"
+
+        slow_future = executor.submit(None, "scope", slow)
+        assert started.wait(1)
+        # the static lane is not blocked by the busy scope
+        assert executor.call(None, "static", lambda: "static") == "static"
+        release.set()
+        assert slow_future.result() == "scope"
+    finally:
+        executor.shutdown()
+        executor.settings.parallel = previous
+
+"""-------------------------------------------------------------------"""
+
+def test_finished_future():
+    future = executor.finished(42)
+    assert future.done() and future.result() == 42
@@ -0,0 +1,62 @@
+""" Tests of the sensor filters """
+
+# import modules
+import numpy as np
+import pytest
+import Lamp_Filters as filters
+
+nan = float("nan")
+
+"""-------------------------------------------------------------------"""
+
+def test_ema():
+    average = filters.EMA(0.5)
+    assert average.update(nan) is None
+    assert [average.update(sample) for sample in [10, 20, nan, 20]] == [10, 15, 15, 17.5]
+    average.reset()
+    assert average.update(4) == 4
+
+"""-------------------------------------------------------------------"""
+
+@pytest.mark.parametrize("window", [1, 4, 5, 7])
+def test_moving_median_matches_numpy(window):
+    random = np.random.default_rng(window)
+    stream = random.integers(0, 10, 200).astype(float)
+    stream[random.random(200) < 0.1] = nan
+    median = filters.MovingMedian(window)
+    kept = []
+    for sample in stream:
+        if not np.isnan(sample):
+            kept.append(sample)
+        assert median.update(sample) == (float(np.median(kept[-window:])) if kept else None)
+
+"""-------------------------------------------------------------------"""
+
+@pytest.mark.parametrize("count", list(range(1, 40)))
+def test_middle_deviation_is_the_median_of_the_deviations(count):
+    values = sorted(np.random.default_rng(count).integers(0, 8, count).astype(float).tolist())
+    median = filters._middle_(values)
+    assert filters._middle_deviation_(values, median) == filters._middle_(sorted(abs(value - median) for value in values))
+
+"""-------------------------------------------------------------------"""
+
+def test_hampel_replaces_glitches():
+    # deviations of one step are never outliers
+    hampel = filters.Hampel(5, floor=1)
+    output = [hampel.update(sample) for sample in [50, 51, 49, 50, 50, 0, 50, 51, nan, 49]]
+    assert output[5] == 50 and hampel.rejected == 1
+    assert output[8] == 50 and output[9] == 49
+
+"""-------------------------------------------------------------------"""
+
+def test_hampel_passes_a_lasting_step():
+    hampel = filters.Hampel(5)
+    output = [hampel.update(sample) for sample in [50] * 10 + [80] * 10]
+    assert output[-1] == 80 and output.index(80) <= 10 + 5 // 2 + 1
+
+"""-------------------------------------------------------------------"""
+
+def test_robust_mean_ignores_outliers_and_failed_readings():
+    assert filters.robust_mean([100, 101, 99, 100, 0, nan, 100]) == pytest.approx(100)
+    assert np.isnan(filters.robust_mean([nan, nan]))
+    assert np.allclose(filters.robust_mean([[1, 1, 1, 9], [2, 2, 2, 2]]), [1, 2])
@@ -0,0 +1,89 @@
+""" Tests of the telemetry history store """
+
+# import modules
+import os
+import numpy as np
+import Lamp_History as history
+
+metrics = ["light", "battery", "charger"]
+
+"""-------------------------------------------------------------------"""
+
+def samples(start, count, period=10):
+    """
+        synthetic measurements every "period" seconds
+
+        returns:    times, values
+    """
+    times = start + np.arange(count) * period
+    random = np.random.default_rng(int(start))
+    values = np.column_stack([random.uniform(0, 100, count), 4 - times / 1e06, np.zeros(count)])
+    values[3, 1] = np.nan  # a failed measurement
+    return times, values
+
+"""-------------------------------------------------------------------"""
+
+def test_rollups_match_the_raw_samples():
+    store = history.History(metrics)
+    times, values = samples(0, 1000)
+    for timestamp, row in zip(times, values):
+        store.append(row, timestamp)
+    raw = store.query("battery", resolution="raw")
+    assert np.array_equal(raw["time"], times)
+    minute = store.query("battery", resolution="minute")
+    hour = store.query("battery", resolution="hour")
+    # the open intervals are not stored yet
+    assert minute["time"].size == times[-1] // 60 and hour["time"].size == times[-1] // 3600
+    for rollup, width in [(minute, 60), (hour, 3600)]:
+        for index in [0, 1, rollup["time"].size - 1]:
+            inside = values[(times >= rollup["time"][index]) & (times < rollup["time"][index] + width), 1]
+            assert np.isclose(rollup["min"][index], np.nanmin(inside))
+            assert np.isclose(rollup["mean"][index], np.nanmean(inside))
+            assert np.isclose(rollup["max"][index], np.nanmax(inside))
+
+"""-------------------------------------------------------------------"""
+
+def test_range_query_and_latest():
+    store = history.History(metrics)
+    times, values = samples(0, 100)
+    for timestamp, row in zip(times, values):
+        store.append(row, timestamp)
+    rows = store.query("light", 100, 200, "raw")
+    assert np.array_equal(rows["time"], np.arange(100, 210, 10))
+    assert store.latest("light") == (times[-1], values[-1, 0])
+
+"""-------------------------------------------------------------------"""
+
+def test_missing_directory_is_created(tmp_path):
+    path = os.path.join(str(tmp_path), "new", "lamp")
+    store = history.History(metrics, path)
+    store.append([1, 2, 3], 0)
+    store.close()
+    assert os.path.getsize(path + ".raw.bin") == 4 * 8
+
+"""-------------------------------------------------------------------"""
+
+def test_restart_inside_an_interval_stores_it_once(tmp_path):
+    path = os.path.join(str(tmp_path), "lamp")
+    times, values = samples(0, 800)
+    # the reference runs without a restart
+    reference = history.History(metrics)
+    for timestamp, row in zip(times, values):
+        reference.append(row, timestamp)
+    # restart in the middle of a minute and of an hour
+    store = history.History(metrics, path)
+    for timestamp, row in zip(times[:400], values[:400]):
+        store.append(row, timestamp)
+    store.close()
+    store = history.History(metrics, path)
+    for timestamp, row in zip(times[400:], values[400:]):
+        store.append(row, timestamp)
+    store.close()
+    for resolution in ["minute", "hour"]:
+        expected = reference.query("battery", resolution=resolution)
+        restored = store.query("battery", resolution=resolution)
+        assert np.array_equal(restored["time"], expected["time"])
+        assert np.allclose(restored["mean"], expected["mean"])
+        # the files hold every interval once as well
+        rows = history.History(metrics, path)._map_(resolution)
+        assert np.array_equal(np.asarray(rows[:, 0]), expected["time"])
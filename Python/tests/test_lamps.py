@@ -0,0 +1,69 @@
+""" Tests of several lamps driven by one device """
+
+# import modules
+import time
+import pytest
+import Pmod_BLE as ble
+import Pmod_ALS as als
+import Lamp_LED as led
+import Lamp_Unit as unit
+import Lamp_Codec as codec
+import Lamp_Scheduler as scheduler
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture
+def lamps(simulator, monkeypatch):
+    """
+        two connected lamps, each with its own virtual Pmods and LED, streaming
+
+        returns:    list of (lamp, virtual Pmod BLE, virtual Pmod ALS, LED channels)
+    """
+    monkeypatch.setattr(scheduler._flags_, "_tasks_", [])
+    wiring = [(simulator.model.ble, simulator.model.als, (0, 1, 2)),
+              (simulator.model.add_ble(11, 12, 13, 14), simulator.model.add_als(15, 16, 17), (18, 19, 20))]
+    result = []
+    for index, (pmod_ble, pmod_als, channels) in enumerate(wiring):
+        lamp = unit.Lamp("lamp" + str(index + 1),
+                         pmod_ble=ble.PmodBLE(pins={"rx": pmod_ble.rx, "tx": pmod_ble.tx, "rst": pmod_ble.rst, "status": pmod_ble.status}),
+                         pmod_als=als.PmodALS(pins={"cs": pmod_als.cs, "sdo": pmod_als.sdo, "sck": pmod_als.sck}),
+                         rgb_led=led.RGBLED(pins=dict(zip(["red", "green", "blue"], channels))))
+        lamp.ble.start_stream()
+        lamp.flags.connected = True
+        result.append((lamp, pmod_ble, pmod_als, channels))
+    yield result
+    for lamp, _, _, _ in result:
+        lamp.ble.stop_stream()
+
+"""-------------------------------------------------------------------"""
+
+def test_every_lamp_follows_its_own_commands(simulator, lamps):
+    colors = [(100, 0, 50), (0, 100, 25)]
+    for (lamp, pmod_ble, _, _), color in zip(lamps, colors):
+        simulator.model.send(codec.encode_many(color, [codec.pre_red, codec.pre_green, codec.pre_blue], 100), device=pmod_ble)
+    # the background receiver needs a few reads
+    deadline = time.monotonic() + 1
+    while any(lamp.flags.blue == 0 for lamp, _, _, _ in lamps) and time.monotonic() < deadline:
+        for lamp, _, _, _ in lamps:
+            lamp.receive_task()
+        time.sleep(0.005)
+    for lamp, _, _, _ in lamps:
+        lamp.led_task()
+    for (lamp, _, _, channels), color in zip(lamps, colors):
+        assert [simulator.model.led.duty[channel] for channel in channels] == pytest.approx(color, abs=2)
+
+"""-------------------------------------------------------------------"""
+
+def test_every_lamp_reports_its_own_light(simulator, lamps):
+    for (lamp, pmod_ble, pmod_als, _), level in zip(lamps, [40, 200]):
+        pmod_als.level = level
+        lamp.telemetry_task()
+        prefix, value = codec.decode_value(simulator.model.receive(pmod_ble)[0], 100)
+        assert prefix == codec.pre_light and value == pytest.approx(level * 100 / 255, abs=2)
+
+"""-------------------------------------------------------------------"""
+
+def test_tasks_of_every_lamp_are_named_after_it(lamps):
+    names = [task.name for lamp, _, _, _ in lamps for task in lamp.schedule()]
+    assert "lamp1.telemetry" in names and "lamp2.telemetry" in names
+    assert len(names) == len(set(names))
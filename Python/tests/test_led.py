@@ -0,0 +1,83 @@
+""" Tests of the RGB LED on the simulated pattern generator """
+
+# import modules
+import pytest
+import Lamp_LED as led
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture
+def lamp(simulator):
+    """
+        an LED of its own, with its own counters
+    """
+    return led.RGBLED(device_data=simulator.device.data)
+
+"""-------------------------------------------------------------------"""
+
+def test_requested_duty_cycles_are_written(lamp):
+    lamp.set_color(0, 50, 100)
+    assert lamp._flags_._duty_ == [0, 50, 100]
+
+"""-------------------------------------------------------------------"""
+
+def test_changes_below_one_step_are_skipped(simulator, lamp):
+    lamp.set_color(20, 50, 80)
+    calls = simulator.core.total_calls()
+    lamp.set_color(20.1, 50.2, 79.9)
+    assert lamp._flags_._duty_ == [20, 50, 80] and simulator.core.total_calls() == calls
+    lamp.set_color(21, 50, 80)
+    assert lamp._flags_._duty_ == [21, 50, 80]
+
+"""-------------------------------------------------------------------"""
+
+def test_small_changes_to_the_ends_are_written(lamp):
+    for duty in [0.8, 0.3, 0]:
+        lamp.set_color(duty, duty, duty)
+    assert lamp._flags_._duty_ == [0, 0, 0]
+    for duty in [99.2, 99.7, 100]:
+        lamp.set_color(duty, duty, duty)
+    assert lamp._flags_._duty_ == [100, 100, 100]
+
+"""-------------------------------------------------------------------"""
+
+def test_only_changed_channels_are_reprogrammed(simulator, lamp):
+    lamp.set_color(10, 20, 30)
+    lamp.set_color(10, 20, 30)
+    lamp.set_color(40, 20, 30)
+    assert simulator.core.total_calls("pattern.generate") == 4
+    assert lamp.counters.calls == 4 and lamp.counters.saved == 2 and lamp.counters.updates == 2
+    assert simulator.model.led.duty == {0: 40, 1: 20, 2: 30}
+
+"""-------------------------------------------------------------------"""
+
+def test_updates_within_the_window_are_coalesced(simulator, lamp, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(led, "monotonic", lambda: now[0])
+    lamp.settings.coalesce_window = 0.1
+    assert lamp.set_color(10, 10, 10) == 0 and lamp.pending()
+    now[0] = 0.05
+    lamp.set_color(50, 60, 70)
+    assert lamp.update() == 0 and simulator.model.led.duty == {}
+    now[0] = 0.1
+    assert lamp.update() == 3 and not lamp.pending()
+    assert simulator.model.led.duty == {0: 50, 1: 60, 2: 70}
+    assert lamp.counters.updates == 2 and lamp.counters.calls == 3 and lamp.counters.saved == 3
+
+"""-------------------------------------------------------------------"""
+
+def test_forced_color_skips_the_window_and_the_cache(simulator, lamp, monkeypatch):
+    monkeypatch.setattr(led, "monotonic", lambda: 0.0)
+    lamp.settings.coalesce_window = 1
+    lamp.set_color(10, 10, 10)
+    assert lamp.set_color(20, 20, 20, force=True) == 3 and not lamp.pending()
+    assert lamp.set_color(20, 20, 20, force=True) == 3
+    assert simulator.core.total_calls("pattern.generate") == 6
+
+"""-------------------------------------------------------------------"""
+
+def test_invalidated_cache_reprograms_the_same_color(simulator, lamp):
+    lamp.set_color(10, 20, 30)
+    lamp.invalidate()
+    assert lamp.set_color(10, 20, 30) == 3
+    assert simulator.core.total_calls("pattern.generate") == 6
@@ -0,0 +1,78 @@
+""" Tests of the background, rate limited diagnostic messages """
+
+# import modules
+import io
+import json
+import time
+import pytest
+import Lamp_Log as log
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture
+def output(monkeypatch):
+    """
+        JSON records of the "test" module, written to a string
+
+        returns:    function stopping the writer and returning the records
+    """
+    log.stop()
+    stream = io.StringIO()
+    monkeypatch.setattr(log.settings, "stream", stream)
+    monkeypatch.setattr(log.settings, "json", True)
+    monkeypatch.setattr(log._flags_, "_last_", {})
+    monkeypatch.setattr(log._flags_, "_suppressed_", {})
+    monkeypatch.setattr(log.counters, "suppressed", 0)
+    level = log._root_.getChild("test").level
+    log.set_level("test", log.DEBUG)
+    def records():
+        log.stop()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+    yield records
+    log.stop()
+    log.set_level("test", level)
+
+"""-------------------------------------------------------------------"""
+
+def test_records_carry_their_fields(output):
+    logger = log.get("test")
+    logger.info("connected", tx=3, rate=115200)
+    log.set_level("test", log.INFO)
+    logger.debug("hidden")
+    assert not logger.enabled(log.DEBUG)
+    records = output()
+    assert len(records) == 1
+    assert records[0]["module"] == "test" and records[0]["event"] == "connected" and records[0]["level"] == "INFO"
+    assert records[0]["tx"] == 3 and records[0]["rate"] == 115200
+
+"""-------------------------------------------------------------------"""
+
+def test_repeated_events_are_rate_limited(output, monkeypatch):
+    monkeypatch.setattr(log.settings, "rate_limit", 0.2)
+    logger = log.get("test")
+    for _ in range(5):
+        logger.warning("no answer", tx=3)
+    time.sleep(0.25)
+    logger.warning("no answer", tx=3)
+    records = output()
+    assert len(records) == 2 and log.counters.suppressed == 4
+    assert "suppressed" not in records[0] and records[1]["suppressed"] == 4
+
+"""-------------------------------------------------------------------"""
+
+def test_every_source_is_limited_separately(output):
+    logger = log.get("test")
+    for _ in range(3):
+        logger.warning("no answer", tx=3)
+        logger.warning("no answer", tx=4)
+        logger.warning("other event", tx=3)
+    assert sorted((record["event"], record["tx"]) for record in output()) == [("no answer", 3), ("no answer", 4), ("other event", 3)]
+
+"""-------------------------------------------------------------------"""
+
+def test_rate_limit_can_be_turned_off(output, monkeypatch):
+    monkeypatch.setattr(log.settings, "rate_limit", 0)
+    logger = log.get("test")
+    for index in range(5):
+        logger.info("sample", index=index)
+    assert [record["index"] for record in output()] == [0, 1, 2, 3, 4]
@@ -0,0 +1,95 @@
+""" Tests of the periodic task scheduler """
+
+# import modules
+import pytest
+import Lamp_Scheduler as scheduler
+
+"""-------------------------------------------------------------------"""
+
+class clock:
+    """
+        a clock which only moves when the test moves it
+    """
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def time(monkeypatch):
+    """
+        an empty scheduler on a manual clock
+    """
+    current = clock()
+    monkeypatch.setattr(scheduler, "monotonic", current)
+    monkeypatch.setattr(scheduler._flags_, "_tasks_", [])
+    return current
+
+"""-------------------------------------------------------------------"""
+
+def run_until(time, end):
+    """
+        run the scheduler until "end", jumping to every deadline
+    """
+    while True:
+        wait = scheduler.run_once()
+        if time.now + wait > end:
+            return
+        time.now += wait
+
+"""-------------------------------------------------------------------"""
+
+def test_idle_task_backs_off_up_to_its_limit(time):
+    starts = []
+    def idle():
+        starts.append(time.now)
+        return False
+    task = scheduler.add("idle", idle, 1, max_period=5)
+    run_until(time, 120)
+    assert [start - 100 for start in starts[:5]] == [0, 2, 6, 11, 16]
+    assert task.current_period == 5 and task.active_runs == 0
+
+"""-------------------------------------------------------------------"""
+
+def test_active_task_resets_its_period(time):
+    work = [False, False, False, True, False]
+    task = scheduler.add("task", lambda: work.pop(0), 1, max_period=10)
+    periods = []
+    for _ in range(5):
+        time.now += scheduler.run_once()
+        periods.append(task.current_period)
+    assert periods == [2, 4, 8, 1, 2]
+    assert task.runs == 5 and task.active_runs == 1
+
+"""-------------------------------------------------------------------"""
+
+def test_task_without_limit_keeps_its_period(time):
+    task = scheduler.add("task", lambda: False, 2)
+    run_until(time, 110)
+    assert task.runs == 6 and task.current_period == 2
+
+"""-------------------------------------------------------------------"""
+
+def test_most_overdue_task_runs_first(time):
+    order = []
+    scheduler.add("late", lambda: order.append("late"), 1)
+    scheduler.add("early", lambda: order.append("early"), 1)
+    scheduler._flags_._tasks_[1].deadline = 98
+    scheduler.run_once()
+    assert order == ["early", "late"]
+
+"""-------------------------------------------------------------------"""
+
+def test_run_once_returns_the_time_to_the_next_deadline(time):
+    def slow():
+        time.now += 0.25
+        return True
+    scheduler.add("slow", slow, 1)
+    scheduler.add("fast", lambda: True, 0.5)
+    assert scheduler.run_once() == pytest.approx(0.25)
+    time.now += 1
+    scheduler.run_once()
+    statistics = scheduler.statistics()["tasks"]
+    assert statistics["slow"]["runs"] == 2 and statistics["slow"]["mean_run_time"] == pytest.approx(0.25)
+    assert statistics["fast"]["max_latency"] == pytest.approx(0.75)
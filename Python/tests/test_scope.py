@@ -0,0 +1,53 @@
+""" Tests of the battery and charger measurement """
+
+# import modules
+import ctypes
+import types
+import numpy as np
+import pytest
+import WF_Backend as backend
+import Lamp_Scope as scope
+
+"""-------------------------------------------------------------------"""
+
+def test_channels_are_recorded_in_one_acquisition(simulator):
+    scope.measure(simulator.device.data)
+    simulator.core.reset()
+    battery, charger = scope.measure(simulator.device.data)
+    assert simulator.core.total_calls("scope.record") == 1
+    assert battery == pytest.approx(3.8, abs=0.02) and charger == pytest.approx(5, abs=0.02)
+
+"""-------------------------------------------------------------------"""
+
+def test_async_measurement(simulator):
+    assert scope.measure_async(simulator.device.data).result() == pytest.approx((3.8, 5), abs=0.02)
+
+"""-------------------------------------------------------------------"""
+
+class stalled_sdk:
+    """
+        analog input functions of an SDK whose acquisition never finishes
+    """
+    def __init__(self):
+        self.configured = []
+
+    def FDwfAnalogInAcquisitionModeSet(self, handle, mode):
+        return
+
+    def FDwfAnalogInConfigure(self, handle, reconfigure, start):
+        self.configured.append(start.value)
+        return
+
+    def FDwfAnalogInStatus(self, handle, read_data, status):
+        return
+
+def test_stalled_acquisition_times_out(monkeypatch):
+    sdk = stalled_sdk()
+    monkeypatch.setattr(backend, "name", "sdk")
+    monkeypatch.setattr(backend.wf.scope, "dwf", sdk, raising=False)
+    monkeypatch.setattr(backend.wf.scope, "constants", types.SimpleNamespace(acqmodeSingle=0, DwfStateDone=ctypes.c_byte(2)), raising=False)
+    monkeypatch.setattr(backend.settings, "scope_timeout", 0.01)
+    with pytest.raises(TimeoutError):
+        backend.record_channels(types.SimpleNamespace(handle=0), [1, 2])
+    # the acquisition was started, then stopped
+    assert sdk.configured == [True, False]
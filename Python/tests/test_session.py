@@ -0,0 +1,149 @@
+""" Tests of the instrument configuration pool """
+
+# import modules
+import threading
+import pytest
+import WF_Session as session
+
+"""-------------------------------------------------------------------"""
+
+class device:
+    """
+        a device of its own for every test, with a log of setup and teardown calls
+    """
+    def __init__(self):
+        self.calls = []
+
+    def configure(self, name, instrument, drives=(), reads=(), key=None):
+        session.configure(name, self, instrument, lambda: self.calls.append(("setup", name)), lambda: self.calls.append(("teardown", name)), drives, reads, key)
+        return name
+
+@pytest.fixture
+def board():
+    """
+        a new device, with cleared counters
+    """
+    session.reset_statistics()
+    board = device()
+    yield board
+    session.forget(board)
+
+"""-------------------------------------------------------------------"""
+
+def test_active_configuration_is_reused(board):
+    name = board.configure((board, "spi"), "spi", drives=[0, 2], reads=[1])
+    assert session.use(name) and not session.use(name)
+    assert board.calls == [("setup", name)]
+    assert session.statistics()["reconfigurations"] == {"spi": 1} and session.statistics()["reuses"] == {"spi": 1}
+
+"""-------------------------------------------------------------------"""
+
+def test_conflicting_configuration_is_released(board):
+    spi = board.configure((board, "spi"), "spi", drives=[0, 2], reads=[1])
+    static = board.configure((board, "static"), "static", drives=[0, 2], reads=[1])
+    session.use(spi)
+    session.use(static)
+    assert board.calls == [("setup", spi), ("teardown", spi), ("setup", static)]
+    assert session.active(board) == [static]
+    assert session.pin_mode(board, 0) == ("static", "output", static)
+    assert session.pin_mode(board, 1) == ("static", "input", static)
+    assert session.pin_mode(board, 5) is None
+
+"""-------------------------------------------------------------------"""
+
+def test_static_pins_are_shared(board):
+    first = board.configure((board, "first"), "static", drives=[0])
+    second = board.configure((board, "second"), "static", drives=[1])
+    session.use(first)
+    session.use(second)
+    assert sorted(session.active(board, "static"), key=str) == sorted([first, second], key=str)
+    assert ("teardown", first) not in board.calls
+
+"""-------------------------------------------------------------------"""
+
+def test_same_instrument_is_replaced_without_teardown(board):
+    uart = board.configure((board, "uart"), "digital", drives=[3])
+    logic = board.configure((board, "logic"), "digital", reads=[4])
+    session.use(uart)
+    session.use(logic)
+    assert board.calls == [("setup", uart), ("setup", logic)]
+
+"""-------------------------------------------------------------------"""
+
+def test_changed_key_reconfigures(board):
+    name = board.configure((board, "spi"), "spi", key=1e06)
+    session.use(name)
+    board.configure(name, "spi", key=1e06)
+    assert not session.use(name)
+    board.configure(name, "spi", key=2e06)
+    assert session.use(name)
+    assert board.calls == [("setup", name), ("setup", name)]
+
+"""-------------------------------------------------------------------"""
+
+def test_release_and_forget(board):
+    name = board.configure((board, "spi"), "spi")
+    session.use(name)
+    session.release(name)
+    assert not session.is_active(name) and board.calls[-1] == ("teardown", name)
+    session.use(name)
+    session.forget(board, "spi")
+    assert not session.is_active(name) and board.calls[-1] == ("setup", name)
+    assert session.statistics()["releases"] == {"spi": 1}
+
+"""-------------------------------------------------------------------"""
+
+def test_different_instruments_are_set_up_together(board):
+    # both setups wait for each other, they would time out behind a common lock
+    barrier = threading.Barrier(2, timeout=2)
+    met = []
+    def setup():
+        barrier.wait()
+        met.append(True)
+    session.configure((board, "spi"), board, "spi", setup, drives=[0, 2], reads=[1])
+    session.configure((board, "uart"), board, "digital", setup, drives=[3], reads=[4])
+    threads = [threading.Thread(target=session.use, args=(name,)) for name in [(board, "spi"), (board, "uart")]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert met == [True, True]
+    assert sorted(session.active(board), key=str) == sorted([(board, "spi"), (board, "uart")], key=str)
+
+"""-------------------------------------------------------------------"""
+
+def test_callers_wait_for_a_setup_in_progress(board):
+    started, proceed = threading.Event(), threading.Event()
+    def setup():
+        board.calls.append("setup")
+        started.set()
+        proceed.wait(2)
+    session.configure((board, "spi"), board, "spi", setup)
+    session.configure((board, "static"), board, "static", lambda: board.calls.append("static"), drives=[0])
+    results = {}
+    first = threading.Thread(target=lambda: results.update(first=session.use((board, "spi"))))
+    first.start()
+    started.wait(2)
+    second = threading.Thread(target=lambda: results.update(second=session.use((board, "spi"))))
+    second.start()
+    # an instrument which is not in the way is set up meanwhile
+    assert session.use((board, "static"))
+    second.join(0.05)
+    assert second.is_alive() and "second" not in results
+    proceed.set()
+    first.join()
+    second.join()
+    assert results == {"first": True, "second": False}
+    assert board.calls == ["setup", "static"]
+
+"""-------------------------------------------------------------------"""
+
+def test_failed_setup_is_not_active(board):
+    def fail():
+        raise RuntimeError("no device")
+    session.configure((board, "spi"), board, "spi", fail)
+    with pytest.raises(RuntimeError):
+        session.use((board, "spi"))
+    assert not session.is_active((board, "spi"))
+    board.configure((board, "spi"), "spi", key=1)
+    assert session.use((board, "spi")) and board.calls == [("setup", (board, "spi"))]
@@ -0,0 +1,147 @@
+""" Tests of the streaming receiver of the Pmod BLE """
+
+# import modules
+import queue
+import numpy as np
+import pytest
+import Pmod_BLE as ble
+import WF_Executor as executor
+
+"""-------------------------------------------------------------------"""
+
+def pmod_of(device):
+    """
+        a Pmod BLE wired to a virtual Pmod
+    """
+    return ble.PmodBLE(pins={"rx": device.rx, "tx": device.tx, "rst": device.rst, "status": device.status})
+
+def frames(data, multiplier):
+    """
+        line levels of back to back UART frames
+    """
+    bits = [bit for value in data for bit in [0] + [(value >> index) & 1 for index in range(8)] + [1]]
+    return np.repeat(np.array(bits, dtype=bool), multiplier)
+
+def ring(size):
+    """
+        a Pmod with an empty ring, as left by start_stream
+    """
+    pmod = ble.PmodBLE()
+    pmod._stream_._ring_ = np.ones(size, dtype=bool)
+    pmod._stream_._written_, pmod._stream_._consumed_ = 1, 0
+    return pmod
+
+def queued(pmod):
+    """
+        the decoded bytes waiting in the queue of a Pmod
+    """
+    data = []
+    while True:
+        try:
+            data.append(pmod._stream_._queue_.get_nowait())
+        except queue.Empty:
+            return bytes(data)
+
+@pytest.fixture
+def streaming(simulator):
+    """
+        the Pmods started in a test, stopped after it
+    """
+    started = []
+    yield started
+    for pmod in started:
+        pmod.stop_stream()
+
+"""-------------------------------------------------------------------"""
+
+def test_bytes_are_received(simulator, streaming):
+    pmod = pmod_of(simulator.model.ble)
+    pmod.start_stream()
+    streaming.append(pmod)
+    simulator.model.send(bytes(range(256)))
+    assert bytes(pmod.stream_bytes(timeout=1)) == bytes(range(256))
+
+"""-------------------------------------------------------------------"""
+
+def test_blocking_read_needs_a_running_stream(simulator):
+    with pytest.raises(RuntimeError):
+        pmod_of(simulator.model.ble).read(blocking=True, rx_mode="stream")
+
+"""-------------------------------------------------------------------"""
+
+def test_logic_read_of_a_streaming_pmod_fails(simulator, streaming):
+    pmod = pmod_of(simulator.model.ble)
+    pmod.start_stream()
+    streaming.append(pmod)
+    with pytest.raises(RuntimeError):
+        pmod.read(rx_mode="logic")
+
+"""-------------------------------------------------------------------"""
+
+def test_logic_read_of_another_pmod_while_streaming(simulator, streaming, monkeypatch):
+    # without a background receiver, which would record the message before the capture
+    monkeypatch.setattr(executor.settings, "parallel", False)
+    first = pmod_of(simulator.model.ble)
+    second_device = simulator.model.add_ble(11, 12, 13, 14)
+    second = pmod_of(second_device)
+    first.start_stream()
+    streaming.append(first)
+    simulator.model.send("before")
+    assert bytes(first.stream_bytes(timeout=1)) == b"before"
+    simulator.model.send("logic", device=second_device)
+    assert second.read(blocking=True, rx_mode="logic")[0] == "logic"
+    # the recording is restarted for the streaming Pmod
+    simulator.model.send("after")
+    assert bytes(first.stream_bytes(timeout=1)) == b"after"
+    assert first.stream_statistics()["gaps"] >= 1
+
+"""-------------------------------------------------------------------"""
+
+def test_frame_split_between_captures_is_decoded_once():
+    pmod = ring(1024)
+    levels = frames(b"AB", 10)
+    pmod._push_ring_(levels[:150])
+    assert pmod._demodulate_ring_(10) == (1, 0) and queued(pmod) == b"A"
+    pmod._push_ring_(levels[150:])
+    assert pmod._demodulate_ring_(10) == (1, 0) and queued(pmod) == b"B"
+
+"""-------------------------------------------------------------------"""
+
+def test_ring_wraps_around():
+    pmod = ring(64)
+    for value in b"wrapped":
+        pmod._push_ring_(frames([value], 4))
+        pmod._demodulate_ring_(4)
+    assert queued(pmod) == b"wrapped"
+    assert pmod._stream_._written_ > 64 and pmod._stream_._overruns_ == 0
+
+"""-------------------------------------------------------------------"""
+
+def test_full_ring_drops_the_oldest_samples():
+    pmod = ring(64)
+    pmod._push_ring_(frames(b"lost", 4))
+    stream = pmod._stream_
+    assert stream._overruns_ == 1 + 4 * 40 - 64
+    assert stream._written_ - stream._consumed_ == 64
+
+"""-------------------------------------------------------------------"""
+
+def test_frame_in_flight_is_resampled():
+    pmod = ring(1024)
+    pmod._push_ring_(frames(b"x", 10)[:45])
+    pmod._demodulate_ring_(10)
+    pmod._resample_ring_(0.5)
+    pmod._push_ring_(frames(b"x", 5)[22:])
+    pmod._demodulate_ring_(5)
+    assert queued(pmod) == b"x"
+
+"""-------------------------------------------------------------------"""
+
+def test_serial_calls_poll_the_recording(simulator, streaming, monkeypatch):
+    monkeypatch.setattr(executor.settings, "parallel", False)
+    pmod = pmod_of(simulator.model.ble)
+    pmod.start_stream()
+    streaming.append(pmod)
+    assert ble._recorder_._thread_ is None
+    simulator.model.send("polled")
+    assert bytes(pmod.stream_bytes(timeout=1)) == b"polled"
@@ -0,0 +1,58 @@
+""" Tests of the system message tokenizer of the Pmod BLE """
+
+# import modules
+import Pmod_BLE as ble
+
+"""-------------------------------------------------------------------"""
+
+def tokenize(pmod, chunks):
+    """
+        feed consecutive reads to the tokenizer
+
+        returns:    data, list of system messages
+    """
+    data = bytearray()
+    messages = []
+    for chunk in chunks:
+        chunk_data, chunk_messages = pmod._tokenize_(chunk)
+        data += chunk_data
+        messages += chunk_messages
+    return bytes(data), messages
+
+"""-------------------------------------------------------------------"""
+
+def test_data_only():
+    assert ble.PmodBLE()._tokenize_(b"\xC0\x80\x40") == (b"\xC0\x80\x40", [])
+
+"""-------------------------------------------------------------------"""
+
+def test_message_in_one_read():
+    assert ble.PmodBLE()._tokenize_(b"ab%CONNECT%cd") == (b"abcd", [b"%CONNECT%"])
+
+"""-------------------------------------------------------------------"""
+
+def test_message_split_between_reads():
+    assert tokenize(ble.PmodBLE(), [b"ab%CON", b"NE", b"CT%cd"]) == (b"abcd", [b"%CONNECT%"])
+
+"""-------------------------------------------------------------------"""
+
+def test_every_split_point():
+    stream = b"x%REBOOT%yz%DISCONNECT%w"
+    for split in range(len(stream) + 1):
+        assert tokenize(ble.PmodBLE(), [stream[:split], stream[split:]]) == (b"xyzw", [b"%REBOOT%", b"%DISCONNECT%"]), split
+
+"""-------------------------------------------------------------------"""
+
+def test_unterminated_message_is_data():
+    pmod = ble.PmodBLE(settings={"_max_sys_msg_": 8})
+    data, messages = tokenize(pmod, [b"a%", b"0123456789", b"%b%"])
+    assert data == b"a%0123456789" and messages == [b"%b%"]
+    assert not pmod._flags_._currently_sys_
+
+"""-------------------------------------------------------------------"""
+
+def test_objects_keep_their_own_state():
+    first, second = ble.PmodBLE(), ble.PmodBLE()
+    first._tokenize_(b"%STREAM")
+    assert second._tokenize_(b"OPEN") == (b"OPEN", [])
+    assert first._tokenize_(b"_OPEN%") == (b"", [b"%STREAM_OPEN%"])
@@ -0,0 +1,72 @@
+""" Tests of the latency tracing of the control path """
+
+# import modules
+import json
+import pytest
+import Lamp_Trace as trace
+import Lamp_LED as led
+import Pmod_ALS as als
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture
+def tracing(monkeypatch):
+    """
+        clear the trace before the test, and stop tracing after it
+    """
+    monkeypatch.setattr(trace.settings, "chrome_trace", False)
+    trace.disable()
+    trace.reset()
+    yield
+    trace.disable()
+    trace.reset()
+
+"""-------------------------------------------------------------------"""
+
+def test_control_path_is_traced_only_while_enabled(simulator, tracing):
+    original = led.RGBLED.set_color
+    lamp, sensor = led.RGBLED(device_data=simulator.device.data), als.PmodALS(device_data=simulator.device.data)
+    trace.enable()
+    assert trace.enabled() and led.RGBLED.set_color is not original
+    for duty in [10, 20, 30]:
+        lamp.set_color(duty, duty, duty)
+    sensor.read()
+    stages = trace.summary()["stages"]
+    assert stages["rgb_led"]["calls"] == 3 and stages["als.read"]["calls"] == 1
+    assert 0 <= stages["rgb_led"]["p50"] <= stages["rgb_led"]["p99"] <= stages["rgb_led"]["max"]
+    assert trace.summary()["counters"]["led.color"] == 3
+    trace.disable()
+    assert led.RGBLED.set_color is original
+    lamp.set_color(40, 40, 40)
+    assert trace.summary()["stages"]["rgb_led"]["calls"] == 3 and trace.summary()["counters"]["led.color"] == 3
+
+"""-------------------------------------------------------------------"""
+
+def test_own_targets_and_bounded_history(tracing, monkeypatch):
+    class stage:
+        def run(self, value):
+            return value * 2
+    monkeypatch.setattr(trace.settings, "history", 5)
+    trace.enable([(stage, "run", "stage")])
+    assert [stage().run(value) for value in range(8)] == [0, 2, 4, 6, 8, 10, 12, 14]
+    assert trace.summary()["stages"]["stage"]["calls"] == 5
+    counts, edges = trace.histogram("stage", bins=4)
+    assert counts.sum() == 5 and len(edges) == 5
+    assert trace.histogram("unknown")[0].size == 0
+
+"""-------------------------------------------------------------------"""
+
+def test_chrome_trace_export(tracing, monkeypatch, tmp_path):
+    class stage:
+        def run(self):
+            trace.event("inside", value=1)
+    monkeypatch.setattr(trace.settings, "chrome_trace", True)
+    trace.enable([(stage, "run", "stage")])
+    stage().run()
+    trace.count("frames", 3)
+    trace.export_chrome_trace(tmp_path / "trace.json")
+    with open(tmp_path / "trace.json") as file:
+        events = json.load(file)["traceEvents"]
+    assert [(event["name"], event["ph"]) for event in events] == [("inside", "i"), ("stage", "X")]
+    assert events[0]["args"] == {"value": 1} and events[1]["dur"] >= 0
+    assert trace.summary()["counters"] == {"inside": 1, "frames": 3}
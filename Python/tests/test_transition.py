@@ -0,0 +1,63 @@
+""" Tests of the color transition schedules """
+
+# import modules
+import numpy as np
+import pytest
+import Lamp_Transition as transition
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture(autouse=True)
+def cache():
+    """
+        an empty schedule cache for every test
+    """
+    transition.clear_cache()
+    yield
+    transition.clear_cache()
+
+"""-------------------------------------------------------------------"""
+
+@pytest.mark.parametrize("curve", ["linear", "gamma", "eased"])
+def test_schedule_ends_on_the_colors(curve):
+    times, colors = transition.render((0, 20, 100), (100, 20, 0), 1, curve)
+    assert times[0] == 0 and times[-1] == 1 and np.all(np.diff(times) > 0)
+    assert list(colors[0]) == [0, 20, 100] and list(colors[-1]) == [100, 20, 0]
+    # monotonic channels, the constant one stays constant
+    assert np.all(np.diff(colors[:, 0]) >= 0) and np.all(np.diff(colors[:, 2]) <= 0) and np.all(colors[:, 1] == 20)
+
+"""-------------------------------------------------------------------"""
+
+def test_only_frames_crossing_a_step_are_kept():
+    times, colors = transition.render((0, 0, 0), (2, 0, 0), 2, "linear")
+    steps = np.round(colors / (100 / transition.settings.pwm_steps))
+    assert len(times) < 2 / transition.settings.frame_period
+    assert np.all(np.diff(steps[:-1, 0]) == 1)
+
+"""-------------------------------------------------------------------"""
+
+def test_gamma_curve_is_slower_at_low_duty_cycles():
+    times, gamma = transition.render((0, 0, 0), (100, 100, 100), 1, "gamma")
+    middle = transition.color_at((times, gamma), 0.5)[0][0]
+    assert middle == pytest.approx(100 * 0.5 ** 2.2, abs=1)
+
+"""-------------------------------------------------------------------"""
+
+def test_color_at_plays_the_schedule():
+    schedule = transition.render((0, 0, 0), (100, 0, 0), 1, "linear")
+    assert transition.color_at(schedule, -1) == ((0, 0, 0), False)
+    color, finished = transition.color_at(schedule, 0.5)
+    assert color[0] == pytest.approx(50, abs=1) and not finished
+    assert transition.color_at(schedule, 1) == ((100, 0, 0), True)
+
+"""-------------------------------------------------------------------"""
+
+def test_schedules_are_cached_and_read_only():
+    first = transition.render((0, 0, 0), (50, 50, 50), 1, "eased")
+    second = transition.render([0, 0, 0], [50.0, 50, 50], 1.0, "eased")
+    assert first is second
+    assert transition.cache_info().hits == 1 and transition.cache_info().misses == 1
+    with pytest.raises(ValueError):
+        first[1][0, 0] = 1
+    with pytest.raises(ValueError):
+        transition.render((0, 0, 0), (1, 1, 1), 1, "cubic")
@@ -0,0 +1,69 @@
+""" Tests of the adaptive oversampling of the Pmod BLE """
+
+# import modules
+import pytest
+import Pmod_BLE as ble
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture
+def pmod():
+    """
+        a Pmod tuning its oversampling, with small windows
+    """
+    return ble.PmodBLE(settings={"_auto_tune_": True, "_tune_window_": 10, "_record_multiplier_": 10})
+
+"""-------------------------------------------------------------------"""
+
+def test_clean_windows_lower_the_oversampling(pmod):
+    multipliers = []
+    for _ in range(4):
+        pmod._observe_(10, 0, 1e-03)
+        multipliers.append(pmod.settings._record_multiplier_)
+    assert multipliers == [8, 6, 5, 4]
+    assert pmod._tune_._changed_
+
+"""-------------------------------------------------------------------"""
+
+def test_errors_reject_a_factor(pmod):
+    pmod._observe_(10, 0, 1e-03)
+    assert pmod.settings._record_multiplier_ == 8
+    pmod._observe_(5, 1, 1e-03)
+    assert pmod.settings._record_multiplier_ == 10 and pmod._tune_._rejected_ == [8]
+    # the rejected factor is skipped
+    pmod._observe_(10, 0, 1e-03)
+    assert pmod.settings._record_multiplier_ == 6
+
+"""-------------------------------------------------------------------"""
+
+def test_buffer_follows_the_message_length(pmod):
+    pmod._observe_(20, 0, 1e-03, truncated=True)
+    assert pmod._tune_._message_ == 40
+    assert pmod.settings._buffer_size_ == (40 * 3 // 2 + 1) * 10 * pmod.settings._record_multiplier_
+
+"""-------------------------------------------------------------------"""
+
+def test_statistics_without_tuning():
+    pmod = ble.PmodBLE(settings={"_record_multiplier_": 10})
+    pmod._observe_(9, 1, 2e-03)
+    pmod._observe_(10, 0, 4e-03)
+    assert pmod.settings._record_multiplier_ == 10 and not pmod._tune_._changed_
+    statistics = pmod.tune_statistics()[10]
+    assert statistics["captures"] == 2 and statistics["bytes"] == 19 and statistics["errors"] == 1
+    assert statistics["error_rate"] == pytest.approx(0.05) and statistics["capture_time"] == pytest.approx(3e-03)
+
+"""-------------------------------------------------------------------"""
+
+def test_tuned_reads_lose_no_bytes(simulator):
+    device = simulator.model.ble
+    pmod = ble.PmodBLE(pins={"rx": device.rx, "tx": device.tx, "rst": device.rst, "status": device.status},
+                       settings={"_auto_tune_": True, "_tune_window_": 20})
+    sent, received = "", ""
+    for index in range(12):
+        sent += "message " + str(index)
+        simulator.model.send("message " + str(index))
+        # a message longer than the buffer is finished by the next read
+        received += pmod.read(blocking=True, rx_mode="logic")[0]
+    assert sent.startswith(received) and len(received) > len(sent) - 10
+    assert pmod.settings._record_multiplier_ < 10
+    assert all(statistics["errors"] == 0 for statistics in pmod.tune_statistics().values())
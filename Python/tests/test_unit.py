@@ -0,0 +1,241 @@
+""" Tests of the lamp tasks on the simulated instruments """
+
+# import modules
+import numpy as np
+import pytest
+import Pmod_BLE as ble
+import Pmod_ALS as als
+import Lamp_LED as led
+import Lamp_Unit as unit
+
+"""-------------------------------------------------------------------"""
+
+def new_lamp(simulator, settings=None):
+    """
+        a lamp of its own, wired to the default virtual devices
+    """
+    pmod_ble = ble.PmodBLE(pins={"rx": simulator.model.ble.rx, "tx": simulator.model.ble.tx, "rst": simulator.model.ble.rst, "status": simulator.model.ble.status})
+    pmod_als = als.PmodALS(pins={"cs": simulator.model.als.cs, "sdo": simulator.model.als.sdo, "sck": simulator.model.als.sck})
+    rgb_led = led.RGBLED(pins={"red": simulator.model.led.red, "green": simulator.model.led.green, "blue": simulator.model.led.blue})
+    return unit.Lamp("test", pmod_ble=pmod_ble, pmod_als=pmod_als, rgb_led=rgb_led, battery=True, settings=settings)
+
+@pytest.fixture
+def lamp(simulator):
+    """
+        a lamp with the default settings
+    """
+    return new_lamp(simulator)
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+        the time seen by the lamp, moved by the test
+    """
+    now = [1000.0]
+    monkeypatch.setattr(unit, "monotonic", lambda: now[0])
+    return now
+
+@pytest.fixture
+def changing_lamp(simulator, clock):
+    """
+        a connected lamp reporting only changes, without the probe filter
+    """
+    lamp = new_lamp(simulator, {"telemetry_trigger": "change", "light_filter": 0})
+    lamp.flags.connected = True
+    return lamp
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture
+def broken_sensor(monkeypatch):
+    """
+        every light reading fails, in both modes
+    """
+    def fail(*args, **kwargs):
+        raise RuntimeError("no answer")
+    monkeypatch.setattr(als.wf.protocol.spi, "read", fail)
+    monkeypatch.setattr(als.wf.static, "get_state", fail)
+    return
+
+"""-------------------------------------------------------------------"""
+
+def test_failed_light_readings_keep_the_brightness_scale(simulator, lamp, request):
+    simulator.model.als.level = 200
+    lamp.light_task()
+    scale, light = lamp.flags.scale, lamp.flags.light
+    assert scale < 1
+    # a real change would update the scale
+    simulator.model.als.level = 20
+    request.getfixturevalue("broken_sensor")
+    assert not lamp.light_task()
+    assert lamp.flags.scale == scale and lamp.flags.light == light
+
+"""-------------------------------------------------------------------"""
+
+def test_failed_light_measurement_keeps_the_reported_value(simulator, lamp, request):
+    lamp.flags.connected = True
+    simulator.model.als.level = 100
+    lamp.telemetry_task()
+    reported = lamp.flags.reported[0]
+    assert reported == pytest.approx(100 * 100 / 255, abs=0.5)
+    request.getfixturevalue("broken_sensor")
+    lamp.telemetry_task()
+    assert lamp.flags.reported[0] == reported
+    assert np.isnan(lamp.history.query("light", resolution="raw")["mean"][-1])
+
+"""-------------------------------------------------------------------"""
+
+def test_stalled_scope_fails_the_voltages_only(simulator, lamp, monkeypatch):
+    def stalled(device_data):
+        raise TimeoutError("stalled")
+    monkeypatch.setattr(unit.scope, "measure", stalled)
+    lamp.flags.connected = True
+    lamp.telemetry_task()
+    light, battery, charger = lamp.history.query("light", resolution="raw")["mean"][-1], lamp.history.query("battery", resolution="raw")["mean"][-1], lamp.history.query("charger", resolution="raw")["mean"][-1]
+    assert not np.isnan(light) and np.isnan(battery) and np.isnan(charger)
+
+"""-------------------------------------------------------------------"""
+
+def test_values_within_the_deadbands_are_not_sent(simulator, changing_lamp, clock):
+    assert changing_lamp.telemetry_task()
+    for _ in range(3):
+        clock[0] += 10
+        assert not changing_lamp.telemetry_task()
+    counters = changing_lamp.counters
+    assert (counters.probes, counters.measurements, counters.transmissions) == (4, 1, 1)
+    assert counters.saved_measurements == 3 and counters.saved_transmissions == 3
+
+"""-------------------------------------------------------------------"""
+
+def test_change_beyond_the_deadband_is_sent(simulator, changing_lamp, clock):
+    simulator.model.als.level = 100
+    changing_lamp.telemetry_task()
+    reported = changing_lamp.flags.reported[0]
+    clock[0] += 10
+    simulator.model.als.level = 110
+    assert changing_lamp.telemetry_task()
+    assert changing_lamp.flags.reported[0] - reported == pytest.approx(10 * 100 / 255, abs=0.5)
+    assert changing_lamp.counters.transmissions == 2 and changing_lamp.counters.measurements == 2
+
+"""-------------------------------------------------------------------"""
+
+def test_unchanged_values_are_sent_after_the_maximum_interval(simulator, changing_lamp, clock):
+    changing_lamp.telemetry_task()
+    clock[0] += changing_lamp.settings.telemetry_interval[1] - 1
+    assert not changing_lamp.telemetry_task()
+    clock[0] += 1
+    assert changing_lamp.telemetry_task()
+    assert changing_lamp.counters.transmissions == 2
+
+"""-------------------------------------------------------------------"""
+
+def test_deadbands_of_every_value(changing_lamp):
+    changing_lamp.flags.reported = [50, 3.8, 5]
+    assert not changing_lamp._changed_([51.5, 3.81, 4.9])
+    assert changing_lamp._changed_([52.5, 3.8, 5])
+    assert changing_lamp._changed_([50, 3.75, 5])
+    assert changing_lamp._changed_([50, 3.8, 0])
+    # failed measurements are not changes, values never reported are
+    assert not changing_lamp._changed_([np.nan, np.nan, np.nan])
+    changing_lamp.flags.reported = [50, np.nan, 5]
+    assert changing_lamp._changed_([50, 3.8, 5])
+
+"""-------------------------------------------------------------------"""
+
+def test_timer_trigger_sends_every_cycle(simulator, lamp, clock):
+    lamp.flags.connected = True
+    for _ in range(3):
+        assert lamp.telemetry_task()
+    assert lamp.counters.measurements == 3 and lamp.counters.transmissions == 3 and lamp.counters.probes == 0
+
+"""-------------------------------------------------------------------"""
+
+def test_telemetry_period_follows_the_trigger(simulator, monkeypatch):
+    monkeypatch.setattr(unit.scheduler._flags_, "_tasks_", [])
+    timer = new_lamp(simulator, {"out_data_update": 7}).schedule()
+    change = new_lamp(simulator, {"telemetry_trigger": "change", "telemetry_interval": (3, 30)}).schedule()
+    assert [task.period for task in timer if task.name == "test.telemetry"] == [7]
+    assert [task.period for task in change if task.name == "test.telemetry"] == [3]
+
+"""-------------------------------------------------------------------"""
+
+@pytest.fixture
+def bright_lamp(simulator, clock):
+    """
+        a connected lamp scaling its color by the ambient light
+    """
+    lamp = new_lamp(simulator, {"auto_brightness": True})
+    lamp.flags.connected = True
+    return lamp
+
+"""-------------------------------------------------------------------"""
+
+def test_brightness_follows_the_curve(simulator, bright_lamp):
+    for level, scale in [(0, 1.0), (int(0.3 * 255), 0.7), (255, 0.1)]:
+        simulator.model.als.level = level
+        bright_lamp.light_task()
+        assert bright_lamp.flags.scale == pytest.approx(scale, abs=0.02)
+    bright_lamp.flags.red, bright_lamp.flags.green, bright_lamp.flags.blue = 100, 50, 0
+    bright_lamp.led_task()
+    assert bright_lamp.led._flags_._duty_ == pytest.approx([10, 5, 0], abs=0.2)
+
+"""-------------------------------------------------------------------"""
+
+def test_small_light_changes_keep_the_scale(simulator, bright_lamp):
+    simulator.model.als.level = 100
+    assert bright_lamp.light_task()
+    scale = bright_lamp.flags.scale
+    # within the noise: stable, within the hysteresis: same scale
+    simulator.model.als.level = 102
+    assert not bright_lamp.light_task() and bright_lamp.flags.scale == scale
+    simulator.model.als.level = 106
+    assert bright_lamp.light_task() and bright_lamp.flags.scale == scale
+    simulator.model.als.level = 110
+    bright_lamp.light_task()
+    assert bright_lamp.flags.scale < scale
+
+"""-------------------------------------------------------------------"""
+
+def test_telemetry_reuses_a_recent_light_sample(simulator, bright_lamp, clock):
+    simulator.model.als.level = 100
+    bright_lamp.light_task()
+    calls = simulator.core.total_calls("protocol.spi") + simulator.core.total_calls("static")
+    bright_lamp.telemetry_task()
+    assert simulator.core.total_calls("protocol.spi") + simulator.core.total_calls("static") == calls
+    assert bright_lamp.flags.reported[0] == bright_lamp.flags.light
+    clock[0] += bright_lamp.settings.out_data_update
+    bright_lamp.telemetry_task()
+    assert simulator.core.total_calls("protocol.spi") + simulator.core.total_calls("static") > calls
+
+"""-------------------------------------------------------------------"""
+
+def test_lamp_fades_to_a_new_color(simulator, clock):
+    lamp = new_lamp(simulator, {"fade_duration": 1, "fade_curve": "linear"})
+    lamp.flags.connected = True
+    lamp.led_task()
+    lamp.flags.red = 100
+    assert lamp.led_task() and lamp.led._flags_._duty_[0] == 0
+    clock[0] += 0.5
+    assert lamp.led_task() and lamp.led._flags_._duty_[0] == pytest.approx(50, abs=1)
+    clock[0] += 0.5
+    lamp.led_task()
+    assert lamp.led._flags_._duty_[0] == 100 and lamp.flags.transition is None
+    assert not lamp.led_task()
+
+"""-------------------------------------------------------------------"""
+
+def test_new_color_during_a_fade_starts_from_the_shown_color(simulator, clock):
+    lamp = new_lamp(simulator, {"fade_duration": 1, "fade_curve": "linear"})
+    lamp.flags.connected = True
+    lamp.led_task()
+    lamp.flags.red = 100
+    lamp.led_task()
+    clock[0] += 0.5
+    lamp.flags.red = 0
+    lamp.led_task()
+    assert lamp.led._flags_._duty_[0] == pytest.approx(50, abs=1)
+    clock[0] += 0.5
+    lamp.led_task()
+    assert lamp.led._flags_._duty_[0] == pytest.approx(25, abs=1)